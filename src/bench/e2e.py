@@ -0,0 +1,282 @@
+import argparse
+import contextlib
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, List
+from src.core.batch import read_tasks
+from src.core.coordinator import Coordinator
+from src.utils.llm_store import ResponseStore, ReplayLLM
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Drives Coordinator.run end-to-end over a fixed corpus of tasks with a
+# deterministic LLM stand-in (scripted plans, or responses recorded with
+# --record-llm) and reports where the time goes: planning, execution, memory
+# persistence and tree generation, plus attempts per task, peak RSS and how
+# much the memory store grew. Each round reruns the corpus on the same memory,
+# so later rounds show the effect of the plan cache and retrieval. With
+# --stream, planning overlaps execution and is counted in both phases. With
+# --speculate N, planning and running the candidates is one "speculation"
+# phase; compare attempts, wall_s and cpu_s against a run without it.
+# wasted_step_s is step time spent on candidates that were discarded.
+#
+#   python -m src.bench.e2e --rounds 2 --output bench.json
+#   python -m src.bench.e2e --replay-llm recordings/ --tasks tasks.txt
+
+# task -> plan per attempt; the last plan is repeated if more attempts happen
+CORPUS: Dict[str, List[List[dict]]] = {
+    "Create a hello world script": [[
+        {"type": "write_file", "filename": "hello.py", "content": "print('hello world')\n"},
+        {"type": "verify", "command": "python hello.py"},
+    ]],
+    "Write a fibonacci module with a test": [[
+        {"type": "write_file", "filename": "fib.py",
+         "content": "def fib(n):\n    return n if n < 2 else fib(n - 1) + fib(n - 2)\n"},
+        {"type": "write_file", "filename": "test_fib.py",
+         "content": "import unittest\nfrom fib import fib\n\nclass T(unittest.TestCase):\n"
+                    "    def test_fib(self):\n        self.assertEqual(fib(10), 55)\n\nunittest.main()\n"},
+        {"type": "verify", "command": "python test_fib.py"},
+    ]],
+    "Create a config parser that fails first": [
+        [
+            {"type": "write_file", "filename": "config.py",
+             "content": "import json\nprint(json.load(open('config.json'))['name'])\n"},
+            {"type": "verify", "command": "python config.py"},
+        ],
+        [
+            {"type": "write_file", "filename": "config.json", "content": "{\"name\": \"bench\"}\n"},
+            {"type": "write_file", "filename": "config.py",
+             "content": "import json\nprint(json.load(open('config.json'))['name'])\n"},
+            {"type": "verify", "command": "python config.py"},
+        ],
+    ],
+    "Generate a package with independent modules": [[
+        {"type": "command", "id": "dirs", "command": "python -c \"import os; os.makedirs('pkg', exist_ok=True)\""},
+        {"type": "write_file", "id": "a", "depends_on": ["dirs"], "filename": "pkg/a.py", "content": "A = 1\n"},
+        {"type": "write_file", "id": "b", "depends_on": ["dirs"], "filename": "pkg/b.py", "content": "B = 2\n"},
+        {"type": "write_file", "id": "init", "depends_on": ["dirs"], "filename": "pkg/__init__.py",
+         "content": "from .a import A\nfrom .b import B\n"},
+        {"type": "verify", "depends_on": ["a", "b", "init"], "command": "python -c \"import pkg; assert pkg.A + pkg.B == 3\""},
+    ]],
+    "Find the TODO markers in a small project": [[
+        {"type": "write_file", "filename": "main.py", "content": "# TODO: implement\nprint('x')\n"},
+        {"type": "write_file", "filename": "util.py", "content": "def f():\n    pass  # TODO: later\n"},
+        {"type": "search_files", "pattern": "TODO"},
+        {"type": "verify", "command": "python main.py"},
+    ]],
+}
+
+
+class ScriptedLLM:
+    # Returns the corpus plan for the task in the prompt; the n-th request for
+    # a task within a run gets the n-th scripted attempt
+    def __init__(self, corpus: Dict[str, List[List[dict]]]):
+        self.corpus = corpus
+        self.requests: Dict[str, int] = {}
+
+    def generate(self, prompt: str, system_instruction: str = None) -> str:
+        match = re.match(r"Task: (.*)", prompt)
+        task = match.group(1).strip() if match else ""
+        plans = self.corpus.get(task) or [[{"type": "verify", "command": "python -c \"print('no script')\""}]]
+        attempt = self.requests.get(task, 0)
+        self.requests[task] = attempt + 1
+        plan = plans[min(attempt, len(plans) - 1)]
+        return f"Scripted plan.\n```json\n{json.dumps(plan)}\n```"
+
+    def generate_stream(self, prompt: str, system_instruction: str = None):
+        yield self.generate(prompt, system_instruction)
+
+    def reset(self):
+        self.requests.clear()
+
+
+class PhaseTimer:
+    # Wraps bound methods on an instance so their wall time is added to a phase
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+        # While an exclusive call runs, other phases (on any thread) are not counted
+        self.exclusive = 0
+
+    def wrap(self, owner, name: str, phase: str, exclusive: bool = False):
+        original = getattr(owner, name)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            self.exclusive += exclusive
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.exclusive -= exclusive
+                self.add(phase, time.perf_counter() - start, force=exclusive)
+
+        setattr(owner, name, timed)
+
+    def wrap_stream(self, owner, name: str, phase: str):
+        # Counts time spent producing items, not time the consumer holds them
+        original = getattr(owner, name)
+
+        def timed(*args, **kwargs):
+            iterator = original(*args, **kwargs)
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    self.add(phase, time.perf_counter() - start)
+                yield item
+
+        setattr(owner, name, timed)
+
+    def add(self, phase: str, seconds: float, force: bool = False):
+        if self.exclusive and not force:
+            return
+        self.totals[phase] = self.totals.get(phase, 0.0) + seconds
+
+    def take(self) -> Dict[str, float]:
+        totals, self.totals = self.totals, {}
+        return totals
+
+
+def _directory_bytes(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _peak_rss_mb() -> float:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _cpu_seconds() -> float:
+    # This process plus finished child processes (the commands the steps ran)
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def _instrument(coordinator: Coordinator) -> PhaseTimer:
+    timer = PhaseTimer()
+    timer.wrap(coordinator.planner, "create_plan", "planning")
+    timer.wrap_stream(coordinator.planner, "create_plan_stream", "planning")
+    timer.wrap(coordinator.scheduler, "run", "execution")
+    if coordinator.speculator is not None:
+        timer.wrap(coordinator.speculator, "run", "speculation", exclusive=True)
+    timer.wrap(coordinator.memory, "add_trace", "memory")
+    timer.wrap(coordinator.reflector, "reflect", "memory")
+    timer.wrap(coordinator, "_generate_tree_view", "tree")
+    return timer
+
+
+def run(tasks: List[str], rounds: int = 2, replay_dir: str = None, stream: bool = False,
+        resume: bool = False, rollback: bool = False, speculate: int = 0, verbose: bool = False) -> dict:
+    root = tempfile.mkdtemp(prefix="e2e_bench_")
+    cwd = os.getcwd()
+    try:
+        os.chdir(root)
+        llm = ReplayLLM(ResponseStore(os.path.join(cwd, replay_dir))) if replay_dir else ScriptedLLM(CORPUS)
+        sink = sys.stdout if verbose else open(os.devnull, "w")
+        with contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink):
+            start = time.perf_counter()
+            coordinator = Coordinator(stream=stream, resume=resume, llm=llm, rollback=rollback, speculate=speculate)
+            startup = time.perf_counter() - start
+        timer = _instrument(coordinator)
+        memory_dir = coordinator.memory.log_dir
+
+        results = {"tasks": len(tasks), "rounds": [], "startup_s": round(startup, 4)}
+        for round_index in range(rounds):
+            if isinstance(llm, ScriptedLLM):
+                llm.reset()
+            memory_before = _directory_bytes(memory_dir)
+            per_task = []
+            cpu_start = _cpu_seconds()
+            round_start = time.perf_counter()
+            for task in tasks:
+                task_start = time.perf_counter()
+                with contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink):
+                    workspace = coordinator.run(task)
+                traces = coordinator.memory.find_traces(workspace=workspace)
+                per_task.append({
+                    "task": task,
+                    "status": traces[0]["status"] if traces else "unknown",
+                    "attempts": len(traces),
+                    "replayed": bool(traces and traces[-1].get("replayed")),
+                    "wasted_step_s": round(sum((t.get("speculation") or {}).get("wasted_step_s", 0.0) for t in traces), 4),
+                    "seconds": round(time.perf_counter() - task_start, 4),
+                })
+            wall = time.perf_counter() - round_start
+            phases = {phase: round(seconds, 4) for phase, seconds in sorted(timer.take().items())}
+            phases["other"] = round(wall - sum(phases.values()), 4)
+            results["rounds"].append({
+                "round": round_index + 1,
+                "wall_s": round(wall, 4),
+                "cpu_s": round(_cpu_seconds() - cpu_start, 4),
+                "wasted_step_s": round(sum(t["wasted_step_s"] for t in per_task), 4),
+                "phases_s": phases,
+                "succeeded": sum(1 for t in per_task if t["status"] == "success"),
+                "attempts_total": sum(t["attempts"] for t in per_task),
+                "attempts_mean": round(sum(t["attempts"] for t in per_task) / max(1, len(per_task)), 3),
+                "memory_growth_bytes": _directory_bytes(memory_dir) - memory_before,
+                "per_task": per_task,
+            })
+        results["memory_bytes"] = _directory_bytes(memory_dir)
+        results["peak_rss_mb"] = _peak_rss_mb()
+        if coordinator.verify_cache is not None:
+            results["verify_cache"] = coordinator.verify_cache.stats()
+        if isinstance(llm, ReplayLLM):
+            results["replay"] = {"hits": llm.hits, "misses": llm.misses}
+        if sink is not sys.stdout:
+            sink.close()
+        return results
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end plan-execute-verify benchmark")
+    parser.add_argument("--rounds", type=int, default=2, help="Times the corpus is run on the same memory")
+    parser.add_argument("--tasks", metavar="FILE", help="One task per line (default: the built-in corpus)")
+    parser.add_argument("--replay-llm", metavar="DIR", help="Serve responses recorded with --record-llm instead of scripted plans")
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--resume", action="store_true")
+    parser.add_argument("--rollback", action="store_true")
+    parser.add_argument("--speculate", type=int, default=0, metavar="N", help="Race N candidate plans per attempt")
+    parser.add_argument("--verbose", action="store_true", help="Show the agent's console output")
+    parser.add_argument("--output", metavar="FILE", help="Also write the JSON results to FILE")
+    args = parser.parse_args()
+
+    if args.tasks:
+        with open(args.tasks, "r", encoding="utf-8") as f:
+            tasks = read_tasks(f)
+    else:
+        tasks = list(CORPUS)
+    results = run(tasks, rounds=args.rounds, replay_dir=args.replay_llm, stream=args.stream,
+                  resume=args.resume, rollback=args.rollback,
+                  speculate=args.speculate, verbose=args.verbose)
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
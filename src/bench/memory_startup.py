@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from src.core.log_store import SegmentedLog
+from src.core.memory import Memory
+
+# Measures Memory() construction time with N stored traces, comparing the
+# indexed lazy loader against parsing every trace body (the old behaviour) and
+# against a legacy single-file memory.json.
+#
+#   python -m src.bench.memory_startup --traces 10000 100000
+
+
+def _synthetic_trace(i: int) -> dict:
+    step = {"type": "write_file", "filename": f"file_{i % 50}.py", "content": "print('hello')\n" * 20}
+    return {
+        "task": f"task {i % 500}",
+        "plan": [step, {"type": "verify", "command": "python file.py"}],
+        "steps": [{"step": step, "result": {"status": "success", "message": "File written."}}],
+        "workspace": f"projects/ws_{i % 100}",
+        "status": "success" if i % 3 else "failure",
+        "timestamp": 1700000000 + i,
+    }
+
+
+def _populate(directory: str, count: int) -> str:
+    memory_file = os.path.join(directory, "memory.json")
+    log_dir = os.path.join(directory, "memory")
+    log = SegmentedLog(log_dir, "episodic", fsync=False)
+    log.compact(_synthetic_trace(i) for i in range(count))
+    # First open builds the index; it is reused by every timed run below.
+    Memory(memory_file, fsync=False)
+    with open(memory_file, "w") as f:
+        json.dump({"episodic": [_synthetic_trace(i) for i in range(count)], "procedural": []}, f)
+    return memory_file
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(count: int, repeat: int = 3) -> dict:
+    directory = tempfile.mkdtemp(prefix="memory_bench_")
+    try:
+        memory_file = _populate(directory, count)
+        log_dir = os.path.join(directory, "memory")
+
+        def lazy():
+            Memory(memory_file, fsync=False)
+
+        def eager():
+            list(SegmentedLog(log_dir, "episodic", fsync=False).records())
+
+        def legacy():
+            with open(memory_file) as f:
+                json.load(f)
+
+        log_bytes = sum(os.path.getsize(os.path.join(log_dir, f)) for f in os.listdir(log_dir) if f.startswith("episodic-"))
+        return {
+            "traces": count,
+            "lazy_startup_s": round(_best_of(lazy, repeat), 4),
+            "eager_log_startup_s": round(_best_of(eager, repeat), 4),
+            "legacy_json_startup_s": round(_best_of(legacy, repeat), 4),
+            "index_bytes": os.path.getsize(os.path.join(log_dir, "episodic.idx")),
+            "log_bytes": log_bytes,
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory startup benchmark")
+    parser.add_argument("--traces", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps([run(n, args.repeat) for n in args.traces], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from src.core.search import FileSearcher
+
+# Benchmarks the search_files step on a synthetic repository (default 50k
+# files, ~5% binary, plus a .gitignore'd node_modules tree), comparing the
+# previous line-by-line os.walk scan with the new scanner and trigram index.
+#
+#   python -m src.bench.search --files 50000
+
+WORDS = "def class return import self value result config handler request response data index".split()
+
+
+def _legacy_search(cwd: str, pattern: str, search_path: str = ".") -> dict:
+    # The pre-rewrite implementation, kept here as the baseline
+    matches = []
+    for root, _, files in os.walk(os.path.join(cwd, search_path)):
+        for file in files:
+            filepath = os.path.join(root, file)
+            try:
+                with open(filepath, "r", errors="ignore") as f:
+                    for i, line in enumerate(f, 1):
+                        if pattern in line:
+                            matches.append(f"{os.path.relpath(filepath, cwd)}:{i}: {line.strip()}")
+            except Exception:
+                pass
+    return {"matches": matches[:50], "count": len(matches)}
+
+
+def _populate(root: str, count: int, seed: int = 0):
+    rng = random.Random(seed)
+    with open(os.path.join(root, ".gitignore"), "w") as f:
+        f.write("node_modules/\n")
+    ignored = count // 10
+    for i in range(count):
+        base = "node_modules" if i < ignored else "src"
+        directory = os.path.join(root, base, f"pkg{i // 100}")
+        os.makedirs(directory, exist_ok=True)
+        # One needle per 5000 searchable files, starting with the first, so
+        # even small runs have a match outside node_modules
+        needle = i >= ignored and (i - ignored) % 5000 == 0
+        if i % 20 == 0 and not needle:
+            with open(os.path.join(directory, f"blob{i}.bin"), "wb") as f:
+                f.write(bytes(rng.getrandbits(8) for _ in range(2048)))
+            continue
+        lines = [" ".join(rng.choice(WORDS) for _ in range(8)) for _ in range(40)]
+        if needle:
+            lines[rng.randrange(40)] += " needle_marker"
+        with open(os.path.join(directory, f"mod{i}.py"), "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+def _time(fn):
+    start = time.perf_counter()
+    result = fn()
+    return round(time.perf_counter() - start, 4), result
+
+
+def run(count: int) -> dict:
+    root = tempfile.mkdtemp(prefix="search_bench_")
+    try:
+        _populate(root, count)
+        results = {"files": count}
+        results["legacy_rare_s"], legacy = _time(lambda: _legacy_search(root, "needle_marker"))
+        results["legacy_common_s"], _ = _time(lambda: _legacy_search(root, "handler"))
+
+        searcher = FileSearcher()
+        results["scan_rare_s"], found = _time(lambda: searcher.search(root, "needle_marker"))
+        results["scan_common_s"], _ = _time(lambda: searcher.search(root, "handler"))
+        results["scan_regex_s"], _ = _time(lambda: searcher.search(root, r"needle_\w+", regex=True))
+        results["scan_include_s"], _ = _time(lambda: searcher.search(root, "needle_marker", include="*.py"))
+
+        searcher.enable_index(root)
+        results["index_build_s"], _ = _time(lambda: searcher.search(root, "needle_marker"))
+        results["index_rare_s"], indexed = _time(lambda: searcher.search(root, "needle_marker"))
+
+        # Legacy scan also searched node_modules; compare matches outside it
+        legacy_src = [m for m in legacy["matches"] if not m.startswith("node_modules")]
+        results["matches"] = {"legacy_src": len(legacy_src), "scan": found["count"], "indexed": indexed["count"]}
+        return results
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="search_files benchmark")
+    parser.add_argument("--files", type=int, default=50000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.files), indent=2))
+
+
+if __name__ == "__main__":
+    main()
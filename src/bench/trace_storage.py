@@ -0,0 +1,113 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from src.core.log_store import SegmentedLog
+from src.core.memory import Memory
+
+# Compares on-disk size and full-history read time of episodic traces stored
+# whole (the previous format) against blob-encoded traces. The synthetic
+# history mimics real runs: plans with write_file steps carrying a few KB of
+# code, every step repeated in "steps", and failed attempts retried with the
+# same or a slightly changed plan.
+#
+#   python -m src.bench.trace_storage --traces 5000
+
+
+def _source(rng: random.Random, lines: int) -> str:
+    words = ["value", "result", "config", "handler", "request", "data", "index", "item"]
+    return "".join(
+        f"def {rng.choice(words)}_{i}(x):\n    return x + {rng.randrange(100)}  # {rng.choice(words)}\n"
+        for i in range(lines)
+    )
+
+
+def _history(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    files = {f"module_{i}.py": _source(rng, 40) for i in range(30)}
+    i = 0
+    while i < count:
+        task = f"task {rng.randrange(count // 4 + 1)}"
+        names = rng.sample(sorted(files), 3)
+        plan = [{"type": "write_file", "filename": name, "content": files[name]} for name in names]
+        plan.append({"type": "verify", "command": f"python {names[0]}"})
+        attempts = rng.choice([1, 1, 2, 3])
+        for attempt in range(attempts):
+            if attempt and rng.random() < 0.3:
+                # Small fix to one file; the rest of the plan is unchanged
+                plan = [dict(plan[0], content=plan[0]["content"] + f"# fix {attempt}\n")] + plan[1:]
+            failed = attempt < attempts - 1
+            steps = [{"step": step, "result": {"status": "success", "message": f"File {step.get('filename')} written."},
+                      "timing": {"start": 0.0, "end": 0.01, "duration": 0.01}} for step in plan[:-1]]
+            steps.append({"step": plan[-1], "result": {
+                "status": "failure" if failed else "success",
+                "stdout": "ok\n" * 5,
+                "stderr": "Traceback (most recent call last):\n  ...\nValueError: bad value\n" if failed else "",
+                "returncode": 1 if failed else 0}, "timing": {"start": 0.01, "end": 0.2, "duration": 0.19}})
+            yield {"task": task, "plan": plan, "steps": steps, "workspace": f"projects/ws_{i}",
+                   "status": "failure" if failed else "success", "timestamp": 1700000000 + i}
+            i += 1
+            if i >= count:
+                return
+
+
+def _bytes(directory: str) -> int:
+    return sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory)
+               if f.startswith(("episodic", "blobs")))
+
+
+def run(count: int) -> dict:
+    root = tempfile.mkdtemp(prefix="trace_storage_bench_")
+    try:
+        plain_dir = os.path.join(root, "plain")
+        SegmentedLog(plain_dir, "episodic", fsync=False).compact(_history(count))
+
+        blob_dir = os.path.join(root, "blob")
+        start = time.perf_counter()
+        shutil.copytree(plain_dir, blob_dir)
+        # First open migrates the whole-trace log to the blob format
+        Memory(os.path.join(root, "none.json"), log_dir=blob_dir, fsync=False)
+        migrate = time.perf_counter() - start
+
+        start = time.perf_counter()
+        plain = list(SegmentedLog(plain_dir, "episodic", fsync=False).records())
+        plain_read = time.perf_counter() - start
+
+        start = time.perf_counter()
+        memory = Memory(os.path.join(root, "none.json"), log_dir=blob_dir, fsync=False)
+        encoded = list(memory.episodic_log.records())
+        encoded_read = time.perf_counter() - start
+
+        start = time.perf_counter()
+        decoded = [memory.codec.decode(record) for record in encoded]
+        decode = time.perf_counter() - start
+        assert json.dumps(decoded, sort_keys=True) == json.dumps(plain, sort_keys=True)
+
+        plain_bytes, blob_bytes = _bytes(plain_dir), _bytes(blob_dir)
+        return {
+            "traces": count,
+            "plain_bytes": plain_bytes,
+            "blob_bytes": blob_bytes,
+            "size_ratio": round(plain_bytes / max(1, blob_bytes), 1),
+            "blobs": len(memory.blobs),
+            "migrate_s": round(migrate, 4),
+            "plain_read_s": round(plain_read, 4),
+            "blob_log_read_s": round(encoded_read, 4),
+            "blob_decode_s": round(decode, 4),
+        }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Episodic trace storage benchmark")
+    parser.add_argument("--traces", type=int, nargs="+", default=[5000])
+    args = parser.parse_args()
+    print(json.dumps([run(n) for n in args.traces], indent=2))
+
+
+if __name__ == "__main__":
+    main()
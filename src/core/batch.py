@@ -0,0 +1,110 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator, List
+import threading
+import time
+from src.core.coordinator import Coordinator
+
+PROCESS_STEP_TYPES = {"command", "verify"}
+_END = object()
+
+
+class ThrottledLLM:
+    # Caps the number of in-flight LLM requests shared by all batch workers
+    def __init__(self, llm, slots: threading.BoundedSemaphore):
+        self.llm = llm
+        self.slots = slots
+
+    def generate(self, prompt: str, system_instruction: str = None) -> str:
+        with self.slots:
+            return self.llm.generate(prompt, system_instruction)
+
+    def generate_stream(self, prompt: str, system_instruction: str = None) -> Iterator[str]:
+        # A slot is held only while waiting for the next chunk, not while the
+        # consumer runs steps between chunks, so a streamed plan whose steps
+        # take long does not starve the other workers of LLM calls
+        with self.slots:
+            stream = iter(self.llm.generate_stream(prompt, system_instruction))
+        try:
+            while True:
+                with self.slots:
+                    chunk = next(stream, _END)
+                if chunk is _END:
+                    return
+                yield chunk
+        finally:
+            if hasattr(stream, "close"):
+                stream.close()
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+
+class ThrottledExecutor:
+    # Caps the number of concurrently running subprocesses; file steps are not
+    # limited. The wait for a slot is reported as "queued" so that it is not
+    # learned as part of the command's duration.
+    def __init__(self, executor, slots: threading.BoundedSemaphore):
+        self.executor = executor
+        self.slots = slots
+
+    def execute_step(self, step: Dict[str, Any], cwd: str = ".") -> Dict[str, Any]:
+        if step.get("type") not in PROCESS_STEP_TYPES:
+            return self.executor.execute_step(step, cwd)
+        start = time.perf_counter()
+        with self.slots:
+            queued = time.perf_counter() - start
+            result = self.executor.execute_step(step, cwd)
+        return dict(result, queued=round(queued, 6))
+
+    def __getattr__(self, name):
+        return getattr(self.executor, name)
+
+
+class BatchRunner:
+    # Runs many tasks concurrently on one Coordinator. Each task gets its own
+    # workspace; memory, plan cache and the LLM connection pool are shared.
+    def __init__(self, coordinator: Coordinator, max_workers: int = 4,
+                 max_llm_calls: int = 2, max_processes: int = 4):
+        self.coordinator = coordinator
+        self.max_workers = max_workers
+        coordinator.planner.llm = ThrottledLLM(coordinator.planner.llm, threading.BoundedSemaphore(max_llm_calls))
+        coordinator.scheduler.executor = ThrottledExecutor(coordinator.scheduler.executor, threading.BoundedSemaphore(max_processes))
+        # Speculation cancels and releases sandboxes through its own reference
+        if coordinator.speculator is not None:
+            coordinator.speculator.executor = ThrottledExecutor(coordinator.speculator.executor,
+                                                                coordinator.scheduler.executor.slots)
+
+    def run(self, tasks: Iterable[str]) -> List[Dict[str, Any]]:
+        tasks = list(tasks)
+        results: List[Dict[str, Any]] = [None] * len(tasks)
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="task") as pool:
+            futures = {pool.submit(self._run_one, task): i for i, task in enumerate(tasks)}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+        return results
+
+    def _run_one(self, task: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            workspace = self.coordinator.run(task)
+        except Exception as e:
+            return {"task": task, "workspace": None, "status": "error", "error": str(e),
+                    "seconds": round(time.perf_counter() - start, 3)}
+        traces = self.coordinator.memory.find_traces(workspace=workspace)
+        return {
+            "task": task,
+            "workspace": workspace,
+            "status": traces[0]["status"] if traces else "unknown",
+            "attempts": len(traces),
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+
+
+def read_tasks(lines: Iterable[str]) -> List[str]:
+    # One task per line; blank lines and "#" comments are ignored
+    tasks = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            tasks.append(line)
+    return tasks
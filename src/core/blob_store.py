@@ -0,0 +1,228 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Tuple
+import hashlib
+import json
+import os
+import struct
+import threading
+import zlib
+
+# Pack record: magic, 12-byte digest, payload length, zlib payload
+_HEADER = struct.Struct(">c12sI")
+_MAGIC = b"B"
+# Index record: digest, pack offset of the payload, payload length
+_INDEX = struct.Struct(">12sQI")
+
+# Values at least this large are stored as blobs rather than inline
+INLINE_LIMIT = 256
+ENCODED_VERSION = 2
+# Step fields that can hold whole files (write_file content, edit_file diff)
+_TEXT_FIELDS = ("content", "diff")
+
+
+def blob_hash(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()[:24]
+
+
+class BlobStore:
+    # Content-addressed, zlib-compressed blobs in one append-only pack file.
+    # Identical content is stored once. A sidecar index of fixed-size entries
+    # maps digests to pack offsets; it is read on first use, and pack records
+    # written after its last entry (e.g. before a crash) are recovered by
+    # scanning just that tail. Blobs are fsync'ed before the trace that
+    # references them is appended, so the log never points at missing data;
+    # inside batch() the pack is fsync'ed once when the batch ends rather than
+    # once per blob.
+    def __init__(self, directory: str, name: str = "blobs", fsync: bool = True, cache_size: int = 1024):
+        self.pack_file = os.path.join(directory, f"{name}.pack")
+        self.index_file = os.path.join(directory, f"{name}.idx")
+        self.fsync = fsync
+        self.cache_size = cache_size
+        self._offsets: Dict[bytes, Tuple[int, int]] = None
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._reader = None
+        self._lock = threading.RLock()
+        # Per thread: open batch() depth and whether it wrote unsynced blobs
+        self._batch = threading.local()
+        os.makedirs(directory, exist_ok=True)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.pack_file)
+
+    def create(self):
+        open(self.pack_file, "ab").close()
+
+    def put(self, data: bytes) -> str:
+        key = blob_hash(data)
+        digest = bytes.fromhex(key)
+        with self._lock:
+            offsets = self._load()
+            if digest in offsets:
+                return key
+            payload = zlib.compress(data, 6)
+            with open(self.pack_file, "ab") as f:
+                offset = f.tell() + _HEADER.size
+                f.write(_HEADER.pack(_MAGIC, digest, len(payload)) + payload)
+                f.flush()
+                if self.fsync:
+                    if getattr(self._batch, "depth", 0):
+                        self._batch.dirty = True
+                    else:
+                        os.fsync(f.fileno())
+            with open(self.index_file, "ab") as f:
+                f.write(_INDEX.pack(digest, offset, len(payload)))
+            offsets[digest] = (offset, len(payload))
+        return key
+
+    @contextmanager
+    def batch(self):
+        # Blobs put by this thread inside the block are durable when it exits
+        self._batch.depth = getattr(self._batch, "depth", 0) + 1
+        try:
+            yield self
+        finally:
+            self._batch.depth -= 1
+            if not self._batch.depth and getattr(self._batch, "dirty", False):
+                self._batch.dirty = False
+                with open(self.pack_file, "rb") as f:
+                    os.fsync(f.fileno())
+
+    def get(self, key: str) -> bytes:
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            offset, length = self._load()[bytes.fromhex(key)]
+            if self._reader is None:
+                self._reader = open(self.pack_file, "rb")
+            self._reader.seek(offset)
+            data = zlib.decompress(self._reader.read(length))
+            self._cache[key] = data
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return data
+
+    def put_json(self, value: Any) -> str:
+        return self.put(json.dumps(value, sort_keys=True).encode("utf-8"))
+
+    def get_json(self, key: str) -> Any:
+        return json.loads(self.get(key))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load())
+
+    def _load(self) -> Dict[bytes, Tuple[int, int]]:
+        if self._offsets is not None:
+            return self._offsets
+        offsets: Dict[bytes, Tuple[int, int]] = {}
+        pack_size = os.path.getsize(self.pack_file) if os.path.exists(self.pack_file) else 0
+        end = 0
+        if os.path.exists(self.index_file):
+            with open(self.index_file, "rb") as f:
+                data = f.read()
+            data = data[:len(data) - len(data) % _INDEX.size]
+            for digest, offset, length in _INDEX.iter_unpack(data):
+                if offset + length > pack_size:
+                    break
+                offsets[digest] = (offset, length)
+                end = max(end, offset + length)
+        if end < pack_size:
+            self._recover(offsets, end, pack_size)
+        self._offsets = offsets
+        return offsets
+
+    def _recover(self, offsets: Dict[bytes, Tuple[int, int]], start: int, pack_size: int):
+        # Re-index pack records past the index's last entry; drop a torn final record
+        with open(self.pack_file, "rb+") as f:
+            position = start
+            while position + _HEADER.size <= pack_size:
+                f.seek(position)
+                magic, digest, length = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != _MAGIC or position + _HEADER.size + length > pack_size:
+                    break
+                offsets[digest] = (position + _HEADER.size, length)
+                position += _HEADER.size + length
+            if position < pack_size:
+                f.truncate(position)
+        # Rewrite the index so it matches the pack exactly
+        tmp_path = self.index_file + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(b"".join(_INDEX.pack(digest, offset, length) for digest, (offset, length) in offsets.items()))
+        os.replace(tmp_path, self.index_file)
+
+
+class TraceCodec:
+    # Stores traces as references into a BlobStore. Every step is a blob (with
+    # large write_file contents and edit_file diffs split into blobs of their
+    # own), a plan is a
+    # blob listing its step hashes, and large step results are blobs, so a plan
+    # retried unchanged, or a file written again with the same content, costs a
+    # few hashes instead of a full copy. Scalar fields (task, status, ...) stay
+    # inline so the trace index can still read them. Records without the
+    # version marker are returned as they are (pre-blob format).
+    def __init__(self, blobs: BlobStore):
+        self.blobs = blobs
+
+    def encode(self, trace: Dict[str, Any]) -> Dict[str, Any]:
+        if trace.get("$v") == ENCODED_VERSION:
+            return trace
+        encoded = {k: v for k, v in trace.items() if k not in ("plan", "steps")}
+        encoded["$v"] = ENCODED_VERSION
+        # One fsync for all of the trace's new blobs, before it is logged
+        with self.blobs.batch():
+            if "plan" in trace:
+                encoded["plan"] = self.blobs.put_json([self._put_step(step) for step in trace["plan"] or []])
+            if "steps" in trace:
+                encoded["steps"] = [self._encode_record(record) for record in trace["steps"]]
+        return encoded
+
+    def decode(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        if record.get("$v") != ENCODED_VERSION:
+            return record
+        trace = {k: v for k, v in record.items() if k != "$v"}
+        # Plan steps reappear in the step records; decode each once per trace
+        steps: Dict[str, Any] = {}
+        if "plan" in record:
+            trace["plan"] = [self._get_step(key, steps) for key in self.blobs.get_json(record["plan"])]
+        if "steps" in record:
+            trace["steps"] = [self._decode_record(item, steps) for item in record["steps"]]
+        return trace
+
+    def _put_step(self, step: Any) -> str:
+        if isinstance(step, dict):
+            for field in _TEXT_FIELDS:
+                if isinstance(step.get(field), str) and len(step[field]) >= INLINE_LIMIT:
+                    step = dict(step, **{field: {"$blob": self.blobs.put(step[field].encode("utf-8"))}})
+        return self.blobs.put_json(step)
+
+    def _get_step(self, key: str, seen: Dict[str, Any]) -> Any:
+        if key in seen:
+            return seen[key]
+        step = seen[key] = self.blobs.get_json(key)
+        if isinstance(step, dict):
+            for field in _TEXT_FIELDS:
+                if isinstance(step.get(field), dict) and "$blob" in step[field]:
+                    step[field] = self.blobs.get(step[field]["$blob"]).decode("utf-8")
+        return step
+
+    def _encode_record(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        encoded = dict(record)
+        if "step" in record:
+            encoded["step"] = self._put_step(record["step"])
+        result = record.get("result")
+        if result is not None:
+            data = json.dumps(result, sort_keys=True)
+            if len(data) >= INLINE_LIMIT:
+                encoded["result"] = {"$blob": self.blobs.put(data.encode("utf-8"))}
+        return encoded
+
+    def _decode_record(self, record: Dict[str, Any], seen: Dict[str, Any]) -> Dict[str, Any]:
+        decoded = dict(record)
+        if "step" in record:
+            decoded["step"] = self._get_step(record["step"], seen)
+        result = record.get("result")
+        if isinstance(result, dict) and set(result) == {"$blob"}:
+            decoded["result"] = json.loads(self.blobs.get(result["$blob"]))
+        return decoded
@@ -1,20 +1,70 @@
+import os
 from src.core.detector import EnvironmentDetector
 from src.core.memory import Memory
 from src.core.planner import Planner
 from src.core.executor import Executor
+from src.core.scheduler import StepScheduler
 from src.core.reflector import Reflector
+from src.core.plan_cache import PlanCache
+from src.core.tree_view import TreeCache
+from src.core.supervisor import ProcessSupervisor
+from src.core.timeouts import TimeoutModel
+from src.core.verify_cache import VerifyCache
+from src.core.resume import ResumingExecutor
+from src.core.snapshot import WorkspaceSnapshots
+from src.core.speculate import SpeculativeRunner
+from src.core.workspace_hash import WorkspaceHasher
 from src.utils.llm import LLM
+from src.utils.tracing import span
 
 class Coordinator:
-    def __init__(self):
-        self.detector = EnvironmentDetector()
+    def __init__(self, plan_cache_size: int = 256, stream: bool = False, max_parallel_steps: int = 4,
+                 probe_tool_versions: bool = False, resume: bool = False,
+                 prompt_budget: int = 6000, llm=None, rollback: bool = False,
+                 speculate: int = 0, speculate_workers: int = None, verify_cache: bool = True):
         self.memory = Memory()
-        self.llm = LLM()
-        self.planner = Planner(self.llm, self.memory)
-        self.executor = Executor()
+        self.detector = EnvironmentDetector(cache_file=os.path.join(self.memory.log_dir, "tools.json"))
+        self.probe_tool_versions = probe_tool_versions
+        # Any object with generate/generate_stream works, e.g. a ReplayLLM
+        self.llm = llm or LLM()
+        # Failed attempts leave no trace in the workspace with rollback or speculation
+        self.planner = Planner(self.llm, self.memory, prompt_budget=prompt_budget,
+                               rollback=rollback or speculate > 1)
+        self.supervisor = ProcessSupervisor(log_dir=os.path.join(self.memory.log_dir, "processes"))
+        # Command timeouts are learned from the durations of recent runs
+        self.timeouts = TimeoutModel(history=lambda: self.memory.find_traces(limit=500))
+        self.executor = Executor(supervisor=self.supervisor, timeouts=self.timeouts)
+        # Resume mode: a retry keeps the steps that succeeded, asks the planner only
+        # for the rest, and skips kept steps whose effects are already in place
+        self.resume = resume
+        self.hasher = WorkspaceHasher()
+        # Verify steps that already passed on identical workspace content and tools are not re-run
+        self.verify_cache = VerifyCache(self.executor, hasher=self.hasher,
+                                        fingerprint=self.detector.tool_fingerprint) if verify_cache else None
+        step_executor = self.verify_cache or self.executor
+        self.resumer = ResumingExecutor(step_executor, hasher=self.hasher) if resume else None
+        # Rollback mode: the workspace is snapshotted before the first attempt
+        # and restored before each retry, so a plan never runs on top of a
+        # failed attempt's leftovers
+        self.snapshots = WorkspaceSnapshots(os.path.join(self.memory.log_dir, "snapshots"),
+                                            hasher=self.hasher) if rollback else None
+        self.scheduler = StepScheduler(self.resumer or step_executor, max_concurrency=max_parallel_steps)
+        # Speculation: each attempt races several candidate plans in copies of the workspace
+        self.speculator = SpeculativeRunner(self.planner, self.scheduler, self.executor, self.supervisor,
+                                            candidates=speculate, max_workers=speculate_workers,
+                                            forget=self._forget_workspace) if speculate > 1 else None
         self.reflector = Reflector(self.memory)
+        self.plan_cache = PlanCache(max_entries=plan_cache_size)
+        self.plan_cache.load_rules(self.memory.get_procedural_rules(), score=self.memory.procedural.quality)
+        self.tree_cache = TreeCache()
+        # Stream plans from the LLM and start executing steps as they arrive
+        self.stream = stream
 
     def run(self, task: str, workspace_path: str = None) -> str:
+        with span("task", "coordinator", task=task[:80]):
+            return self._run(task, workspace_path)
+
+    def _run(self, task: str, workspace_path: str = None) -> str:
         print(f"Starting task: {task}")
         
         # 0. Create or Reuse Workspace
@@ -23,72 +73,183 @@ class Coordinator:
         print(f"Workspace: {workspace_path}")
         
         # 1. Detect Environment
-        env_info = {
-            "os": self.detector.detect_os(),
-            "shell": self.detector.detect_shell(),
-            "tools": self.detector.scan_tools(),
-            "files": self._generate_tree_view(workspace_path),
-            "cwd": workspace_path
-        }
+        with span("detect", "environment"):
+            env_info = {
+                "os": self.detector.detect_os(),
+                "shell": self.detector.detect_shell(),
+                "tools": self.detector.scan_tools(),
+                "files": self._generate_tree_view(workspace_path),
+                "cwd": workspace_path
+            }
+            if self.probe_tool_versions:
+                env_info["tool_versions"] = self.detector.tool_versions()
         print(f"Environment: {env_info}")
+        fingerprint = self.detector.fingerprint(env_info)
 
         # 2. Plan & Execute Loop
         max_retries = 50
         attempt = 0
         feedback = None
+        completed = []
+        rollback_info = None
+        snapshot_info = None
+        if self.snapshots is not None:
+            with span("snapshot", "workspace") as snapshot_span:
+                snapshot_info = self.snapshots.capture(workspace_path)
+                snapshot_span.set(**snapshot_info)
+            print(f"Workspace snapshot: {snapshot_info}")
         
         while attempt < max_retries:
             attempt += 1
             print(f"--- Attempt {attempt}/{max_retries} ---")
+            if attempt > 1:
+                # Servers from the failed attempt would hold ports and files
+                stopped = self.supervisor.stop_workspace(workspace_path)
+                if stopped:
+                    print(f"Stopped {stopped} background process(es) from the previous attempt")
+                if self.snapshots is not None:
+                    with span("restore", "workspace") as restore_span:
+                        rollback_info = self.snapshots.restore(workspace_path)
+                        restore_span.set(**(rollback_info or {}))
+                    self.executor.searcher.mark_stale(workspace_path)
+                    print(f"Rolled back workspace: {rollback_info}")
+                # Cheap: only directories whose mtime changed are re-listed
+                env_info["files"] = self._generate_tree_view(workspace_path)
             
-            # Plan
-            plan = self.planner.create_plan(task, env_info, feedback)
-            print(f"Plan: {plan}")
+            # Plan: replay a verified plan for the same task and environment
+            # if we have one, otherwise ask the LLM
+            plan = self.plan_cache.get(task, fingerprint) if attempt == 1 else None
+            replayed = plan is not None
+            speculation = None
+            # Filled by the planner for this attempt's prompt only (batch tasks share the planner)
+            usage = {}
+            if replayed:
+                print(f"Replaying cached plan ({self.plan_cache.stats()})")
+                steps = plan
+            elif self.speculator is not None:
+                # Candidates are planned and executed here; the chosen one is
+                # recorded below as this attempt
+                with span("speculate", "planner", attempt=attempt) as speculate_span:
+                    speculation = self.speculator.run(task, env_info, feedback, workspace_path, completed)
+                    speculate_span.set(**{k: v for k, v in speculation["stats"].items() if k != "per_candidate"})
+                chosen = speculation["best"]
+                plan = steps = chosen["plan"] if chosen else list(completed)
+            elif self.stream:
+                plan = list(completed)
+                steps = self._stream_steps(task, env_info, feedback, plan, completed, usage)
+            else:
+                with span("plan", "planner", attempt=attempt):
+                    plan = completed + self.planner.create_plan(task, env_info, feedback, completed=completed or None,
+                                                                usage=usage)
+                steps = plan
+            if (not self.stream or replayed) and speculation is None:
+                print(f"Plan: {plan}")
 
             # Execute
             execution_trace = {
                 "task": task,
                 "plan": plan,
                 "steps": [],
-                "workspace": workspace_path
+                "workspace": workspace_path,
+                "fingerprint": fingerprint,
+                "replayed": replayed,
+                "resumed_steps": len(completed) if not replayed else 0
             }
+            # Cost of the rollback machinery: capture before the first attempt, restore before retries
+            if attempt == 1 and snapshot_info is not None:
+                execution_trace["snapshot"] = snapshot_info
+            elif rollback_info is not None:
+                execution_trace["rollback"] = rollback_info
             
-            success = True
+            # Steps run in plan order unless they declare depends_on, in which
+            # case independent steps run concurrently
+            if speculation is not None:
+                execution_trace["speculation"] = speculation["stats"]
+                print(f"Speculation: {speculation['stats']}")
+                if chosen is not None:
+                    outcome = chosen["outcome"]
+                else:
+                    error = "; ".join(r.get("error", r["status"]) for r in speculation["candidates"])
+                    outcome = {"status": "failure", "steps": [], "timing": {},
+                               "failed": {"step": {}, "result": {"status": "error", "error": f"No candidate plan ran: {error}"}}}
+            else:
+                with span("execute", "executor", attempt=attempt, streamed=self.stream and not replayed) as execute_span:
+                    outcome = self.scheduler.run(steps, cwd=workspace_path)
+                    execute_span.set(status=outcome["status"], steps=len(outcome["steps"]))
+            execution_trace["steps"] = outcome["steps"]
+            execution_trace["timing"] = outcome["timing"]
+            if speculation is not None:
+                execution_trace["prompt_tokens"] = speculation["stats"]["prompt_tokens"]
+            elif not replayed:
+                execution_trace["prompt_tokens"] = usage.get("total", {}).get("tokens")
+            for record in outcome["steps"]:
+                self.tree_cache.note_step(record["step"], workspace_path)
+            print(f"Execution timing: {outcome['timing']}")
+
+            success = outcome["status"] == "success"
             error_message = ""
-            
-            for step in plan:
-                result = self.executor.execute_step(step, cwd=workspace_path)
-                execution_trace["steps"].append({
-                    "step": step,
-                    "result": result
-                })
-                
-                if result["status"] != "success":
-                    success = False
-                    # Capture error for feedback
-                    error_message = result.get("stderr") or result.get("error") or result.get("reason") or "Unknown error"
-                    
-                    if step.get("type") == "verify":
-                        print(f"❌ VERIFICATION FAILED: {error_message}")
-                    else:
-                        print(f"Step failed: {result}")
-                    break
+            if not success:
+                step, result = outcome["failed"]["step"], outcome["failed"]["result"]
+                # Capture error for feedback
+                error_message = result.get("stderr") or result.get("error") or result.get("reason") or "Unknown error"
+                if result.get("timed_out"):
+                    error_message = f"{result['error']}\n{result.get('stderr') or result.get('stdout') or ''}"
+
+                if step.get("type") == "verify":
+                    print(f"❌ VERIFICATION FAILED: {error_message}")
+                else:
+                    print(f"Step failed: {result}")
             
             execution_trace["status"] = "success" if success else "failure"
             self.memory.add_trace(execution_trace)
+            self.timeouts.observe(execution_trace)
             
             if success:
                 print("Task completed successfully.")
+                self.plan_cache.put(task, fingerprint, plan)
                 break
             else:
+                self.reflector.observe_failure(execution_trace)
+                if replayed:
+                    self.plan_cache.invalidate(task, fingerprint)
+                if self.resume:
+                    completed = [r["step"] for r in outcome["steps"] if r["result"].get("status") == "success"]
                 feedback = f"Execution failed at step: {step}. Error: {error_message}"
+                if speculation is not None:
+                    others = [r for r in speculation["candidates"] if r is not chosen and r.get("error")]
+                    if others:
+                        feedback += "\nOther candidate plans failed too:\n" + "".join(
+                            f"- candidate {r['candidate']}: {r['error']}\n" for r in others)
                 print(f"Attempt failed. Retrying with feedback: {feedback}")
 
+        self.supervisor.stop_workspace(workspace_path)
+        if self.resumer is not None:
+            self.resumer.forget(workspace_path)
+        if self.snapshots is not None:
+            self.snapshots.discard(workspace_path)
+
         # 4. Reflect
-        self.reflector.reflect(execution_trace)
+        with span("reflect", "memory"):
+            self.reflector.reflect(execution_trace, attempts=attempt)
         
         return workspace_path
 
+    def _forget_workspace(self, path: str):
+        # Per-workspace caches of a workspace that no longer exists
+        self.hasher.forget(path)
+        if self.resumer is not None:
+            self.resumer.forget(path)
+
+    def _stream_steps(self, task: str, env_info: dict, feedback: str, plan: list, completed: list = None,
+                      usage: dict = None):
+        # Kept steps are already in plan; they start while the patch is generated
+        yield from completed or []
+        for step in self.planner.create_plan_stream(task, env_info, feedback, completed=completed or None,
+                                                    usage=usage):
+            print(f"Plan step: {step}")
+            plan.append(step)
+            yield step
+
     def _create_workspace(self, task: str) -> str:
         import datetime
         import re
@@ -96,39 +257,26 @@ class Coordinator:
         
         # Create projects directory
         projects_dir = "projects"
-        if not os.path.exists(projects_dir):
-            os.makedirs(projects_dir)
+        os.makedirs(projects_dir, exist_ok=True)
             
         # Generate slug
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         slug = re.sub(r'[^a-zA-Z0-9]', '_', task[:30]).lower()
         folder_name = f"{timestamp}_{slug}"
         workspace_path = os.path.join(projects_dir, folder_name)
-        
-        if not os.path.exists(workspace_path):
-            os.makedirs(workspace_path)
-            
-        return workspace_path
 
-    def _generate_tree_view(self, directory: str, prefix: str = "") -> str:
-        import os
-        if not os.path.exists(directory):
-            return ""
-            
-        tree_str = ""
-        items = sorted(os.listdir(directory))
-        items = [i for i in items if i not in [".git", "__pycache__", ".venv", ".env"]]
-        
-        for i, item in enumerate(items):
-            path = os.path.join(directory, item)
-            is_last = (i == len(items) - 1)
-            
-            connector = "└── " if is_last else "├── "
-            tree_str += f"{prefix}{connector}{item}\n"
-            
-            if os.path.isdir(path):
-                extension = "    " if is_last else "│   "
-                tree_str += self._generate_tree_view(path, prefix + extension)
-                
-        return tree_str
+        # Concurrent tasks can share a timestamp and slug; claim a unique folder
+        suffix = 1
+        while True:
+            try:
+                os.makedirs(workspace_path)
+                return workspace_path
+            except FileExistsError:
+                suffix += 1
+                workspace_path = os.path.join(projects_dir, f"{folder_name}_{suffix}")
 
+    def _generate_tree_view(self, directory: str) -> str:
+        with span("tree", "environment") as tree_span:
+            tree = self.tree_cache.render(directory)
+            tree_span.set(chars=len(tree))
+        return tree
@@ -1,8 +1,37 @@
 import platform
 import shutil
 import os
+import hashlib
+import json
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Expanded list of common development tools
+TOOLS = [
+    "python", "git", "docker", "node", "npm",
+    "gcc", "g++", "make", "cmake",
+    "go", "rustc", "cargo",
+    "java", "javac", "mvn", "gradle"
+]
+
+# Tools that do not understand "--version"
+VERSION_ARGS = {
+    "go": ["version"],
+    "java": ["-version"],
+    "javac": ["-version"],
+}
 
 class EnvironmentDetector:
+    def __init__(self, cache_file: str = None, probe_timeout: float = 2.0):
+        # Tool lookups are cached in-process and, if cache_file is set, on disk.
+        # Both are keyed on PATH and the mtimes of its directories, so they are
+        # invalidated exactly when a tool could have appeared or disappeared.
+        self.cache_file = cache_file
+        self.probe_timeout = probe_timeout
+        self._cache = None
+        self._lock = threading.Lock()
+
     def detect_os(self) -> str:
         return platform.system()
 
@@ -11,22 +40,103 @@ class EnvironmentDetector:
         shell_env = os.environ.get('SHELL')
         if shell_env:
             return os.path.basename(shell_env)
-            
+
         if platform.system() == "Windows":
             return "powershell"
         return "bash"
 
     def scan_tools(self) -> dict:
-        # Expanded list of common development tools
-        tools = [
-            "python", "git", "docker", "node", "npm",
-            "gcc", "g++", "make", "cmake",
-            "go", "rustc", "cargo",
-            "java", "javac", "mvn", "gradle"
-        ]
-        found_tools = {}
-        for tool in tools:
-            path = shutil.which(tool)
-            if path:
-                found_tools[tool] = path
-        return found_tools
+        with self._lock:
+            return dict(self._load()["tools"])
+
+    def tool_versions(self) -> dict:
+        # Probes every found tool concurrently; each probe is cut off after
+        # probe_timeout seconds. Results are cached alongside the tool paths.
+        with self._lock:
+            cache = self._load()
+            if cache.get("versions") is None:
+                tools = cache["tools"]
+                with ThreadPoolExecutor(max_workers=max(1, len(tools))) as pool:
+                    probes = {tool: pool.submit(self._probe_version, tool, path) for tool, path in tools.items()}
+                    cache["versions"] = {tool: probe.result() for tool, probe in probes.items()}
+                self._save(cache)
+            return dict(cache["versions"])
+
+    def fingerprint(self, env_info: dict) -> str:
+        # Stable identifier for the parts of the environment a plan depends on
+        key = {
+            "os": env_info.get("os"),
+            "shell": env_info.get("shell"),
+            "tools": sorted(env_info.get("tools", {})),
+        }
+        return hashlib.sha1(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+    def tool_fingerprint(self) -> str:
+        # Changes whenever PATH or one of its directories changes, i.e. when a
+        # tool may have been installed, removed or replaced
+        with self._lock:
+            key = self._load()["key"]
+        return hashlib.sha1(f"{self.detect_os()}\0{self.detect_shell()}\0{key}".encode("utf-8")).hexdigest()[:16]
+
+    def _path_key(self) -> str:
+        path = os.environ.get("PATH", "")
+        parts = [path, os.environ.get("PATHEXT", "")]
+        for directory in path.split(os.pathsep):
+            try:
+                parts.append(str(os.stat(directory).st_mtime_ns))
+            except OSError:
+                parts.append("-")
+        return hashlib.sha1("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def _load(self) -> dict:
+        key = self._path_key()
+        if self._cache is not None and self._cache["key"] == key:
+            return self._cache
+
+        cache = None
+        if self.cache_file and os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, "r") as f:
+                    cache = json.load(f)
+            except (OSError, ValueError):
+                cache = None
+        if not cache or cache.get("key") != key or cache.get("tool_list") != TOOLS:
+            found_tools = {}
+            for tool in TOOLS:
+                path = shutil.which(tool)
+                if path:
+                    found_tools[tool] = path
+            cache = {"key": key, "tool_list": TOOLS, "tools": found_tools, "versions": None}
+            self._save(cache)
+        self._cache = cache
+        return cache
+
+    def _save(self, cache: dict):
+        if not self.cache_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+            tmp_path = self.cache_file + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(cache, f)
+            os.replace(tmp_path, self.cache_file)
+        except OSError:
+            pass
+
+    def _probe_version(self, tool: str, path: str) -> str:
+        try:
+            result = subprocess.run(
+                [path] + VERSION_ARGS.get(tool, ["--version"]),
+                capture_output=True,
+                text=True,
+                timeout=self.probe_timeout
+            )
+        except subprocess.TimeoutExpired:
+            return "unknown (timed out)"
+        except OSError as e:
+            return f"unknown ({e})"
+        output = (result.stdout or "") + (result.stderr or "")
+        for line in output.splitlines():
+            if line.strip():
+                return line.strip()[:120]
+        return "unknown"
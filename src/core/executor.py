@@ -1,14 +1,76 @@
-import subprocess
 from typing import Dict, Any
+import os
+import threading
+from src.core.file_edit import PatchError, apply_replacements, apply_unified_diff, read_range, write_atomic
+from src.core.search import FileSearcher
+from src.core.supervisor import ProcessSupervisor
+from src.core.timeouts import TimeoutModel
+from src.utils.process import run_streaming
+from src.utils.tracing import span
 
 class Executor:
+    def __init__(self, search_index: bool = False, max_output_bytes: int = 16384, echo_output: bool = True,
+                 supervisor: ProcessSupervisor = None, timeouts: TimeoutModel = None, max_read_bytes: int = 65536):
+        # With search_index, each workspace keeps a trigram index that is
+        # updated after write_file steps and revalidated by stat before searches
+        self.searcher = FileSearcher()
+        self.search_index = search_index
+        # Command output is streamed to the console; only a bounded head+tail
+        # of each stream is kept in the result (and so in memory and prompts)
+        self.max_output_bytes = max_output_bytes
+        self.echo_output = echo_output
+        # Background steps are handed to the supervisor, which drains their
+        # output to log files and kills them when the task ends or retries
+        self.supervisor = supervisor or ProcessSupervisor()
+        # A step's own "timeout" wins; otherwise the model's learned or default limit
+        self.timeouts = timeouts or TimeoutModel()
+        # read_file returns at most this much per step unless the step asks for less
+        self.max_read_bytes = max_read_bytes
+        # Workspaces registered with cancellable(): cancel() kills their running
+        # command and fails their further steps
+        self._cancel: Dict[str, threading.Event] = {}
+        # Sandboxes registered with alias(): their commands get the timeouts
+        # learned for the workspace they were copied from
+        self._aliases: Dict[str, str] = {}
+
     def execute_step(self, step: Dict[str, Any], cwd: str = ".") -> Dict[str, Any]:
+        with span("step", "executor", type=step.get("type")) as step_span:
+            result = self._dispatch(step, cwd)
+            target = step.get("command") or step.get("filename") or step.get("pattern") or ""
+            step_span.set(status=result.get("status"), target=str(target)[:80])
+        return result
+
+    def cancellable(self, cwd: str):
+        self._cancel[os.path.abspath(cwd)] = threading.Event()
+
+    def cancel(self, cwd: str):
+        event = self._cancel.get(os.path.abspath(cwd))
+        if event is not None:
+            event.set()
+
+    def alias(self, cwd: str, workspace: str):
+        self._aliases[os.path.abspath(cwd)] = os.path.abspath(workspace)
+
+    def release(self, cwd: str):
+        # Forget per-workspace state of a workspace that is being deleted
+        self._cancel.pop(os.path.abspath(cwd), None)
+        self._aliases.pop(os.path.abspath(cwd), None)
+        self.searcher.forget(cwd)
+
+    def _dispatch(self, step: Dict[str, Any], cwd: str) -> Dict[str, Any]:
         step_type = step.get("type")
+        cancel = self._cancel.get(os.path.abspath(cwd)) if self._cancel else None
+        if cancel is not None and cancel.is_set():
+            return {"status": "cancelled", "error": "Cancelled"}
+        if self.search_index:
+            self.searcher.enable_index(cwd)
         
         if step_type == "command":
             return self._execute_command(step, cwd)
         elif step_type == "write_file":
             return self._write_file(step, cwd)
+        elif step_type == "edit_file":
+            return self._edit_file(step, cwd)
         elif step_type == "read_file":
             return self._read_file(step, cwd)
         elif step_type == "search_files":
@@ -34,6 +96,11 @@ class Executor:
 
     def _verify_step(self, step: Dict[str, Any], cwd: str) -> Dict[str, Any]:
         print(f"--- VERIFICATION STEP: {step['command']} ---")
+        # Verify steps against a background server can wait for it to come up
+        if step.get("wait_for"):
+            not_ready = self.supervisor.wait_ready(cwd, step["wait_for"])
+            if not_ready:
+                return {"status": "failure", "error": f"Not ready: {not_ready}"}
         # Reuse command execution logic
         return self._execute_command(step, cwd)
             
@@ -41,45 +108,69 @@ class Executor:
 
     def _execute_command(self, step: Dict[str, Any], cwd: str) -> Dict[str, Any]:
         command = step["command"]
+        # Commands can touch any file; the search index must revalidate
+        self.searcher.mark_stale(cwd)
         is_background = step.get("background", False)
         
         print(f"Executing in {cwd}: {command} (Background: {is_background})")
         try:
             if is_background:
-                # Start process and return immediately
-                proc = subprocess.Popen(
-                    command,
-                    shell=True,
-                    cwd=cwd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE
-                )
-                return {
+                # Start process and return immediately (or once it is ready)
+                managed = self.supervisor.start(command, cwd)
+                result = {
                     "status": "success",
-                    "message": f"Command started in background with PID {proc.pid}",
-                    "pid": proc.pid
+                    "message": f"Command started in background with PID {managed.pid}",
+                    "pid": managed.pid,
+                    "log_file": managed.log_path
                 }
+                if step.get("ready"):
+                    not_ready = self.supervisor.wait_ready(cwd, step["ready"])
+                    if not_ready:
+                        result.update({
+                            "status": "failure",
+                            "error": f"Background command not ready: {not_ready}",
+                            "stdout": self.supervisor.tail(managed)
+                        })
+                return result
             else:
                 # Run synchronously
-                result = subprocess.run(
+                if step.get("timeout"):
+                    timeout, source = float(step["timeout"]), "step"
+                else:
+                    workspace = os.path.abspath(cwd)
+                    timeout, source = self.timeouts.timeout_for(command, self._aliases.get(workspace, workspace))
+                result = run_streaming(
                     command,
-                    shell=True,
-                    capture_output=True,
-                    text=True,
                     cwd=cwd,
-                    timeout=60 # Default timeout
+                    timeout=timeout,
+                    max_output_bytes=self.max_output_bytes,
+                    echo=self.echo_output,
+                    cancel=self._cancel.get(os.path.abspath(cwd)) if self._cancel else None
                 )
+                if result["cancelled"]:
+                    return {"status": "cancelled", "error": "Cancelled", "stdout": result["stdout"],
+                            "stderr": result["stderr"]}
+                if result["timed_out"]:
+                    return {
+                        "status": "failure",
+                        "error": f"Command timed out after {timeout:g} seconds ({source} timeout); "
+                                 f"partial output is included. Set \"timeout\" on the step if it needs longer.",
+                        "stdout": result["stdout"],
+                        "stderr": result["stderr"],
+                        "timed_out": True,
+                        "timeout": timeout,
+                        "timeout_source": source
+                    }
                 return {
-                    "status": "success" if result.returncode == 0 else "failure",
-                    "stdout": result.stdout,
-                    "stderr": result.stderr,
-                    "returncode": result.returncode
+                    "status": "success" if result["returncode"] == 0 else "failure",
+                    "stdout": result["stdout"],
+                    "stderr": result["stderr"],
+                    "returncode": result["returncode"],
+                    "stdout_bytes": result["stdout_bytes"],
+                    "stderr_bytes": result["stderr_bytes"],
+                    "timeout": timeout,
+                    "timeout_source": source
                 }
-        except subprocess.TimeoutExpired:
-            return {
-                "status": "failure",
-                "error": "Command timed out after 60 seconds."
-            }
         except Exception as e:
             return {
                 "status": "error",
@@ -95,51 +186,68 @@ class Executor:
         try:
             with open(path, "w") as f:
                 f.write(content)
+            self.searcher.note_write(cwd, filename)
             return {"status": "success", "message": f"File {filename} written."}
         except Exception as e:
             return {"status": "error", "error": str(e)}
 
+    def _edit_file(self, step: Dict[str, Any], cwd: str) -> Dict[str, Any]:
+        import os
+        filename = step["filename"]
+        path = os.path.join(cwd, filename)
+        print(f"Editing file: {path}")
+        try:
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                original = f.read()
+            # All hunks are applied in memory first; the file is only replaced
+            # if every one of them applies
+            if step.get("diff"):
+                content = apply_unified_diff(original, step["diff"])
+            elif step.get("edits"):
+                content = apply_replacements(original, step["edits"])
+            else:
+                return {"status": "error", "error": "edit_file needs 'diff' or 'edits'"}
+            if content == original:
+                return {"status": "success", "message": f"File {filename} unchanged."}
+            write_atomic(path, content)
+            self.searcher.note_write(cwd, filename)
+            return {"status": "success", "message": f"File {filename} edited.",
+                    "lines": content.count("\n") + (0 if content.endswith("\n") else 1)}
+        except PatchError as e:
+            return {"status": "failure", "error": f"Edit not applied, {filename} left unchanged: {e}"}
+        except Exception as e:
+            return {"status": "error", "error": str(e)}
+
     def _read_file(self, step: Dict[str, Any], cwd: str) -> Dict[str, Any]:
         import os
         filename = step["filename"]
         path = os.path.join(cwd, filename)
         print(f"Reading file: {path}")
         try:
-            with open(path, "r") as f:
-                content = f.read()
-            return {"status": "success", "content": content}
+            # Only the requested lines are read into memory, capped at max_bytes
+            max_bytes = min(int(step.get("max_bytes") or self.max_read_bytes), self.max_read_bytes)
+            result = read_range(path, start_line=max(1, int(step.get("start_line") or 1)),
+                                end_line=int(step["end_line"]) if step.get("end_line") else None,
+                                max_bytes=max_bytes)
+            return {"status": "success", **result}
         except Exception as e:
             return {"status": "error", "error": str(e)}
 
     def _search_files(self, step: Dict[str, Any], cwd: str) -> Dict[str, Any]:
-        import os
-        import subprocess
-        
         pattern = step["pattern"]
         search_path = step.get("path", ".")
-        
-        # Use grep (or findstr on windows if grep not available, but git bash usually has grep)
-        # For cross-platform python-only search:
+
         print(f"Searching for '{pattern}' in {search_path}")
-        matches = []
         try:
-            for root, _, files in os.walk(os.path.join(cwd, search_path)):
-                for file in files:
-                    filepath = os.path.join(root, file)
-                    try:
-                        with open(filepath, "r", errors='ignore') as f:
-                            for i, line in enumerate(f, 1):
-                                if pattern in line:
-                                    rel_path = os.path.relpath(filepath, cwd)
-                                    matches.append(f"{rel_path}:{i}: {line.strip()}")
-                    except:
-                        pass # Skip unreadable files
-            
-            return {
-                "status": "success", 
-                "matches": matches[:50], # Limit results
-                "count": len(matches)
-            }
+            return self.searcher.search(
+                cwd,
+                pattern,
+                path=search_path,
+                regex=step.get("regex", False),
+                ignore_case=step.get("ignore_case", False),
+                include=step.get("include"),
+                exclude=step.get("exclude"),
+                max_results=step.get("max_results", 50)
+            )
         except Exception as e:
             return {"status": "error", "error": str(e)}
-
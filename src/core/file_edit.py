@@ -0,0 +1,189 @@
+from typing import Any, Dict, List, Tuple
+import os
+import re
+import tempfile
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchError(ValueError):
+    pass
+
+
+def _split_lines(text: str) -> List[Tuple[str, str]]:
+    # (body, terminator) per line, split on "\n" only; the terminator is
+    # "\r\n", "\n" or "" (last line without a newline). Other characters
+    # str.splitlines() breaks on (\r, \x0b, \x0c, \u2028, ...) stay in the body.
+    lines = []
+    for line in text.split("\n"):
+        if line.endswith("\r"):
+            lines.append((line[:-1], "\r\n"))
+        else:
+            lines.append((line, "\n"))
+    # The piece after the last "\n" is empty, or a final line without one
+    body, _ = lines.pop()
+    if body:
+        lines.append((body, ""))
+    return lines
+
+
+def _parse_hunks(diff: str) -> List[Tuple[int, List[List]]]:
+    # Returns (old start line, [[tag, text, ends with newline]]) per hunk
+    hunks = []
+    current = None
+    targets = 0
+    lines = diff.split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()
+    for line in lines:
+        if line.endswith("\r"):
+            line = line[:-1]
+        if line.startswith("+++ "):
+            targets += 1
+            if targets > 1:
+                raise PatchError("diff touches more than one file; use one edit_file step per file")
+            continue
+        if line.startswith("--- ") and current is None:
+            continue
+        match = _HUNK_HEADER.match(line)
+        if match:
+            current = (int(match.group(1)), [])
+            hunks.append(current)
+            continue
+        if current is None:
+            # Preamble ("diff --git", "index ...")
+            continue
+        if line.startswith("\\"):
+            # "\ No newline at end of file" applies to the line before it
+            if current[1]:
+                current[1][-1][2] = False
+            continue
+        tag, text = (line[0], line[1:]) if line else (" ", "")
+        if tag not in " -+":
+            raise PatchError(f"unexpected line in hunk: {line[:80]!r}")
+        current[1].append([tag, text, True])
+    if not hunks:
+        raise PatchError("no hunks found (expected '@@ -a,b +c,d @@' headers)")
+    return hunks
+
+
+def _find(lines: List[str], block: List[str], expected: int) -> int:
+    # Exact match closest to the expected position, then the same ignoring trailing whitespace
+    if not block:
+        return min(max(expected, 0), len(lines))
+    last = len(lines) - len(block)
+    order = sorted(range(last + 1), key=lambda i: (abs(i - expected), i))
+    for normalize in (lambda s: s, str.rstrip):
+        wanted = [normalize(line) for line in block]
+        for i in order:
+            if normalize(lines[i]) == wanted[0] and [normalize(l) for l in lines[i:i + len(block)]] == wanted:
+                return i
+    return -1
+
+
+def apply_unified_diff(text: str, diff: str) -> str:
+    # Context lines keep the file's own text and line terminators; an added
+    # line takes the terminator of the removed line it replaces, or the file's
+    # newline style ("\r\n" if it has any)
+    newline = "\r\n" if "\r\n" in text else "\n"
+    lines = _split_lines(text)
+    offset = 0
+    for number, (start, ops) in enumerate(_parse_hunks(diff), 1):
+        old = [line for tag, line, _ in ops if tag != "+"]
+        # A zero-length old range ("@@ -2,0 +3 @@", as diff -U0 writes a pure
+        # insertion) names the line the insertion follows, not the first line
+        anchor = start - 1 if old else start
+        position = _find([body for body, _ in lines], old, anchor + offset)
+        if position < 0:
+            preview = "\n".join(old[:5])
+            raise PatchError(f"hunk {number} (at line {start}) does not match the file; expected:\n{preview}")
+        replacement = []
+        removed: List[str] = []
+        cursor = position
+        for tag, line, has_newline in ops:
+            if tag == "+":
+                ending = removed.pop(0) if removed else newline
+                replacement.append((line, (ending or newline) if has_newline else ""))
+                continue
+            body, ending = lines[cursor]
+            if tag == "-":
+                removed.append(ending)
+            else:
+                removed = []
+                replacement.append((body, ending if has_newline else ""))
+            cursor += 1
+        lines[position:cursor] = replacement
+        offset = position - anchor + len(replacement) - len(old)
+    # Lines that are no longer last need a terminator
+    return "".join(body + (ending or (newline if i < len(lines) - 1 else ""))
+                   for i, (body, ending) in enumerate(lines))
+
+
+def apply_replacements(text: str, edits: List[Dict[str, Any]]) -> str:
+    # Each edit: {"search": str, "replace": str, "all": bool}. Without "all"
+    # the search text must occur exactly once, so an edit never lands in the
+    # wrong place.
+    for number, edit in enumerate(edits, 1):
+        search, replace = edit.get("search"), edit.get("replace", "")
+        if not search:
+            raise PatchError(f"edit {number} has an empty 'search'")
+        count = text.count(search)
+        if count == 0:
+            raise PatchError(f"edit {number}: search text not found: {search[:120]!r}")
+        if count > 1 and not edit.get("all"):
+            raise PatchError(f"edit {number}: search text occurs {count} times; add context or set \"all\": true")
+        text = text.replace(search, replace)
+    return text
+
+
+def write_atomic(path: str, text: str):
+    # Write to a temp file in the same directory, then rename over the target,
+    # so readers see either the old or the new file; keeps the file's mode
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=".edit_", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        if os.path.exists(path):
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_range(path: str, start_line: int = 1, end_line: int = None, max_bytes: int = 65536) -> Dict[str, Any]:
+    # Streams the file line by line: only the requested lines (up to
+    # max_bytes) are kept, however large the file is.
+    kept: List[str] = []
+    size = 0
+    truncated = False
+    last = start_line - 1
+    total = 0
+    with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        for number, line in enumerate(f, 1):
+            total = number
+            if number < start_line or (end_line is not None and number > end_line) or truncated:
+                continue
+            encoded = len(line.encode("utf-8"))
+            if size + encoded > max_bytes:
+                truncated = True
+                if not kept:
+                    # A single line longer than the limit: return its head
+                    kept.append(line.encode("utf-8")[:max_bytes].decode("utf-8", errors="ignore"))
+                    last = number
+                continue
+            kept.append(line)
+            size += encoded
+            last = number
+    result = {
+        "content": "".join(kept),
+        "start_line": start_line,
+        "end_line": last,
+        "total_lines": total,
+        "truncated": truncated,
+    }
+    if truncated or last < min(total, end_line or total):
+        result["next_line"] = last + 1
+    return result
@@ -0,0 +1,191 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import json
+import os
+
+COMPACTED_MARKER = "__compacted__"
+
+
+# Append-only JSONL log split across numbered segment files. Appends cost
+# O(size of record). The log never compacts itself: only its owner knows
+# which records are superseded (append-only histories never are). Compaction
+# writes the given records into new segments of at most max_segment_bytes,
+# each starting with a marker line naming the first of them; that first
+# segment is renamed into place last, and on load the newest one supersedes
+# every lower-numbered segment. A crash during compaction leaves either the
+# old segments or the complete new set, never a mix.
+class SegmentedLog:
+    def __init__(self, directory: str, name: str, max_segment_bytes: int = 4 * 1024 * 1024, fsync: bool = True):
+        self.directory = directory
+        self.name = name
+        self.max_segment_bytes = max_segment_bytes
+        self.fsync = fsync
+        # Called with the new (segment, offset, length) of every record after a compaction
+        self.on_compact = None
+        os.makedirs(directory, exist_ok=True)
+        self.segments: List[int] = []
+        self._open_segments()
+
+    def is_empty(self) -> bool:
+        return not self.segments
+
+    def append(self, record: Dict[str, Any]) -> Tuple[int, int, int]:
+        line = (json.dumps(record) + "\n").encode("utf-8")
+        segment = self._active_segment(len(line))
+        with open(self._segment_path(segment), "ab") as f:
+            offset = f.tell()
+            f.write(line)
+            self._sync(f)
+        return segment, offset, len(line)
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        for _, _, _, record in self.scan():
+            yield record
+
+    def scan(self, start: Tuple[int, int] = (0, 0)) -> Iterator[Tuple[int, int, int, Dict[str, Any]]]:
+        for segment in list(self.segments):
+            if segment < start[0]:
+                continue
+            with open(self._segment_path(segment), "rb") as f:
+                offset = start[1] if segment == start[0] else 0
+                f.seek(offset)
+                for line in f:
+                    length = len(line)
+                    record = self._decode(line)
+                    if record is not None and COMPACTED_MARKER not in record:
+                        yield segment, offset, length, record
+                    offset += length
+
+    def read(self, segment: int, offset: int, length: int) -> Dict[str, Any]:
+        with open(self._segment_path(segment), "rb") as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def compact(self, records: Iterable[Dict[str, Any]]) -> List[Tuple[int, int, int]]:
+        head = (self.segments[-1] + 1) if self.segments else 1
+        marker = (json.dumps({COMPACTED_MARKER: head}) + "\n").encode("utf-8")
+        written: List[int] = []
+        locations = []
+        f = None
+        try:
+            for record in records:
+                line = (json.dumps(record) + "\n").encode("utf-8")
+                # A record larger than the cap gets a segment of its own
+                if f is None or (f.tell() > len(marker) and f.tell() + len(line) > self.max_segment_bytes):
+                    if f is not None:
+                        self._sync(f)
+                        f.close()
+                    written.append(head + len(written))
+                    f = open(self._segment_path(written[-1]) + ".tmp", "wb")
+                    f.write(marker)
+                locations.append((written[-1], f.tell(), len(line)))
+                f.write(line)
+            if f is None:
+                written.append(head)
+                f = open(self._segment_path(head) + ".tmp", "wb")
+                f.write(marker)
+            self._sync(f)
+        finally:
+            if f is not None:
+                f.close()
+        # The head goes last: until it is in place, the new segments are leftovers
+        for segment in written[1:] + written[:1]:
+            os.replace(self._segment_path(segment) + ".tmp", self._segment_path(segment))
+        self._sync_directory()
+
+        stale = self.segments
+        self.segments = written
+        for old in stale:
+            try:
+                os.remove(self._segment_path(old))
+            except OSError:
+                pass
+        if self.on_compact:
+            self.on_compact(locations)
+        return locations
+
+    def _open_segments(self):
+        numbers = []
+        prefix = f"{self.name}-"
+        for entry in os.listdir(self.directory):
+            if not entry.startswith(prefix):
+                continue
+            if entry.endswith(".jsonl.tmp"):
+                # Leftover from an interrupted compaction
+                os.remove(os.path.join(self.directory, entry))
+                continue
+            if entry.endswith(".jsonl"):
+                try:
+                    numbers.append(int(entry[len(prefix):-len(".jsonl")]))
+                except ValueError:
+                    pass
+        numbers.sort()
+
+        heads = {number: self._compacted_head(number) for number in numbers}
+        # Segments of a compaction whose head never made it into place
+        leftovers = [n for n, head in heads.items() if head is not None and heads.get(head) != head]
+        for old in leftovers:
+            os.remove(self._segment_path(old))
+        numbers = [n for n in numbers if n not in leftovers]
+        base = 0
+        for i in range(len(numbers) - 1, -1, -1):
+            if heads[numbers[i]] == numbers[i]:
+                base = i
+                break
+        for old in numbers[:base]:
+            os.remove(self._segment_path(old))
+        self.segments = numbers[base:]
+        if self.segments:
+            self._repair_tail(self.segments[-1])
+
+    def _repair_tail(self, segment: int):
+        # Drop a torn final line so the next append starts on a fresh line
+        path = self._segment_path(segment)
+        with open(path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def _active_segment(self, incoming: int) -> int:
+        if self.segments:
+            current = self.segments[-1]
+            path = self._segment_path(current)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            if size == 0 or size + incoming <= self.max_segment_bytes:
+                return current
+        segment = (self.segments[-1] + 1) if self.segments else 1
+        self.segments.append(segment)
+        return segment
+
+    def _compacted_head(self, segment: int) -> Optional[int]:
+        # First segment of the compaction that wrote this one, None if appended
+        with open(self._segment_path(segment), "rb") as f:
+            record = self._decode(f.readline())
+        if not isinstance(record, dict) or COMPACTED_MARKER not in record:
+            return None
+        head = record[COMPACTED_MARKER]
+        # Older single-segment compactions wrote true
+        return segment if head is True else head
+
+    def _decode(self, line: bytes):
+        try:
+            return json.loads(line)
+        except ValueError:
+            # A torn final line from a crash mid-append; the record was never acknowledged.
+            return None
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{self.name}-{segment:06d}.jsonl")
+
+    def _sync(self, f):
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+    def _sync_directory(self):
+        if not self.fsync or not hasattr(os, "O_DIRECTORY"):
+            return
+        fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
@@ -1,36 +1,97 @@
 from typing import List, Dict, Any
 import json
 import os
+import threading
+import time
+from src.core.log_store import SegmentedLog
+from src.core.trace_index import TraceIndex, LazyTraceList
+from src.core.procedural import ProceduralMemory
+from src.core.blob_store import BlobStore, TraceCodec
+from src.utils.tracing import span
 
 class Memory:
-    def __init__(self, memory_file: str = "memory.json"):
+    def __init__(self, memory_file: str = "memory.json", log_dir: str = None,
+                 max_segment_bytes: int = 4 * 1024 * 1024, fsync: bool = True, max_rules: int = 1000):
+        # memory.json is only read to migrate legacy history; new writes go to
+        # append-only segment logs under log_dir (default: "memory/").
         self.memory_file = memory_file
-        self.episodic_memory: List[Dict[str, Any]] = []
-        self.procedural_memory: List[Dict[str, Any]] = []
+        self.log_dir = log_dir or os.path.splitext(memory_file)[0]
+        # Serializes log appends, index updates and compaction across worker threads
+        self._lock = threading.RLock()
+        self.episodic_log = SegmentedLog(self.log_dir, "episodic", max_segment_bytes=max_segment_bytes, fsync=fsync)
+        self.procedural_log = SegmentedLog(self.log_dir, "procedural", max_segment_bytes=max_segment_bytes, fsync=fsync)
+        # Traces are logged as references to deduplicated, compressed blobs
+        # (steps, file contents, large results); see TraceCodec.
+        self.blobs = BlobStore(self.log_dir, fsync=fsync)
+        self.codec = TraceCodec(self.blobs)
+        # Episodic traces are loaded lazily: only the index is read at startup.
+        self.trace_index = TraceIndex(self.episodic_log, os.path.join(self.log_dir, "episodic.idx"), fsync=fsync)
+        self.episodic_log.on_compact = self.trace_index.relocate
+        self.episodic_memory = LazyTraceList(self.trace_index, on_append=self.add_trace, lock=self._lock,
+                                             decode=self.codec.decode)
+        # One rule per normalized task + plan, with usage statistics and a size cap
+        self.procedural = ProceduralMemory(self.procedural_log, max_rules=max_rules, lock=self._lock)
         self.load_memory()
 
     def load_memory(self):
-        if os.path.exists(self.memory_file):
-            with open(self.memory_file, "r") as f:
-                data = json.load(f)
-                self.episodic_memory = data.get("episodic", [])
-                self.procedural_memory = data.get("procedural", [])
+        with self._lock:
+            if self.episodic_log.is_empty() and self.procedural_log.is_empty():
+                if os.path.exists(self.memory_file):
+                    self._migrate_legacy_file()
+                self.blobs.create()
+                return
+            if not self.blobs.exists():
+                # Logs written before blob storage hold full traces; re-encode once
+                self.episodic_log.compact(self.codec.encode(record) for record in self.episodic_log.records())
+                self.blobs.create()
+            # The trace index loaded itself on construction and follows compactions
+            self.episodic_memory.clear_cache()
+            self.procedural.load(self.procedural_log.records())
 
     def save_memory(self):
-        data = {
-            "episodic": self.episodic_memory,
-            "procedural": self.procedural_memory
-        }
-        with open(self.memory_file, "w") as f:
-            json.dump(data, f, indent=2)
+        # Full rewrite (compaction). Routine updates only append.
+        with self._lock, span("memory.save", "memory"):
+            self.episodic_log.compact(self.episodic_log.records())
+            self.procedural.compact()
 
     def add_trace(self, trace: Dict[str, Any]):
-        self.episodic_memory.append(trace)
-        self.save_memory()
+        trace.setdefault("timestamp", time.time())
+        with self._lock, span("memory.add_trace", "memory") as add_span:
+            location = self.episodic_log.append(self.codec.encode(trace))
+            add_span.set(bytes=location[2])
+            self.trace_index.add(location, trace)
+            self.episodic_memory.remember(len(self.episodic_memory) - 1, trace)
+
+    def find_traces(self, task: str = None, status: str = None, workspace: str = None,
+                    since: float = None, limit: int = None) -> List[Dict[str, Any]]:
+        # Newest first; only matching trace bodies are read from disk.
+        with self._lock:
+            positions = self.trace_index.query(task=task, status=status, workspace=workspace, since=since)
+            positions = positions[::-1][:limit] if limit else positions[::-1]
+            return [self.episodic_memory[i] for i in positions]
+
+    @property
+    def procedural_memory(self) -> List[Dict[str, Any]]:
+        return self.procedural.all()
 
     def get_procedural_rules(self) -> List[Dict[str, Any]]:
-        return self.procedural_memory
+        return self.procedural.all()
+
+    def search_rules(self, task: str, k: int = 3, min_score: float = 0.2) -> List[Dict[str, Any]]:
+        # Best matches first, weighted by each rule's success record
+        return self.procedural.search(task, k=k, min_score=min_score)
 
     def update_procedural_memory(self, rule: Dict[str, Any]):
-        self.procedural_memory.append(rule)
-        self.save_memory()
+        # A successful plan: adds the rule or updates the existing one's statistics
+        self.procedural.record_success(rule["trigger"], rule.get("action"), rule.get("fingerprint"),
+                                       attempts=rule.get("attempts", 1))
+
+    def record_rule_failure(self, task: str, plan: List[Dict[str, Any]]) -> bool:
+        return self.procedural.record_failure(task, plan)
+
+    def _migrate_legacy_file(self):
+        with open(self.memory_file, "r") as f:
+            data = json.load(f)
+        self.episodic_log.compact(self.codec.encode(trace) for trace in data.get("episodic", []))
+        self.procedural.load(data.get("procedural", []))
+        self.procedural.compact()
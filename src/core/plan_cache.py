@@ -0,0 +1,74 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import threading
+
+def normalize_task(task: str) -> str:
+    # Only whitespace is normalized: case, punctuation and small words can
+    # change what a task means ("compute 2+1" vs "compute 2-1"), and a replayed
+    # plan passes its own verify step, so a loose match would go unnoticed.
+    # Fuzzy matching is retrieval's job (see RuleIndex).
+    return " ".join((task or "").split())
+
+
+class PlanCache:
+    # LRU cache of verified plans keyed on (normalized task, environment
+    # fingerprint). A hit lets the coordinator replay the plan without an LLM
+    # call; a replay that fails is invalidated so the next run replans.
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Tuple[str, str], List[Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def load_rules(self, rules: List[Dict[str, Any]], score: Callable[[Dict[str, Any]], float] = None):
+        # Seeds each (task, environment) with its best rule by score (the
+        # same quality retrieval ranks by); rules that failed more often than
+        # they succeeded are not replayed. Rules without a fingerprint predate
+        # the cache; their environment is unknown.
+        best: Dict[Tuple[str, str], Tuple[float, Dict[str, Any]]] = {}
+        for rule in rules:
+            if not (rule.get("fingerprint") and rule.get("action")):
+                continue
+            if rule.get("failures", 0) > rule.get("successes", 1):
+                continue
+            key = (normalize_task(rule["trigger"]), rule["fingerprint"])
+            value = score(rule) if score is not None else 0.0
+            if key not in best or value > best[key][0]:
+                best[key] = (value, rule)
+        # Least recently used first, so the LRU order survives the restart
+        for _, rule in sorted(best.values(), key=lambda entry: entry[1].get("last_used", 0.0)):
+            self.put(rule["trigger"], rule["fingerprint"], rule["action"])
+
+    def get(self, task: str, fingerprint: str) -> Optional[List[Dict[str, Any]]]:
+        key = (normalize_task(task), fingerprint)
+        with self._lock:
+            plan = self.entries.get(key)
+            if plan is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return plan
+
+    def put(self, task: str, fingerprint: str, plan: List[Dict[str, Any]]):
+        key = (normalize_task(task), fingerprint)
+        with self._lock:
+            self.entries[key] = plan
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, task: str, fingerprint: str):
+        with self._lock:
+            self.entries.pop((normalize_task(task), fingerprint), None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+        }
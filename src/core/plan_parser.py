@@ -0,0 +1,90 @@
+from typing import Any, Dict, List
+import json
+
+
+class PlanParseError(ValueError):
+    pass
+
+
+class StreamingPlanParser:
+    # Incrementally extracts step objects from a streamed LLM response. Text is
+    # fed as it arrives; each top-level object inside the plan's JSON array is
+    # returned as soon as its closing brace is seen. The array starts after a
+    # ```json fence, or at the very start of the response for bare JSON. A
+    # step that is not a valid JSON object raises PlanParseError rather than
+    # being dropped: the rest of the plan may depend on it.
+    def __init__(self):
+        self.buffer = ""
+        self.start = None
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.object_start = None
+        self.done = False
+        self.steps: List[Dict[str, Any]] = []
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        self.buffer += text
+        if self.done:
+            return []
+        if self.start is None and not self._find_start():
+            return []
+
+        new_steps = []
+        buf = self.buffer
+        i = self.pos
+        while i < len(buf):
+            ch = buf[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch in "[{":
+                self.depth += 1
+                if ch == "{" and self.depth == 2:
+                    self.object_start = i
+            elif ch in "]}":
+                self.depth -= 1
+                if ch == "}" and self.depth == 1 and self.object_start is not None:
+                    text = buf[self.object_start:i + 1]
+                    step = self._decode(text)
+                    if step is None:
+                        self.done = True
+                        raise PlanParseError(f"plan step {len(self.steps) + 1} is not valid JSON: {text[:200]}")
+                    self.steps.append(step)
+                    new_steps.append(step)
+                    self.object_start = None
+                elif self.depth == 0:
+                    self.done = True
+                    i += 1
+                    break
+            i += 1
+        self.pos = i
+        return new_steps
+
+    def _find_start(self) -> bool:
+        fence = self.buffer.find("```json")
+        if fence != -1:
+            bracket = self.buffer.find("[", fence)
+        elif self.buffer.lstrip().startswith("["):
+            bracket = self.buffer.find("[")
+        else:
+            return False
+        if bracket == -1:
+            return False
+        self.start = bracket
+        self.pos = bracket
+        return True
+
+    def _decode(self, text: str):
+        try:
+            step = json.loads(text)
+        except ValueError:
+            return None
+        return step if isinstance(step, dict) else None
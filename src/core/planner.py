@@ -1,46 +1,159 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Tuple
+import json
+import re
 from src.utils.llm import LLM
 from src.core.memory import Memory
+from src.core.plan_parser import PlanParseError, StreamingPlanParser
+from src.core.prompt_budget import PromptBuilder, estimate_tokens
+from src.utils.tracing import span
 
 class Planner:
-    def __init__(self, llm: LLM, memory: Memory):
+    def __init__(self, llm: LLM, memory: Memory, max_examples: int = 3, prompt_budget: int = 6000,
+                 rollback: bool = False):
         self.llm = llm
         self.memory = memory
+        self.max_examples = max_examples
+        # Approximate token budget for the prompt (system instruction excluded);
+        # callers pass a usage dict to get the per-section usage of their prompt
+        self.prompt_budget = prompt_budget
+        # The coordinator restores the workspace before each retry
+        self.rollback = rollback
 
-    def create_plan(self, task: str, context: Dict[str, Any], feedback: str = None) -> List[Dict[str, Any]]:
+    def create_plan(self, task: str, context: Dict[str, Any], feedback: str = None,
+                    completed: List[Dict[str, Any]] = None, variant: Tuple[int, int] = None,
+                    usage: Dict[str, Dict[str, int]] = None) -> List[Dict[str, Any]]:
+        # With completed steps, only the remainder of the plan is requested.
+        # variant=(i, n) asks for the i-th of n alternative plans tried in parallel.
+        # usage, if given, is filled with this call's prompt usage per section.
+        with span("prompt", "planner"):
+            prompt, system_instruction = self._build_prompt(task, context, feedback, completed, variant, usage_out=usage)
+        with span("llm.generate", "llm", prompt_chars=len(prompt) + len(system_instruction)) as llm_span:
+            response = self.llm.generate(prompt, system_instruction)
+            llm_span.set(response_chars=len(response))
+        with span("parse", "planner") as parse_span:
+            plan = self._parse_plan(response, task)
+            parse_span.set(steps=len(plan))
+        return plan
+
+    def create_plan_stream(self, task: str, context: Dict[str, Any], feedback: str = None,
+                           completed: List[Dict[str, Any]] = None,
+                           usage: Dict[str, Dict[str, int]] = None) -> Iterator[Dict[str, Any]]:
+        # Yields each step as soon as the model has finished emitting it, so the
+        # caller can start executing before the rest of the plan arrives.
+        with span("prompt", "planner"):
+            prompt, system_instruction = self._build_prompt(task, context, feedback, completed, usage_out=usage)
+        parser = StreamingPlanParser()
+        # The span also covers time the caller spends between steps
+        with span("llm.generate_stream", "llm", prompt_chars=len(prompt) + len(system_instruction)) as llm_span:
+            for chunk in self.llm.generate_stream(prompt, system_instruction):
+                yield from parser.feed(chunk)
+            llm_span.set(response_chars=len(parser.buffer), steps=len(parser.steps))
+        if parser.steps and not parser.done:
+            raise PlanParseError(f"plan ended after {len(parser.steps)} steps without closing its JSON array")
+        if not parser.steps:
+            # No parseable array was seen incrementally; fall back to the full-text parser
+            yield from self._parse_plan(parser.buffer, task)
+
+    def _build_prompt(self, task: str, context: Dict[str, Any], feedback: str = None,
+                      completed: List[Dict[str, Any]] = None, variant: Tuple[int, int] = None,
+                      usage_out: Dict[str, Dict[str, int]] = None):
         # Construct a prompt with context
         system_instruction = (
             "You are an expert coding agent. \n"
             "First, analyze the task and explain your reasoning/design in a few sentences.\n"
             "Then, return your plan as a JSON list of steps wrapped in ```json ... ``` code blocks.\n\n"
             "Allowed step types:\n"
-            "1. {\"type\": \"command\", \"command\": \"...\", \"background\": true/false} - Run a shell command. Set background=true for servers.\n"
-            "2. {\"type\": \"write_file\", \"filename\": \"...\", \"content\": \"...\"} - Write a file.\n"
-            "3. {\"type\": \"read_file\", \"filename\": \"...\"} - Read a file.\n"
-            "4. {\"type\": \"search_files\", \"pattern\": \"...\", \"path\": \"...\"} - Search for a pattern in files (grep-like).\n"
-            "5. {\"type\": \"verify\", \"command\": \"...\"} - Run a verification command to check if the task was completed successfully.\n"
-            "6. {\"type\": \"ask_user\", \"question\": \"...\"} - Ask the user for missing information. The response will be available in the next planning cycle.\n"
+            "1. {\"type\": \"command\", \"command\": \"...\", \"background\": true/false} - Run a shell command. Set background=true for servers; add \"ready\": {\"port\": 8000} or {\"log\": \"regex\", \"timeout\": 30} to wait until it is up. Background processes are stopped when the task ends. Foreground commands get a timeout learned from similar past runs (60s if unknown); set \"timeout\": seconds for long builds.\n"
+            "2. {\"type\": \"write_file\", \"filename\": \"...\", \"content\": \"...\"} - Write a whole file (new files, or rewriting most of one).\n"
+            "3. {\"type\": \"edit_file\", \"filename\": \"...\", \"edits\": [{\"search\": \"exact existing text\", \"replace\": \"new text\"}]} - Change part of an existing file. The search text must occur exactly once (or add \"all\": true). Alternatively give \"diff\": a unified diff with @@ hunks for this one file. Either all edits apply or the file is left unchanged.\n"
+            "4. {\"type\": \"read_file\", \"filename\": \"...\"} - Read a file. Optional: \"start_line\"/\"end_line\" (1-based, inclusive) and \"max_bytes\"; large files are truncated and the result gives \"next_line\" and \"total_lines\".\n"
+            "5. {\"type\": \"search_files\", \"pattern\": \"...\", \"path\": \"...\"} - Search for a pattern in files (grep-like). Optional: \"regex\": true, \"ignore_case\": true, \"include\"/\"exclude\": [globs], \"max_results\": N.\n"
+            "6. {\"type\": \"verify\", \"command\": \"...\"} - Run a verification command to check if the task was completed successfully. Optional: \"wait_for\": {\"port\": N} or {\"log\": \"regex\"} to wait for a background server first. A verify that already passed on identical files is not re-run; set \"cache\": false if it depends on anything outside the workspace (network, time, services).\n"
+            "7. {\"type\": \"ask_user\", \"question\": \"...\"} - Ask the user for missing information. The response will be available in the next planning cycle.\n"
+            "Optionally give steps an \"id\" and a \"depends_on\": [ids of earlier steps] list; steps whose dependencies are met run in parallel. A step without \"depends_on\" runs after all earlier steps.\n"
             "Note: You are working in a clean, isolated project directory. You do not need to create a folder.\n"
             "IMPORTANT: You MUST include a final 'verify' step to check if your task was completed successfully."
         )
         
-        prompt = f"Task: {task}\n\nEnvironment: {context}\n\n"
-        if "files" in context:
-            prompt += f"Files: {context['files']}\n\n"
-            
+        builder = PromptBuilder(budget=self.prompt_budget)
+        builder.add("task", task, header="Task: ", footer="\n\n")
+        builder.add("environment", self._summarize_environment(context), header="Environment: ", footer="\n\n")
+        if context.get("files"):
+            builder.add("files", context["files"], header="Files: ", footer="\n\n")
+
+        examples = self.memory.search_rules(task, k=self.max_examples) if self.max_examples else []
+        builder.add(
+            "rules",
+            [f"- Task: {rule.get('trigger')}{self._track_record(rule)}\n  Plan: {json.dumps(rule.get('action'))}\n"
+             for rule in examples],
+            header="Plans that succeeded for similar past tasks (reuse them where they apply):\n",
+            footer="\n",
+            mode="items"
+        )
+
         if feedback:
-            prompt += f"PREVIOUS ATTEMPT FAILED. Feedback: {feedback}\n"
-            prompt += "Please provide a corrected plan to fix the error.\n\n"
-            
+            if completed:
+                # File contents are already on disk; listing them again only costs tokens
+                done = [
+                    dict(step, content=f"<{len(str(step.get('content', '')))} chars, written>")
+                    if step.get("type") == "write_file" else step
+                    for step in completed
+                ]
+                footer = (
+                    "\nThese steps of the previous plan succeeded and are kept ("
+                    + ("they are re-run on the rolled-back workspace" if self.rollback else "unchanged steps are not re-run")
+                    + "):\n"
+                    + "".join(f"- {json.dumps(step)}\n" for step in done)
+                    + "Return ONLY the remaining steps, starting with a fix for the failed step "
+                    "(prefer edit_file for changes to files written above). "
+                    "They run after the steps above; depends_on may refer to their ids.\n\n"
+                )
+            elif self.rollback:
+                footer = ("\nThe workspace has been rolled back to its state before that attempt. "
+                          "Please provide a complete corrected plan.\n\n")
+            else:
+                footer = ("\nPlease provide a corrected plan to fix the error. Files from the previous attempt are "
+                          "still on disk: fix them with small edit_file steps rather than rewriting them.\n\n")
+            builder.add("feedback", feedback, header="PREVIOUS ATTEMPT FAILED. Feedback: ", footer=footer,
+                        mode="head_tail")
+
+        if variant:
+            index, count = variant
+            builder.add("candidate", (
+                f"This is candidate plan {index} of {count}; the candidates are tried in parallel in separate "
+                "copies of the workspace and the first one that verifies is kept. "
+                + ("Give the most likely solution." if index == 1 else
+                   "Take a different approach from the most obvious one (other tools, libraries or fixes).")
+            ), footer="\n\n")
+
+        prompt, usage = builder.build()
+        usage["instructions"] = {"tokens": estimate_tokens(system_instruction), "original": estimate_tokens(system_instruction)}
+        if usage_out is not None:
+            usage_out.update(usage)
+        print("Prompt tokens: " + ", ".join(
+            f"{name}={u['tokens']}" + (f" (of {u['original']})" if u["tokens"] < u["original"] else "")
+            for name, u in usage.items()
+        ))
         prompt += "Plan:"
-        
-        response = self.llm.generate(prompt, system_instruction)
-        
+        return prompt, system_instruction
+
+    def _track_record(self, rule: Dict[str, Any]) -> str:
+        successes, failures = rule.get("successes"), rule.get("failures", 0)
+        if not successes or (successes == 1 and not failures):
+            return ""
+        return f" (worked {successes} of {successes + failures} times)"
+
+    def _summarize_environment(self, context: Dict[str, Any]) -> str:
+        # Tool paths rarely matter to a plan; names (and versions, if probed) do
+        environment = {k: v for k, v in context.items() if k not in ("files", "tools", "tool_versions")}
+        if "tools" in context:
+            versions = context.get("tool_versions") or {}
+            environment["tools"] = [f"{tool} ({versions[tool]})" if tool in versions else tool
+                                    for tool in sorted(context["tools"])]
+        return str(environment)
+
+    def _parse_plan(self, response: str, task: str) -> List[Dict[str, Any]]:
         try:
-            # Attempt to parse JSON response
-            import json
-            import re
-            
             # Find JSON block using regex
             match = re.search(r"```json\s*(.*?)\s*```", response, re.DOTALL)
             if match:
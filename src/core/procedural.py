@@ -0,0 +1,172 @@
+from typing import Any, Dict, Iterable, List
+import hashlib
+import json
+import threading
+import time
+from src.core.log_store import SegmentedLog
+from src.core.plan_cache import normalize_task
+from src.core.retrieval import RuleIndex
+
+_DAY = 86400.0
+
+
+def rule_key(trigger: str, action: Any) -> str:
+    plan = json.dumps(action, sort_keys=True)
+    return hashlib.sha1(f"{normalize_task(trigger)}\0{plan}".encode("utf-8")).hexdigest()[:16]
+
+
+class ProceduralMemory:
+    # Learned rules (task trigger -> plan that worked), one per normalized
+    # trigger + plan hash. Repeats update the rule's statistics instead of
+    # adding a copy: successes, failures, average attempts until success and
+    # last use. Every change appends the updated rule (or a deletion marker) to
+    # the log; loading keeps the last record per key, and the log is compacted
+    # once it holds more than twice as many records as live rules. Beyond
+    # max_rules, the least frequently used rules are evicted, with use counts
+    # halving every half_life_days since last use (LFU with aging). Search
+    # ranks TF-IDF matches by similarity weighted with the rule's track record.
+    def __init__(self, log: SegmentedLog, max_rules: int = 1000, half_life_days: float = 30.0, lock=None):
+        self.log = log
+        self.max_rules = max_rules
+        self.half_life_days = half_life_days
+        self.rules: Dict[str, Dict[str, Any]] = {}
+        self.evictions = 0
+        self._records = 0
+        self._index: RuleIndex = None
+        self._lock = lock or threading.RLock()
+
+    def load(self, records: Iterable[Dict[str, Any]]):
+        # Also folds rules written before deduplication (no "key"): each copy
+        # counts as one success
+        with self._lock:
+            self.rules = {}
+            self._records = 0
+            # Keys from an older rule_key() -> current key, so later deletions
+            # still find the rule
+            rekeyed: Dict[str, str] = {}
+            for record in records:
+                self._records += 1
+                if record.get("$deleted"):
+                    self.rules.pop(rekeyed.get(record.get("key"), record.get("key")), None)
+                elif "key" in record:
+                    key = rule_key(record.get("trigger"), record.get("action"))
+                    if key != record["key"]:
+                        rekeyed[record["key"]] = key
+                        record = dict(record, key=key)
+                    self.rules[key] = record
+                elif record.get("trigger") is not None:
+                    self._merge_legacy(record, time.time())
+            self._index = None
+            if len(self.rules) > self.max_rules:
+                self._evict(time.time())
+            if self._records > 2 * len(self.rules) + 64:
+                self.compact()
+
+    def all(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self.rules.values())
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def search(self, task: str, k: int = 3, min_score: float = 0.2) -> List[Dict[str, Any]]:
+        with self._lock:
+            index = self._get_index()
+            matches = index.search(task, k=k * 4, min_score=min_score)
+            ranked = sorted(matches, key=lambda match: -match[0] * self.quality(match[1]))
+            return [rule for _, rule in ranked[:k]]
+
+    def record_success(self, trigger: str, action: Any, fingerprint: str = None, attempts: int = 1):
+        now = time.time()
+        key = rule_key(trigger, action)
+        with self._lock:
+            rule = self.rules.get(key)
+            if rule is None:
+                rule = {"key": key, "trigger": trigger, "action": action, "fingerprint": fingerprint,
+                        "successes": 0, "failures": 0, "attempts_total": 0, "created": now}
+                self.rules[key] = rule
+                if self._index is not None:
+                    self._index.add(rule)
+            rule["successes"] += 1
+            rule["attempts_total"] += max(1, attempts)
+            rule["avg_attempts"] = round(rule["attempts_total"] / rule["successes"], 3)
+            rule["last_used"] = now
+            if fingerprint:
+                rule["fingerprint"] = fingerprint
+            self._append(rule)
+            if len(self.rules) > self.max_rules:
+                self._evict(now, keep=key)
+
+    def record_failure(self, trigger: str, action: Any) -> bool:
+        # Only counts against an existing rule; failed plans never become rules
+        with self._lock:
+            rule = self.rules.get(rule_key(trigger, action))
+            if rule is None:
+                return False
+            rule["failures"] = rule.get("failures", 0) + 1
+            rule["last_used"] = time.time()
+            self._append(rule)
+            return True
+
+    def compact(self):
+        with self._lock:
+            self.log.compact(self.rules.values())
+            self._records = len(self.rules)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"rules": len(self.rules), "log_records": self._records, "evictions": self.evictions}
+
+    def quality(self, rule: Dict[str, Any]) -> float:
+        # Smoothed success rate, discounted for rules that needed many attempts
+        successes, failures = rule.get("successes", 1), rule.get("failures", 0)
+        rate = (successes + 1) / (successes + failures + 2)
+        return rate / (1.0 + 0.1 * max(0.0, rule.get("avg_attempts", 1.0) - 1.0))
+
+    def _usage(self, rule: Dict[str, Any], now: float) -> float:
+        uses = rule.get("successes", 1) + rule.get("failures", 0)
+        age_days = max(0.0, now - rule.get("last_used", rule.get("created", now))) / _DAY
+        return uses * 0.5 ** (age_days / self.half_life_days)
+
+    def _evict(self, now: float, keep: str = None):
+        # Down to 90% of the cap, so eviction (a sort) runs once per many
+        # inserts; the rule just recorded is never the victim
+        target = int(self.max_rules * 0.9)
+        candidates = [rule for rule in self.rules.values() if rule["key"] != keep]
+        victims = sorted(candidates, key=lambda rule: self._usage(rule, now))[:len(self.rules) - target]
+        for rule in victims:
+            del self.rules[rule["key"]]
+            if self._index is not None:
+                self._index.remove(rule)
+            self._append({"key": rule["key"], "$deleted": True})
+            self.evictions += 1
+
+    def _append(self, record: Dict[str, Any]):
+        self.log.append(record)
+        self._records += 1
+        if self._records > 2 * len(self.rules) + 64:
+            self.compact()
+
+    def _get_index(self) -> RuleIndex:
+        # Rebuilt once removed rules make up half of it
+        if self._index is None or len(self._index.removed) > len(self._index):
+            self._index = RuleIndex()
+            for rule in self.rules.values():
+                self._index.add(rule)
+        return self._index
+
+    def _merge_legacy(self, record: Dict[str, Any], now: float):
+        # Old rules carry no time; treat them as used at migration
+        stamp = record.get("timestamp") or now
+        key = rule_key(record["trigger"], record.get("action"))
+        rule = self.rules.get(key)
+        if rule is None:
+            rule = self.rules[key] = {"key": key, "trigger": record["trigger"], "action": record.get("action"),
+                                      "fingerprint": record.get("fingerprint"), "successes": 0, "failures": 0,
+                                      "attempts_total": 0, "created": stamp}
+        rule["successes"] += 1
+        rule["attempts_total"] += 1
+        rule["avg_attempts"] = round(rule["attempts_total"] / rule["successes"], 3)
+        rule["last_used"] = max(rule.get("last_used", 0.0), stamp)
+        if record.get("fingerprint"):
+            rule["fingerprint"] = record["fingerprint"]
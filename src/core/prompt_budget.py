@@ -0,0 +1,132 @@
+from typing import Dict, List, Tuple, Union
+
+CHARS_PER_TOKEN = 4
+
+# Relative share of the budget each section gets when they do not all fit
+DEFAULT_WEIGHTS = {"environment": 1, "files": 3, "rules": 2, "feedback": 3}
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English and code; close enough for budgeting
+    # without shipping a tokenizer
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_head(text: str, max_tokens: int) -> str:
+    # Keeps whole lines from the start
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    lines = text.splitlines(keepends=True)
+    limit = max(0, max_tokens * CHARS_PER_TOKEN - 40)
+    kept, size = [], 0
+    for line in lines:
+        if size + len(line) > limit:
+            break
+        kept.append(line)
+        size += len(line)
+    if not kept and lines:
+        kept, size = [lines[0][:limit]], limit
+    omitted = len(lines) - len(kept)
+    return "".join(kept).rstrip("\n") + f"\n... [{max(omitted, 1)} more lines omitted]\n"
+
+
+def truncate_head_tail(text: str, max_tokens: int) -> str:
+    # Keeps both ends: the failing step is at the start of feedback, the
+    # actual error at the end of the captured output
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    limit = max(0, max_tokens * CHARS_PER_TOKEN - 40)
+    head = limit // 3
+    tail = limit - head
+    omitted = len(text) - head - tail
+    return f"{text[:head]}\n... [{omitted} chars omitted] ...\n{text[len(text) - tail:]}"
+
+
+def truncate_items(items: List[str], max_tokens: int) -> str:
+    # Keeps whole items in order (best first) while they fit
+    kept, used = [], 0
+    for item in items:
+        cost = estimate_tokens(item)
+        if used + cost > max_tokens:
+            break
+        kept.append(item)
+        used += cost
+    text = "".join(kept)
+    if len(kept) < len(items):
+        text += f"... [{len(items) - len(kept)} more omitted]\n"
+    return text
+
+
+TRUNCATORS = {"head": truncate_head, "head_tail": truncate_head_tail, "items": truncate_items}
+
+
+class PromptBuilder:
+    # Assembles a prompt from named sections within a token budget. Each
+    # section's header and footer are always kept; bodies share what is left
+    # of the budget by weight, and a section needing less than its share
+    # passes the rest on (water-filling), so nothing is cut when all fit.
+    # Truncation is deterministic: the same inputs give the same prompt.
+    def __init__(self, budget: int = 6000, weights: Dict[str, float] = None):
+        self.budget = budget
+        self.weights = weights or DEFAULT_WEIGHTS
+        self.sections: List[Tuple[str, str, Union[str, List[str]], str, str]] = []
+
+    def add(self, name: str, body: Union[str, List[str]], header: str = "", footer: str = "",
+            mode: str = "head"):
+        if body:
+            self.sections.append((name, header, body, footer, mode))
+
+    def build(self) -> Tuple[str, Dict[str, Dict[str, int]]]:
+        # Returns the prompt and per-section {"tokens", "original"} counts
+        needs = {}
+        fixed = 0
+        for name, header, body, footer, mode in self.sections:
+            fixed += estimate_tokens(header) + estimate_tokens(footer)
+            needs[name] = estimate_tokens("".join(body) if isinstance(body, list) else body)
+        available = max(0, self.budget - fixed)
+        allocation = self._allocate(needs, available)
+        bodies = self._truncate(allocation)
+        # Whole-item truncation can leave part of a share unused; hand it on once
+        cut_items = {name: estimate_tokens(bodies[name]) for name, _, _, _, mode in self.sections
+                     if mode == "items" and allocation[name] is not None}
+        if any(used < allocation[name] - 1 for name, used in cut_items.items()):
+            allocation = self._allocate(dict(needs, **cut_items), available)
+            allocation.update(cut_items)
+            bodies = self._truncate(allocation)
+
+        parts, usage = [], {}
+        for name, header, body, footer, mode in self.sections:
+            section = header + bodies[name] + footer
+            parts.append(section)
+            full = header + ("".join(body) if isinstance(body, list) else body) + footer
+            usage[name] = {"tokens": estimate_tokens(section), "original": estimate_tokens(full)}
+        prompt = "".join(parts)
+        usage["total"] = {"tokens": estimate_tokens(prompt), "original": sum(u["original"] for u in usage.values())}
+        return prompt, usage
+
+    def _truncate(self, allocation: Dict[str, int]) -> Dict[str, str]:
+        bodies = {}
+        for name, header, body, footer, mode in self.sections:
+            text = body if allocation[name] is None else TRUNCATORS[mode](body, allocation[name])
+            bodies[name] = "".join(text) if isinstance(text, list) else text
+        return bodies
+
+    def _allocate(self, needs: Dict[str, int], available: int) -> Dict[str, int]:
+        # None means "keep in full": sections without a weight (e.g. the task)
+        # are never truncated
+        allocation = {name: None for name in needs}
+        pending = [name for name in needs if name in self.weights]
+        available -= sum(needs[name] for name in needs if name not in self.weights)
+        available = max(0, available)
+        while pending:
+            total_weight = sum(self.weights[name] for name in pending)
+            shares = {name: available * self.weights[name] / total_weight for name in pending}
+            satisfied = [name for name in pending if needs[name] <= shares[name]]
+            if not satisfied:
+                for name in pending:
+                    allocation[name] = int(shares[name])
+                break
+            for name in satisfied:
+                available -= needs[name]
+                pending.remove(name)
+        return allocation
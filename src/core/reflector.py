@@ -5,12 +5,20 @@ class Reflector:
     def __init__(self, memory: Memory):
         self.memory = memory
 
-    def reflect(self, trace: Dict[str, Any]):
+    def reflect(self, trace: Dict[str, Any], attempts: int = 1):
         # Analyze the trace and update procedural memory
         print("Reflecting on execution...")
-        # Simple logic: if success, store as a successful pattern
+        # Simple logic: if success, store as a successful pattern (or count
+        # another success for the same task and plan)
         if trace.get("status") == "success":
             self.memory.update_procedural_memory({
                 "trigger": trace.get("task"),
-                "action": trace.get("plan")
+                "action": trace.get("plan"),
+                "fingerprint": trace.get("fingerprint"),
+                "attempts": attempts
             })
+
+    def observe_failure(self, trace: Dict[str, Any]):
+        # A failed attempt whose plan is a learned rule (e.g. a replayed plan) counts against it
+        if trace.get("status") == "failure" and trace.get("plan"):
+            self.memory.record_rule_failure(trace.get("task"), trace["plan"])
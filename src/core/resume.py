@@ -0,0 +1,98 @@
+from typing import Any, Dict, List, Tuple
+import json
+import os
+import threading
+from src.core.workspace_hash import WorkspaceHasher, content_hash
+
+_MUTATING = ("command", "verify", "write_file", "edit_file")
+
+
+class ResumingExecutor:
+    # Skips steps that would not change anything when a plan is re-executed:
+    # a write_file whose target already holds the same content, an edit_file
+    # whose target still holds exactly what that edit produced (re-applying it
+    # would fail or apply twice), or a command kept from the previous attempt.
+    # A command is only skipped if it is the same step that already succeeded
+    # in this workspace (so a new step with the same text always runs) and
+    # the workspace is exactly as that run left it plus the recorded effects
+    # of the steps that ran after it: every non-ignored file is compared, so a
+    # file added, removed or changed by anything else (an input matched by a
+    # glob, a rollback, an edit by hand) makes it run again. Background,
+    # verify and interactive steps always run. Skipped steps report success
+    # with "skipped": true.
+    def __init__(self, executor, hasher: WorkspaceHasher = None):
+        self.executor = executor
+        self.hasher = hasher or WorkspaceHasher()
+        # workspace -> id(step) -> (step, sequence number, {relpath: hash} right after it succeeded)
+        self._done: Dict[str, Dict[int, Tuple[Dict[str, Any], int, Dict[str, str]]]] = {}
+        # workspace -> [(sequence number, {relpath: hash, or None if deleted})], files each step changed
+        self._changes: Dict[str, List[Tuple[int, Dict[str, str]]]] = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def execute_step(self, step: Dict[str, Any], cwd: str = ".") -> Dict[str, Any]:
+        step_type = step.get("type")
+        if step_type not in _MUTATING or step.get("background"):
+            return self.executor.execute_step(step, cwd)
+        root = os.path.abspath(cwd)
+
+        if step_type == "write_file":
+            filename = step.get("filename", "")
+            current = self.hasher.file_hash(cwd, filename)
+            if current is not None and current == content_hash(str(step.get("content", "")).encode("utf-8")):
+                return {"status": "success", "skipped": True, "message": f"File {filename} already up to date."}
+        elif step_type == "edit_file":
+            filename = step.get("filename", "")
+            with self._lock:
+                expected = self._done.get(root, {}).get(self._edit_key(step))
+            if expected is not None and self.hasher.file_hash(cwd, filename) == expected[2].get(filename):
+                return {"status": "success", "skipped": True, "message": f"Edit to {filename} already applied."}
+        elif step_type == "command":
+            with self._lock:
+                entry = self._done.get(root, {}).get(id(step))
+            if entry is not None and entry[0] is step and self._in_place(root, entry):
+                return {"status": "success", "skipped": True,
+                        "message": "Command already succeeded and the workspace is as it left it."}
+
+        before = self.hasher.snapshot(cwd)
+        result = self.executor.execute_step(step, cwd)
+        after = self.hasher.snapshot(cwd)
+        changed = {path: after.get(path) for path in before.keys() | after.keys() if before.get(path) != after.get(path)}
+        with self._lock:
+            self._seq += 1
+            self._changes.setdefault(root, []).append((self._seq, changed))
+            if result.get("status") == "success" and step_type == "command":
+                # The step itself is kept so its id cannot be reused by another object
+                self._done.setdefault(root, {})[id(step)] = (step, self._seq, after)
+        if result.get("status") == "success" and step_type == "edit_file":
+            edited = {filename: self.hasher.file_hash(cwd, filename)}
+            with self._lock:
+                self._done.setdefault(root, {})[self._edit_key(step)] = (step, self._seq, edited)
+        return result
+
+    def forget(self, cwd: str):
+        root = os.path.abspath(cwd)
+        with self._lock:
+            self._done.pop(root, None)
+            self._changes.pop(root, None)
+        self.hasher.forget(cwd)
+
+    def _in_place(self, root: str, entry: Tuple[Dict[str, Any], int, Dict[str, str]]) -> bool:
+        # The state the step left, replayed forward through every change recorded since
+        _, seq, expected = entry
+        expected = dict(expected)
+        with self._lock:
+            later = [changed for change_seq, changed in self._changes.get(root, []) if change_seq > seq]
+        for changed in later:
+            for path, digest in changed.items():
+                if digest is None:
+                    expected.pop(path, None)
+                else:
+                    expected[path] = digest
+        return self.hasher.snapshot(root) == expected
+
+    def _edit_key(self, step: Dict[str, Any]) -> str:
+        return json.dumps(step, sort_keys=True)
+
+    def __getattr__(self, name):
+        return getattr(self.executor, name)
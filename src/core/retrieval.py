@@ -0,0 +1,126 @@
+from typing import Any, Dict, List, Tuple
+import heapq
+import json
+import math
+import re
+
+_WORD = re.compile(r"[a-z0-9_+#.]+")
+
+
+def tokenize(text: str) -> List[str]:
+    words = [w.strip(".") for w in _WORD.findall((text or "").lower())]
+    words = [w[:-1] if len(w) > 3 and w.endswith("s") else w for w in words if w]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class RuleIndex:
+    # Local TF-IDF index over procedural rule triggers with an inverted index,
+    # so a lookup only touches rules sharing at least one term with the query.
+    def __init__(self, max_df_ratio: float = 0.5, scan_limit: int = 1000):
+        # Terms present in more than this fraction of rules carry almost no
+        # signal and dominate lookup cost, so once the corpus is large enough
+        # for the ratio to be meaningful they are skipped at query time if
+        # rarer terms produced candidates; otherwise they are all there is to
+        # match on, and only the first of them walks its postings.
+        self.max_df_ratio = max_df_ratio
+        # Postings longer than scan_limit are not walked once rarer terms have
+        # produced candidates; those candidates are rescored directly instead.
+        self.scan_limit = scan_limit
+        self.rules: List[Dict[str, Any]] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.doc_terms: List[Dict[str, int]] = []
+        self.norms: List[float] = []
+        # (trigger, plan) -> doc id; removed docs keep their postings and are
+        # skipped at query time
+        self._ids: Dict[Tuple[str, str], int] = {}
+        self.removed = set()
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self.rules) - len(self.removed)
+
+    def add(self, rule: Dict[str, Any]):
+        # Identical trigger+plan pairs are indexed once
+        key = self._key(rule)
+        if key in self._ids:
+            return
+        doc_id = len(self.rules)
+        self._ids[key] = doc_id
+        counts: Dict[str, int] = {}
+        for term in tokenize(rule.get("trigger", "")):
+            counts[term] = counts.get(term, 0) + 1
+        self.rules.append(rule)
+        self.doc_terms.append(counts)
+        for term, tf in counts.items():
+            self.postings.setdefault(term, []).append((doc_id, tf))
+        self._dirty = True
+
+    def remove(self, rule: Dict[str, Any]):
+        doc_id = self._ids.pop(self._key(rule), None)
+        if doc_id is not None:
+            self.removed.add(doc_id)
+
+    def search(self, query: str, k: int = 3, min_score: float = 0.0) -> List[Tuple[float, Dict[str, Any]]]:
+        if not self.rules:
+            return []
+        if self._dirty:
+            self._recompute_norms()
+
+        n = len(self.rules)
+        counts: Dict[str, int] = {}
+        for term in tokenize(query):
+            if term in self.postings:
+                counts[term] = counts.get(term, 0) + 1
+
+        scores: Dict[int, float] = {}
+        query_norm = 0.0
+        # Whether rarer terms had produced candidates when the common terms began
+        selective = None
+        for term in sorted(counts, key=lambda t: len(self.postings[t])):
+            postings = self.postings[term]
+            qtf = counts[term]
+            idf = self._idf(len(postings), n)
+            query_norm += (qtf * idf) ** 2
+            common = n >= 20 and len(postings) > self.max_df_ratio * n
+            if common:
+                if selective is None:
+                    selective = bool(scores)
+                if selective:
+                    continue
+            weight = qtf * idf * idf
+            if scores and (common or len(postings) > self.scan_limit):
+                for doc_id in scores:
+                    tf = self.doc_terms[doc_id].get(term)
+                    if tf:
+                        scores[doc_id] += weight * tf
+                continue
+            for doc_id, tf in postings:
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight * tf
+        for doc_id in self.removed.intersection(scores):
+            del scores[doc_id]
+        if not scores or query_norm == 0.0:
+            return []
+
+        query_norm = math.sqrt(query_norm)
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1] / self.norms[item[0]])
+        results = []
+        for doc_id, score in best:
+            score = score / (self.norms[doc_id] * query_norm)
+            if score >= min_score:
+                results.append((score, self.rules[doc_id]))
+        return results
+
+    def _key(self, rule: Dict[str, Any]) -> Tuple[str, str]:
+        return rule.get("trigger"), json.dumps(rule.get("action"), sort_keys=True)
+
+    def _idf(self, df: int, n: int) -> float:
+        return math.log((1 + n) / (1 + df)) + 1.0
+
+    def _recompute_norms(self):
+        n = len(self.rules)
+        idf = {term: self._idf(len(postings), n) for term, postings in self.postings.items()}
+        self.norms = [
+            math.sqrt(sum((tf * idf[term]) ** 2 for term, tf in counts.items())) or 1.0
+            for counts in self.doc_terms
+        ]
+        self._dirty = False
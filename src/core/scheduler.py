@@ -0,0 +1,141 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List
+import asyncio
+import time
+from src.core.executor import Executor
+
+_END = object()
+
+
+class StepScheduler:
+    # Runs plan steps on a thread pool, driven by asyncio. A step may declare
+    # "id" and "depends_on": [ids of earlier steps]; it starts as soon as those
+    # have succeeded. A step without "depends_on" waits for every earlier step,
+    # so plans that declare nothing run exactly in order. The first failure
+    # stops new steps from starting; so does a plan iterable that raises.
+    def __init__(self, executor: Executor, max_concurrency: int = 4):
+        self.executor = executor
+        self.max_concurrency = max(1, max_concurrency)
+
+    def run(self, steps: Iterable[Dict[str, Any]], cwd: str = ".") -> Dict[str, Any]:
+        return asyncio.run(self.run_async(steps, cwd))
+
+    async def run_async(self, steps: Iterable[Dict[str, Any]], cwd: str = ".") -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="step")
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        state = {"failed": None}
+        origin = time.perf_counter()
+
+        tasks: List[asyncio.Task] = []
+        ids: Dict[str, int] = {}
+        deps_by_index: List[List[int]] = []
+
+        async def run_one(index: int, step: Dict[str, Any], deps: List[asyncio.Task], error: str):
+            if deps:
+                await asyncio.gather(*deps)
+            if state["failed"] is not None:
+                return None
+            if error:
+                record = {"step": step, "result": {"status": "failure", "error": error}, "index": index,
+                          "timing": {"start": 0.0, "end": 0.0, "duration": 0.0}}
+                state["failed"] = record
+                return record
+            async with semaphore:
+                if state["failed"] is not None:
+                    return None
+                start = time.perf_counter()
+                result = await loop.run_in_executor(pool, self.executor.execute_step, step, cwd)
+                end = time.perf_counter()
+            record = {
+                "step": step,
+                "result": result,
+                "index": index,
+                "timing": {
+                    "start": round(start - origin, 6),
+                    "end": round(end - origin, 6),
+                    "duration": round(end - start, 6),
+                },
+            }
+            if result.get("status") != "success" and state["failed"] is None:
+                state["failed"] = record
+            return record
+
+        # Lists are consumed directly; other iterables (e.g. a streamed plan)
+        # are pulled on a worker thread so the loop keeps running steps meanwhile.
+        iterator = iter(steps)
+        streamed = not isinstance(steps, (list, tuple))
+        try:
+            while state["failed"] is None:
+                try:
+                    if streamed:
+                        step = await loop.run_in_executor(None, next, iterator, _END)
+                    else:
+                        step = next(iterator, _END)
+                except Exception as e:
+                    # A streamed plan that broke off or held an invalid step:
+                    # start nothing more and fail the attempt once the
+                    # running steps are done
+                    state["failed"] = {"step": {"type": "plan"}, "result": {
+                        "status": "failure", "error": f"Plan could not be read completely: {e}"}}
+                    break
+                if step is _END:
+                    break
+                index = len(tasks)
+                error = ""
+                if "depends_on" in step:
+                    dep_indexes = []
+                    for dep in step.get("depends_on") or []:
+                        if str(dep) in ids:
+                            dep_indexes.append(ids[str(dep)])
+                        else:
+                            error = f"Unknown dependency '{dep}' (dependencies must refer to earlier step ids)"
+                else:
+                    dep_indexes = list(range(index))
+                if "id" in step:
+                    ids[str(step["id"])] = index
+                deps_by_index.append(dep_indexes)
+                tasks.append(asyncio.ensure_future(run_one(index, step, [tasks[i] for i in dep_indexes], error)))
+            results = await asyncio.gather(*tasks)
+        finally:
+            if streamed and hasattr(iterator, "close"):
+                iterator.close()
+            pool.shutdown(wait=True)
+
+        records = [r for r in results if r is not None]
+        wall_time = time.perf_counter() - origin
+        return {
+            "status": "failure" if state["failed"] is not None else "success",
+            "failed": state["failed"],
+            "steps": [{"step": r["step"], "result": r["result"], "timing": r["timing"]} for r in records],
+            "timing": self._summarize(records, deps_by_index, wall_time),
+        }
+
+    def _summarize(self, records: List[Dict[str, Any]], deps_by_index: List[List[int]], wall_time: float) -> Dict[str, Any]:
+        # Critical path: longest chain of dependent steps by duration. With
+        # perfect parallelism, wall time approaches this value.
+        durations = {r["index"]: r["timing"]["duration"] for r in records}
+        longest: Dict[int, float] = {}
+        previous: Dict[int, int] = {}
+        for index in sorted(durations):
+            best, best_dep = 0.0, None
+            for dep in deps_by_index[index]:
+                if longest.get(dep, 0.0) > best:
+                    best, best_dep = longest[dep], dep
+            longest[index] = best + durations[index]
+            if best_dep is not None:
+                previous[index] = best_dep
+
+        path: List[int] = []
+        if longest:
+            node = max(longest, key=longest.get)
+            while node is not None:
+                path.append(node)
+                node = previous.get(node)
+        return {
+            "wall_time": round(wall_time, 6),
+            "step_time": round(sum(durations.values()), 6),
+            "critical_path": round(max(longest.values(), default=0.0), 6),
+            "critical_path_steps": path[::-1],
+            "max_concurrency": self.max_concurrency,
+        }
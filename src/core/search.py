@@ -0,0 +1,257 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import fnmatch
+import os
+import re
+import threading
+from src.core.tree_view import IgnoreRules
+
+BINARY_SNIFF_BYTES = 8192
+MAX_FILE_BYTES = 8 * 1024 * 1024
+
+
+def is_binary(data: bytes) -> bool:
+    return b"\0" in data[:BINARY_SNIFF_BYTES]
+
+
+def _as_list(value) -> List[str]:
+    if not value:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+def _trigrams(data: bytes) -> Set[Tuple[int, int, int]]:
+    # Tuples of byte values; zip over offset views is ~2x faster than slicing
+    return set(zip(data, data[1:], data[2:]))
+
+
+class TrigramIndex:
+    # Maps every 3-byte sequence to the files containing it. A literal query
+    # only has to open files that contain all of the query's trigrams. Files
+    # are re-indexed when their size or mtime changes, so an up-to-date index
+    # costs a stat per file instead of a read.
+    def __init__(self, root: str):
+        self.root = root
+        self.files: Dict[str, Tuple[int, int]] = {}
+        self.file_trigrams: Dict[str, Set[Tuple[int, int, int]]] = {}
+        self.postings: Dict[Tuple[int, int, int], Set[str]] = {}
+        # Oversized files are never indexed, so they are always candidates
+        self.unindexed: Set[str] = set()
+        self.stale = True
+        self._lock = threading.Lock()
+
+    def refresh(self, paths: List[str]):
+        # After a command step anything may have changed, so every file is
+        # re-stat'ed; otherwise only files that appeared or vanished are handled
+        # (write_file steps update their file directly).
+        with self._lock:
+            live = set(paths)
+            for path in list(self.files):
+                if path not in live:
+                    self._remove(path)
+            for path in paths:
+                if self.stale or path not in self.files:
+                    self._update(path)
+            self.stale = False
+
+    def update_file(self, path: str):
+        with self._lock:
+            self._update(path)
+
+    def candidates(self, literal: bytes) -> Optional[Set[str]]:
+        if len(literal) < 3:
+            return None
+        with self._lock:
+            result = None
+            for trigram in sorted(_trigrams(literal), key=lambda t: len(self.postings.get(t, ()))):
+                files = self.postings.get(trigram, set())
+                result = set(files) if result is None else result & files
+                if not result:
+                    break
+            return result | self.unindexed
+
+    def _update(self, path: str):
+        try:
+            st = os.stat(os.path.join(self.root, path))
+        except OSError:
+            self._remove(path)
+            return
+        signature = (st.st_size, st.st_mtime_ns)
+        if self.files.get(path) == signature:
+            return
+        self._remove(path)
+        self.files[path] = signature
+        if st.st_size > MAX_FILE_BYTES:
+            self.unindexed.add(path)
+            return
+        try:
+            with open(os.path.join(self.root, path), "rb") as f:
+                data = f.read()
+        except OSError:
+            return
+        if is_binary(data):
+            return
+        grams = _trigrams(data)
+        self.file_trigrams[path] = grams
+        for trigram in grams:
+            self.postings.setdefault(trigram, set()).add(path)
+
+    def _remove(self, path: str):
+        self.files.pop(path, None)
+        self.unindexed.discard(path)
+        for trigram in self.file_trigrams.pop(path, ()):
+            files = self.postings.get(trigram)
+            if files is not None:
+                files.discard(path)
+                if not files:
+                    del self.postings[trigram]
+
+
+class FileSearcher:
+    # grep-like search: skips .gitignore'd and binary files, supports regex or
+    # literal patterns and include/exclude globs, reads files on a thread pool
+    # and stops once more than max_results matches have been collected.
+    def __init__(self, workers: int = None):
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self.indexes: Dict[str, TrigramIndex] = {}
+
+    def enable_index(self, root: str) -> TrigramIndex:
+        root = os.path.abspath(root)
+        if root not in self.indexes:
+            self.indexes[root] = TrigramIndex(root)
+        return self.indexes[root]
+
+    def mark_stale(self, root: str):
+        index = self.indexes.get(os.path.abspath(root))
+        if index is not None:
+            index.stale = True
+
+    def forget(self, root: str):
+        self.indexes.pop(os.path.abspath(root), None)
+
+    def note_write(self, root: str, filename: str):
+        index = self.indexes.get(os.path.abspath(root))
+        if index is not None:
+            index.update_file(os.path.normpath(filename).replace(os.sep, "/"))
+
+    def search(self, root: str, pattern: str, path: str = ".", regex: bool = False,
+               ignore_case: bool = False, include=None, exclude=None,
+               max_results: int = 50) -> Dict:
+        root = os.path.abspath(root)
+        flags = re.IGNORECASE if ignore_case else 0
+        compiled = re.compile(pattern.encode("utf-8") if regex else re.escape(pattern.encode("utf-8")), flags)
+        literal = None if (regex or ignore_case) else pattern.encode("utf-8")
+
+        files = list(self._walk(root, path, _as_list(include), _as_list(exclude)))
+        index = self.indexes.get(root)
+        if index is not None:
+            index.refresh(files)
+            if literal is not None:
+                candidates = index.candidates(literal)
+                if candidates is not None:
+                    files = [f for f in files if f in candidates]
+
+        # Files are scanned in chunks of walk order and results are kept per
+        # chunk, so the matches returned are always the first ones in walk
+        # order, whichever worker finishes first. Scanning stops once the
+        # finished leading chunks hold more than max_results matches; one
+        # extra match is enough to know the result is truncated.
+        chunks = [files[i:i + 64] for i in range(0, len(files), 64)]
+        found_by_chunk: List[Optional[List[Tuple[str, int, str]]]] = [None] * len(chunks)
+        state = {"done": 0, "found": 0}
+        stop = threading.Event()
+        lock = threading.Lock()
+
+        def scan(index: int):
+            if stop.is_set():
+                return
+            found = []
+            for relpath in chunks[index]:
+                if stop.is_set():
+                    return
+                found.extend(self._scan_file(root, relpath, compiled, literal, max_results + 1, stop))
+            with lock:
+                found_by_chunk[index] = found
+                while state["done"] < len(chunks) and found_by_chunk[state["done"]] is not None:
+                    state["found"] += len(found_by_chunk[state["done"]])
+                    state["done"] += 1
+                    if state["found"] > max_results:
+                        stop.set()
+                        break
+
+        if self.workers <= 1 or len(chunks) <= 1:
+            # Thread hand-offs cost more than they save without spare cores
+            for index in range(len(chunks)):
+                scan(index)
+        else:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                list(pool.map(scan, range(len(chunks))))
+
+        matches = [match for found in found_by_chunk[:state["done"]] for match in found]
+        return {
+            "status": "success",
+            "matches": [f"{relpath}:{line}: {text}" for relpath, line, text in matches[:max_results]],
+            "count": len(matches),
+            "truncated": len(matches) > max_results,
+            "files_scanned": len(files),
+        }
+
+    def _walk(self, root: str, path: str, include: List[str], exclude: List[str]) -> Iterator[str]:
+        rules = IgnoreRules.for_root(root)
+        start = os.path.normpath(path).replace(os.sep, "/")
+        stack = ["" if start in (".", "") else start.strip("/")]
+        while stack:
+            rel = stack.pop()
+            try:
+                with os.scandir(os.path.join(root, rel) if rel else root) as it:
+                    entries = sorted(it, key=lambda e: e.name)
+            except NotADirectoryError:
+                yield rel
+                continue
+            except OSError:
+                continue
+            dirs = []
+            for entry in entries:
+                child = f"{rel}/{entry.name}" if rel else entry.name
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                if rules.ignored(child, is_dir):
+                    continue
+                if is_dir:
+                    dirs.append(child)
+                    continue
+                if include and not any(fnmatch.fnmatch(child, g) or fnmatch.fnmatch(entry.name, g) for g in include):
+                    continue
+                if exclude and any(fnmatch.fnmatch(child, g) or fnmatch.fnmatch(entry.name, g) for g in exclude):
+                    continue
+                yield child
+            stack.extend(reversed(dirs))
+
+    def _scan_file(self, root: str, relpath: str, compiled, literal: Optional[bytes],
+                   max_results: int, stop: threading.Event) -> List[Tuple[str, int, str]]:
+        try:
+            with open(os.path.join(root, relpath), "rb") as f:
+                # read(n) preallocates n bytes, so only cap genuinely large files
+                size = os.fstat(f.fileno()).st_size
+                data = f.read(MAX_FILE_BYTES) if size > MAX_FILE_BYTES else f.read()
+        except OSError:
+            return []
+        if is_binary(data):
+            return []
+        # Whole-buffer check first: most files do not match at all
+        if literal is not None:
+            if literal not in data:
+                return []
+        elif not compiled.search(data):
+            return []
+
+        found = []
+        for i, line in enumerate(data.split(b"\n"), 1):
+            if compiled.search(line):
+                text = line.decode("utf-8", errors="replace").strip()
+                found.append((relpath, i, text))
+                if len(found) >= max_results or stop.is_set():
+                    break
+        return found
@@ -0,0 +1,189 @@
+from typing import Any, Dict, Set, Tuple
+import atexit
+import errno
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from src.core.workspace_hash import WorkspaceHasher, content_hash
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# ioctl(dest_fd, FICLONE, src_fd): share the source's extents copy-on-write (btrfs, XFS, ...)
+_FICLONE = 0x40049409
+_NO_REFLINK = (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS)
+# Cleared after the first clone the filesystem refuses
+_reflink = fcntl is not None and sys.platform.startswith("linux")
+
+
+def clone_file(source: str, target: str):
+    # Copy-on-write clone where supported, plain copy otherwise (contents only)
+    global _reflink
+    if _reflink:
+        try:
+            with open(source, "rb") as src, open(target, "wb") as dst:
+                fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+            return
+        except OSError as e:
+            if e.errno not in _NO_REFLINK:
+                raise
+            # Not supported here (ext4, tmpfs, different filesystems): stop trying
+            _reflink = False
+    shutil.copyfile(source, target)
+
+
+def clone_tree(source: str, target: str):
+    # shutil.copytree with clone_file for contents; modes and times are kept
+    def copy(src: str, dst: str):
+        clone_file(src, dst)
+        shutil.copystat(src, dst)
+    shutil.copytree(source, target, symlinks=True, copy_function=copy, dirs_exist_ok=True)
+
+
+class WorkspaceSnapshots:
+    # Rollback points for workspaces. A snapshot is a manifest of
+    # relpath -> (content hash, mode) plus the directory list; file contents
+    # live once per hash in an object directory, cloned copy-on-write where
+    # the filesystem supports it and copied otherwise. Hashes come from a
+    # WorkspaceHasher, so capturing again only reads files whose size or mtime
+    # changed and only stores contents not seen before; restoring rewrites
+    # just the files that differ and deletes what was created since. Files
+    # matched by .gitignore (and .git, .venv, ...) are not tracked.
+    # Objects are kept in a per-process directory and deleted on exit.
+    def __init__(self, directory: str = "memory/snapshots", hasher: WorkspaceHasher = None):
+        os.makedirs(directory, exist_ok=True)
+        self.objects_dir = tempfile.mkdtemp(prefix=f"{os.getpid()}_", dir=directory)
+        self.hasher = hasher or WorkspaceHasher()
+        # root -> (files {relpath: (hash, mode)}, dirs)
+        self._snapshots: Dict[str, Tuple[Dict[str, Tuple[str, int]], Set[str]]] = {}
+        self._stored: Set[str] = set()
+        # Captures in progress; their objects are not referenced by a snapshot yet
+        self._capturing = 0
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def capture(self, root: str) -> Dict[str, Any]:
+        root = os.path.abspath(root)
+        start = time.perf_counter()
+        with self._lock:
+            self._capturing += 1
+        try:
+            files, dirs = self.hasher.scan(root)
+            copied = copied_bytes = 0
+            unreadable = []
+            for relpath, (file_digest, mode) in list(files.items()):
+                with self._lock:
+                    if file_digest in self._stored:
+                        continue
+                path = os.path.join(root, relpath)
+                tmp_path = self._object(f".{file_digest}.{threading.get_ident()}")
+                try:
+                    clone_file(path, tmp_path)
+                    st = os.stat(path)
+                    if not self.hasher.is_current(root, relpath, st, file_digest):
+                        # Written between hashing and cloning: the copy is what
+                        # a restore brings back, so the snapshot records its hash
+                        with open(tmp_path, "rb") as f:
+                            file_digest = content_hash(f.read())
+                        files[relpath] = (file_digest, mode)
+                    copied_bytes += os.path.getsize(tmp_path)
+                    os.replace(tmp_path, self._object(file_digest))
+                except OSError:
+                    # Vanished or unreadable: left out of the snapshot
+                    unreadable.append(relpath)
+                    try:
+                        os.remove(tmp_path)
+                    except OSError:
+                        pass
+                    continue
+                copied += 1
+                with self._lock:
+                    self._stored.add(file_digest)
+            for relpath in unreadable:
+                del files[relpath]
+            with self._lock:
+                self._snapshots[root] = (files, dirs)
+        finally:
+            with self._lock:
+                self._capturing -= 1
+        return {"files": len(files), "copied": copied, "copied_bytes": copied_bytes,
+                "seconds": round(time.perf_counter() - start, 6)}
+
+    def restore(self, root: str) -> Dict[str, Any]:
+        # Returns None if no snapshot of root was captured
+        root = os.path.abspath(root)
+        with self._lock:
+            snapshot = self._snapshots.get(root)
+        if snapshot is None:
+            return None
+        start = time.perf_counter()
+        files, dirs = snapshot
+        current_files, current_dirs = self.hasher.scan(root)
+
+        # Directories created since the snapshot go as a whole (outermost only)
+        removed = 0
+        new_dirs = sorted(d for d in current_dirs if d not in dirs)
+        gone: Set[str] = set()
+        for relpath in new_dirs:
+            parent = relpath.rsplit("/", 1)[0] if "/" in relpath else ""
+            if parent and parent not in dirs:
+                continue
+            shutil.rmtree(os.path.join(root, relpath), ignore_errors=True)
+            gone.add(relpath + "/")
+            removed += 1
+        for relpath in current_files:
+            if relpath not in files and not any(relpath.startswith(d) for d in gone):
+                try:
+                    os.remove(os.path.join(root, relpath))
+                    removed += 1
+                except OSError:
+                    pass
+
+        restored = 0
+        for relpath in sorted(dirs):
+            os.makedirs(os.path.join(root, relpath), exist_ok=True)
+        for relpath, (file_digest, mode) in files.items():
+            path = os.path.join(root, relpath)
+            current = current_files.get(relpath)
+            if current is not None and current[0] == file_digest:
+                if current[1] != mode:
+                    os.chmod(path, mode & 0o7777)
+                continue
+            # Clone to a temp name first so a file is never half-restored
+            tmp_path = os.path.join(os.path.dirname(path), f".restore_{os.path.basename(path)}")
+            clone_file(self._object(file_digest), tmp_path)
+            os.chmod(tmp_path, mode & 0o7777)
+            os.replace(tmp_path, path)
+            self.hasher.remember(root, relpath, file_digest)
+            restored += 1
+        return {"restored": restored, "removed": removed, "files": len(files),
+                "seconds": round(time.perf_counter() - start, 6)}
+
+    def discard(self, root: str):
+        # Drop the workspace's snapshot and any objects no other snapshot uses
+        with self._lock:
+            self._snapshots.pop(os.path.abspath(root), None)
+            if self._capturing:
+                return
+            live = {entry[0] for files, _ in self._snapshots.values() for entry in files.values()}
+            unused = self._stored - live
+            self._stored -= unused
+        for file_digest in unused:
+            try:
+                os.remove(self._object(file_digest))
+            except OSError:
+                pass
+
+    def close(self):
+        with self._lock:
+            self._snapshots.clear()
+            self._stored.clear()
+        shutil.rmtree(self.objects_dir, ignore_errors=True)
+
+    def _object(self, file_digest: str) -> str:
+        return os.path.join(self.objects_dir, file_digest)
@@ -0,0 +1,195 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List
+import os
+import shutil
+import tempfile
+import threading
+import time
+from src.core.snapshot import clone_tree
+from src.utils.tracing import span
+
+
+def _cpu_seconds() -> float:
+    # This process plus its waited-for children (children are 0 on Windows)
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+class SpeculativeRunner:
+    # Races several candidate plans for one attempt. All candidates are
+    # requested from the planner at once; each plan starts as soon as it
+    # arrives, in its own copy of the workspace, on a pool of max_workers. The
+    # first candidate whose plan (including its verify step) succeeds wins: the
+    # others are cancelled (running commands killed, background processes
+    # stopped) and the winner's copy replaces the workspace. If none succeeds
+    # the workspace is left as it was. The statistics returned make the cost
+    # visible next to the serial loop: wall time, CPU time and step time spent
+    # on candidates that were thrown away.
+    def __init__(self, planner, scheduler, executor, supervisor, candidates: int = 3, max_workers: int = None,
+                 forget: Callable[[str], None] = None):
+        self.planner = planner
+        self.scheduler = scheduler
+        self.executor = executor
+        self.supervisor = supervisor
+        self.candidates = max(2, candidates)
+        self.max_workers = max(1, max_workers or self.candidates)
+        # Called with each deleted sandbox so per-workspace caches can drop it
+        self.forget = forget
+
+    def run(self, task: str, context: Dict[str, Any], feedback: str, workspace: str,
+            completed: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+        completed = completed or []
+        start, cpu_start = time.perf_counter(), _cpu_seconds()
+        won = threading.Event()
+        lock = threading.Lock()
+        state = {"winner": None}
+        sandboxes: List[str] = []
+        records: List[Dict[str, Any]] = []
+
+        def plan(index: int):
+            plan_start = time.perf_counter()
+            usage = {}
+            steps = completed + self.planner.create_plan(task, context, feedback, completed=completed or None,
+                                                         variant=(index, self.candidates), usage=usage)
+            return steps, time.perf_counter() - plan_start, usage.get("total", {}).get("tokens")
+
+        def execute(record: Dict[str, Any]) -> Dict[str, Any]:
+            # A candidate that raises (copying the workspace, running its
+            # plan) is out of the race; the others can still win
+            try:
+                return attempt(record)
+            except Exception as e:
+                if state["winner"] is record:
+                    # Its plan succeeded; only cancelling the others failed
+                    record["status"] = "success"
+                    return record
+                record["status"] = "error"
+                record["error"] = f"{type(e).__name__}: {e}"[-200:]
+                return record
+
+        def attempt(record: Dict[str, Any]) -> Dict[str, Any]:
+            if won.is_set():
+                record["status"] = "cancelled"
+                return record
+            parent, name = os.path.split(os.path.abspath(workspace))
+            sandbox = tempfile.mkdtemp(prefix=f".{name}.candidate{record['candidate']}_", dir=parent)
+            self.executor.cancellable(sandbox)
+            self.executor.alias(sandbox, workspace)
+            with lock:
+                sandboxes.append(sandbox)
+            if won.is_set():
+                # A winner was picked while this one was being set up
+                self.executor.cancel(sandbox)
+            record["sandbox"] = sandbox
+            with span("candidate", "speculate", candidate=record["candidate"]) as candidate_span:
+                clone_tree(workspace, sandbox)
+                outcome = self.scheduler.run(record["plan"], cwd=sandbox)
+                record["outcome"] = outcome
+                record["step_s"] = outcome["timing"].get("step_time", 0.0)
+                if outcome["status"] == "success":
+                    with lock:
+                        if state["winner"] is None:
+                            state["winner"] = record
+                            won.set()
+                    if state["winner"] is record:
+                        self._cancel_others(sandbox, sandboxes, lock)
+                        record["status"] = "success"
+                    else:
+                        record["status"] = "cancelled"
+                else:
+                    failed = outcome["failed"]["result"] if outcome.get("failed") else {}
+                    record["status"] = "cancelled" if failed.get("status") == "cancelled" else "failure"
+                    if record["status"] == "failure":
+                        record["error"] = str(failed.get("stderr") or failed.get("error") or "")[-200:]
+                candidate_span.set(status=record["status"])
+            return record
+
+        plan_pool = ThreadPoolExecutor(max_workers=self.candidates, thread_name_prefix="candidate-plan")
+        run_pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="candidate")
+        try:
+            planning = {plan_pool.submit(plan, i): i for i in range(1, self.candidates + 1)}
+            running = set()
+            while (planning or running) and not won.is_set():
+                done, _ = wait(set(planning) | running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in planning:
+                        index = planning.pop(future)
+                        try:
+                            steps, plan_s, prompt_tokens = future.result()
+                        except Exception as e:
+                            records.append({"candidate": index, "status": "error", "error": str(e)})
+                            continue
+                        print(f"Candidate {index} plan: {steps}")
+                        running.add(run_pool.submit(execute, {"candidate": index, "plan": steps,
+                                                              "plan_s": round(plan_s, 6),
+                                                              "prompt_tokens": prompt_tokens}))
+                    else:
+                        running.discard(future)
+                        records.append(future.result())
+            # Losers stop quickly once cancelled; plans still being generated are abandoned
+            for future in running:
+                records.append(future.result())
+            records.extend({"candidate": index, "status": "cancelled"} for index in planning.values())
+        finally:
+            plan_pool.shutdown(wait=False, cancel_futures=True)
+            run_pool.shutdown(wait=True)
+
+        winner = state["winner"]
+        for sandbox in sandboxes:
+            self.supervisor.stop_workspace(sandbox)
+            self.executor.release(sandbox)
+            if self.forget is not None:
+                self.forget(sandbox)
+            if winner is None or sandbox != winner["sandbox"]:
+                shutil.rmtree(sandbox, ignore_errors=True)
+        if winner is not None:
+            self._commit(winner["sandbox"], workspace)
+
+        records.sort(key=lambda r: r["candidate"])
+        executed = [r for r in records if "outcome" in r]
+        # Without a winner, the candidate that got furthest drives the feedback
+        best = winner or max(executed,
+                             key=lambda r: (sum(1 for s in r["outcome"]["steps"]
+                                                if s["result"].get("status") == "success"), -r["candidate"]),
+                             default=None)
+        stats = {
+            "candidates": self.candidates,
+            "max_workers": self.max_workers,
+            "winner": winner["candidate"] if winner else None,
+            "executed": len(executed),
+            "failed": sum(1 for r in records if r["status"] in ("failure", "error")),
+            "cancelled": sum(1 for r in records if r["status"] == "cancelled"),
+            "wall_s": round(time.perf_counter() - start, 6),
+            "cpu_s": round(_cpu_seconds() - cpu_start, 6),
+            "step_s": round(sum(r.get("step_s", 0.0) for r in executed), 6),
+            "wasted_step_s": round(sum(r.get("step_s", 0.0) for r in executed if r is not winner), 6),
+            # All candidates' prompts (abandoned plans never reported theirs)
+            "prompt_tokens": sum(r.get("prompt_tokens") or 0 for r in records),
+            "per_candidate": [{k: r[k] for k in ("candidate", "status", "plan_s", "prompt_tokens", "step_s", "error")
+                               if k in r} for r in records],
+        }
+        return {"winner": winner, "best": best, "candidates": records, "stats": stats}
+
+    def _cancel_others(self, winner: str, sandboxes: List[str], lock: threading.Lock):
+        with lock:
+            others = [sandbox for sandbox in sandboxes if sandbox != winner]
+        for sandbox in others:
+            self.executor.cancel(sandbox)
+            self.supervisor.stop_workspace(sandbox)
+
+    def _commit(self, sandbox: str, workspace: str):
+        # Same filesystem (sandboxes are siblings of the workspace): the
+        # workspace is renamed aside, the sandbox takes its place and only then
+        # is the old copy deleted, so a failure never leaves a half-deleted
+        # workspace
+        parent, name = os.path.split(os.path.abspath(workspace))
+        os.chmod(sandbox, os.stat(workspace).st_mode & 0o7777)
+        trash = tempfile.mkdtemp(prefix=f".{name}.replaced_", dir=parent)
+        old = os.path.join(trash, name)
+        os.rename(workspace, old)
+        try:
+            os.rename(sandbox, workspace)
+        except OSError:
+            os.rename(old, workspace)
+            raise
+        shutil.rmtree(trash, ignore_errors=True)
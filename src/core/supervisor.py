@@ -0,0 +1,155 @@
+from typing import Any, Dict, List, Optional
+import atexit
+import os
+import re
+import socket
+import subprocess
+import threading
+import time
+from src.utils.process import new_group_kwargs, terminate_group
+
+
+class ManagedProcess:
+    def __init__(self, command: str, cwd: str, proc: subprocess.Popen, log_path: str):
+        self.command = command
+        self.cwd = cwd
+        self.proc = proc
+        self.pid = proc.pid
+        self.log_path = log_path
+        self.started = time.time()
+        self.drainer: Optional[threading.Thread] = None
+
+    def running(self) -> bool:
+        return self.proc.poll() is None
+
+
+class ProcessSupervisor:
+    # Owns every background process started by a step. Output is drained on a
+    # thread into a size-capped, rotating log file (so the child never blocks
+    # on a full pipe), readiness can be awaited by port or log line, and each
+    # workspace's processes are killed as a group when its task ends or retries.
+    def __init__(self, log_dir: str = "memory/processes", max_log_bytes: int = 1024 * 1024,
+                 log_backups: int = 2):
+        self.log_dir = log_dir
+        self.max_log_bytes = max_log_bytes
+        self.log_backups = log_backups
+        self.processes: Dict[str, List[ManagedProcess]] = {}
+        self._lock = threading.Lock()
+        atexit.register(self.stop_all)
+
+    def start(self, command: str, cwd: str) -> ManagedProcess:
+        os.makedirs(self.log_dir, exist_ok=True)
+        proc = subprocess.Popen(
+            command,
+            shell=True,
+            cwd=cwd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            **new_group_kwargs()
+        )
+        slug = re.sub(r"[^a-zA-Z0-9]", "_", os.path.basename(os.path.abspath(cwd)))[:40]
+        log_path = os.path.join(self.log_dir, f"{slug}_{proc.pid}.log")
+        managed = ManagedProcess(command, cwd, proc, log_path)
+        managed.drainer = threading.Thread(target=self._drain, args=(managed,), daemon=True)
+        managed.drainer.start()
+        with self._lock:
+            self.processes.setdefault(self._key(cwd), []).append(managed)
+        return managed
+
+    def list(self, cwd: str) -> List[ManagedProcess]:
+        with self._lock:
+            return list(self.processes.get(self._key(cwd), []))
+
+    def wait_for_port(self, port: int, host: str = "127.0.0.1", timeout: float = 30.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                with socket.create_connection((host, int(port)), timeout=1.0):
+                    return True
+            except OSError:
+                if time.monotonic() >= deadline:
+                    return False
+                time.sleep(0.2)
+
+    def wait_for_log(self, cwd: str, pattern: str, timeout: float = 30.0) -> bool:
+        # Matches against the current log file of every process in the workspace
+        regex = re.compile(pattern)
+        deadline = time.monotonic() + timeout
+        while True:
+            for managed in self.list(cwd):
+                try:
+                    with open(managed.log_path, "r", errors="replace") as f:
+                        if regex.search(f.read()):
+                            return True
+                except OSError:
+                    pass
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.2)
+
+    def wait_ready(self, cwd: str, spec: Dict[str, Any]) -> Optional[str]:
+        # spec: {"port": 8000, "host": "127.0.0.1", "log": "regex", "timeout": 30}.
+        # Returns None when ready, otherwise a description of what failed.
+        timeout = float(spec.get("timeout", 30))
+        if spec.get("port") is not None:
+            if not self.wait_for_port(spec["port"], spec.get("host", "127.0.0.1"), timeout):
+                return f"Port {spec['port']} did not open within {timeout:g}s.{self._exited(cwd)}"
+        if spec.get("log"):
+            if not self.wait_for_log(cwd, spec["log"], timeout):
+                return f"No log line matching '{spec['log']}' within {timeout:g}s.{self._exited(cwd)}"
+        return None
+
+    def tail(self, managed: ManagedProcess, max_bytes: int = 2048) -> str:
+        try:
+            with open(managed.log_path, "rb") as f:
+                f.seek(max(0, os.path.getsize(managed.log_path) - max_bytes))
+                return f.read().decode("utf-8", errors="replace")
+        except OSError:
+            return ""
+
+    def stop_workspace(self, cwd: str) -> int:
+        with self._lock:
+            managed_list = self.processes.pop(self._key(cwd), [])
+        for managed in managed_list:
+            terminate_group(managed.proc)
+            if managed.drainer is not None:
+                managed.drainer.join(timeout=5)
+        return len(managed_list)
+
+    def stop_all(self):
+        with self._lock:
+            workspaces = list(self.processes)
+        for cwd in workspaces:
+            self.stop_workspace(cwd)
+
+    def _exited(self, cwd: str) -> str:
+        for managed in self.list(cwd):
+            if not managed.running():
+                return f" Process {managed.pid} exited with {managed.proc.returncode}: {self.tail(managed, 500)}"
+        return ""
+
+    def _drain(self, managed: ManagedProcess):
+        log = open(managed.log_path, "ab")
+        try:
+            for chunk in iter(lambda: managed.proc.stdout.read1(65536), b""):
+                log.write(chunk)
+                log.flush()
+                if log.tell() >= self.max_log_bytes:
+                    log.close()
+                    self._rotate(managed.log_path)
+                    log = open(managed.log_path, "ab")
+        finally:
+            log.close()
+            managed.proc.stdout.close()
+            # Reap the child as soon as it exits so it does not linger as a zombie
+            managed.proc.wait()
+
+    def _rotate(self, path: str):
+        for i in range(self.log_backups, 0, -1):
+            source = f"{path}.{i - 1}" if i > 1 else path
+            if os.path.exists(source):
+                os.replace(source, f"{path}.{i}")
+
+    def _key(self, cwd: str) -> str:
+        return os.path.abspath(cwd)
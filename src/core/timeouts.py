@@ -0,0 +1,109 @@
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, Optional, Tuple
+import math
+import os
+import re
+import shlex
+import threading
+
+_ENV_ASSIGNMENT = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*=")
+
+
+def command_key(command: str) -> str:
+    # Groups similar commands: the program plus its first non-flag argument
+    # ("cargo build --release" -> "cargo build", "cd app && npm test" -> "npm test").
+    # For chained commands the last segment decides, as it is usually the long one.
+    segment = re.split(r"&&|\|\||;", command)[-1].strip()
+    try:
+        words = shlex.split(segment)
+    except ValueError:
+        words = segment.split()
+    words = [w for w in words if not _ENV_ASSIGNMENT.match(w)]
+    if not words:
+        return command.strip()[:60]
+    key = [os.path.basename(words[0])]
+    for word in words[1:]:
+        if not word.startswith("-"):
+            key.append(word)
+            break
+    return " ".join(key)
+
+
+def _scope(workspace: Optional[str]) -> Optional[str]:
+    return os.path.abspath(workspace) if workspace else None
+
+
+class TimeoutModel:
+    # Learns a timeout per workspace and command key from the durations of
+    # earlier runs: p95 * margin, clamped to [min_timeout, max_timeout]. Keys
+    # with fewer than min_samples runs get the default. A run that timed out
+    # only tells us the command needs longer than its limit, so the next limit
+    # is at least double. "pytest" in one project says nothing about another,
+    # so samples are not shared between workspaces. The floor defaults to the
+    # default, so learning only ever raises a limit above what it used to be.
+    # History is read from episodic memory on first use, then kept up to date
+    # with observe().
+    def __init__(self, default: float = 60.0, margin: float = 2.0, min_timeout: float = 60.0,
+                 max_timeout: float = 3600.0, min_samples: int = 3, window: int = 50,
+                 history: Callable[[], Iterable[Dict[str, Any]]] = None):
+        self.default = default
+        self.margin = margin
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.min_samples = min_samples
+        self.window = window
+        self.history = history
+        self.samples: Dict[Tuple[Optional[str], str], Deque[Tuple[float, Optional[float]]]] = {}
+        self._loaded = history is None
+        self._lock = threading.Lock()
+
+    def timeout_for(self, command: str, workspace: str = None) -> Tuple[float, str]:
+        # Returns (seconds, source), source being "learned" or "default"
+        with self._lock:
+            self._load()
+            samples = self.samples.get((_scope(workspace), command_key(command)))
+        if not samples or len(samples) < self.min_samples:
+            limits = [limit for _, limit in samples or () if limit is not None]
+            if limits:
+                return min(self.max_timeout, float(max(limits)) * 2), "learned"
+            return self.default, "default"
+        durations = sorted(duration for duration, _ in samples)
+        p95 = durations[min(len(durations) - 1, math.ceil(0.95 * len(durations)) - 1)]
+        timeout = p95 * self.margin
+        limits = [limit for _, limit in samples if limit is not None]
+        if limits:
+            timeout = max(timeout, max(limits) * 2)
+        return min(self.max_timeout, max(self.min_timeout, timeout)), "learned"
+
+    def observe(self, trace: Dict[str, Any]):
+        with self._lock:
+            self._observe(trace)
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        # Newest first from memory; replay oldest first so the window keeps the latest runs
+        for trace in reversed(list(self.history())):
+            self._observe(trace)
+
+    def _observe(self, trace: Dict[str, Any]):
+        scope = _scope(trace.get("workspace"))
+        for record in trace.get("steps", []):
+            step, result = record.get("step", {}), record.get("result", {})
+            # Cached verify results did not run, so their duration says nothing
+            if step.get("type") not in ("command", "verify") or step.get("background") or result.get("cached"):
+                continue
+            duration = (record.get("timing") or {}).get("duration")
+            if duration is None:
+                continue
+            # Time spent waiting for a batch process slot is not the command's
+            duration = max(0.0, duration - result.get("queued", 0.0))
+            if result.get("timed_out"):
+                sample = (duration, result.get("timeout", duration))
+            elif "returncode" in result:
+                sample = (duration, None)
+            else:
+                continue
+            key = (scope, command_key(step.get("command", "")))
+            self.samples.setdefault(key, deque(maxlen=self.window)).append(sample)
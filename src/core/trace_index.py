@@ -0,0 +1,181 @@
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import Any, Dict, List
+import json
+import os
+import threading
+from src.core.log_store import SegmentedLog
+
+INDEX_FIELDS = ("task", "status", "timestamp", "workspace")
+# Index rows are compact lists: [segment, offset, length, task, status, timestamp, workspace]
+SEG, OFF, LEN, TASK, STATUS, TIMESTAMP, WORKSPACE = range(7)
+
+
+class TraceIndex:
+    # Metadata-only view of the episodic log. Each entry records where a trace
+    # lives (segment, offset, length) plus the fields we filter on, so startup
+    # reads the small index file instead of parsing every trace body.
+    def __init__(self, log: SegmentedLog, index_file: str, fsync: bool = True):
+        self.log = log
+        self.index_file = index_file
+        self.fsync = fsync
+        self.entries: List[list] = []
+        # Secondary lookups are built on first query so startup only parses rows.
+        self._lookups: Dict[int, Dict[Any, List[int]]] = {}
+        self.load()
+
+    def load(self):
+        entries = []
+        if os.path.exists(self.index_file):
+            with open(self.index_file, "rb") as f:
+                data = f.read()
+            try:
+                # One bulk parse is much cheaper than a json.loads per line
+                entries = json.loads(b"[" + data.rstrip(b"\n").replace(b"\n", b",") + b"]")
+            except ValueError:
+                # Torn index line; the log is the source of truth
+                self.rebuild()
+                return
+        live = set(self.log.segments)
+        if any(e[SEG] not in live for e in entries):
+            # Log was compacted after the index was last written
+            self.rebuild()
+            return
+        self._set_entries(entries)
+        self._catch_up()
+
+    def rebuild(self):
+        entries = [self._entry(seg, off, length, record) for seg, off, length, record in self.log.scan()]
+        self._write_all(entries)
+        self._set_entries(entries)
+
+    def relocate(self, locations: List[tuple]):
+        # After a compaction that rewrote the same traces in the same order
+        # only their positions change; anything else needs a full rebuild
+        if len(locations) != len(self.entries):
+            self.rebuild()
+            return
+        for entry, (seg, off, length) in zip(self.entries, locations):
+            entry[SEG], entry[OFF], entry[LEN] = seg, off, length
+        self._write_all(self.entries)
+
+    def add(self, location, record: Dict[str, Any]):
+        entry = self._entry(*location, record)
+        with open(self.index_file, "ab") as f:
+            f.write(self._encode(entry))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self._insert(entry)
+
+    def query(self, task: str = None, status: str = None, workspace: str = None,
+              since: float = None) -> List[int]:
+        candidates = None
+        for column, key in ((TASK, task), (STATUS, status), (WORKSPACE, workspace)):
+            if key is None:
+                continue
+            positions = self._lookup(column).get(key, [])
+            candidates = positions if candidates is None else sorted(set(candidates) & set(positions))
+        if candidates is None:
+            candidates = range(len(self.entries))
+        if since is not None:
+            candidates = [i for i in candidates if (self.entries[i][TIMESTAMP] or 0) >= since]
+        return list(candidates)
+
+    def metadata(self, i: int) -> Dict[str, Any]:
+        entry = self.entries[i]
+        return {"task": entry[TASK], "status": entry[STATUS], "timestamp": entry[TIMESTAMP], "workspace": entry[WORKSPACE]}
+
+    def _lookup(self, column: int) -> Dict[Any, List[int]]:
+        if column not in self._lookups:
+            table: Dict[Any, List[int]] = {}
+            for position, entry in enumerate(self.entries):
+                table.setdefault(entry[column], []).append(position)
+            self._lookups[column] = table
+        return self._lookups[column]
+
+    def _catch_up(self):
+        # Index appends happen after the log append; pick up any traces a crash
+        # left unindexed after the last indexed position.
+        start = (0, 0)
+        if self.entries:
+            last = self.entries[-1]
+            start = (last[SEG], last[OFF] + last[LEN])
+        for seg, off, length, record in self.log.scan(start=start):
+            self.add((seg, off, length), record)
+
+    def _entry(self, seg: int, off: int, length: int, record: Dict[str, Any]) -> list:
+        return [seg, off, length] + [record.get(field) for field in INDEX_FIELDS]
+
+    def _encode(self, entry: list) -> bytes:
+        return (json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8")
+
+    def _set_entries(self, entries: List[list]):
+        self.entries = entries
+        self._lookups = {}
+
+    def _insert(self, entry: list):
+        position = len(self.entries)
+        self.entries.append(entry)
+        for column, table in self._lookups.items():
+            table.setdefault(entry[column], []).append(position)
+
+    def _write_all(self, entries: List[list]):
+        tmp_path = self.index_file + ".tmp"
+        with open(tmp_path, "wb") as f:
+            for entry in entries:
+                f.write(self._encode(entry))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_file)
+
+
+class LazyTraceList(Sequence):
+    # List-like stand-in for the old in-memory episodic list. Trace bodies are
+    # read from the log on first access (and passed through decode, if given)
+    # and kept in a small LRU cache.
+    def __init__(self, index: TraceIndex, on_append=None, cache_size: int = 128, lock=None, decode=None):
+        self.index = index
+        self.on_append = on_append
+        self.decode = decode
+        self.cache_size = cache_size
+        self.lock = lock or threading.RLock()
+        self._cache: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.index.entries)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        with self.lock:
+            if i < 0:
+                i += len(self)
+            if not 0 <= i < len(self):
+                raise IndexError("trace index out of range")
+            if i in self._cache:
+                self._cache.move_to_end(i)
+                return self._cache[i]
+            entry = self.index.entries[i]
+            trace = self.index.log.read(entry[SEG], entry[OFF], entry[LEN])
+            if self.decode is not None:
+                trace = self.decode(trace)
+            self.remember(i, trace)
+            return trace
+
+    def append(self, trace: Dict[str, Any]):
+        self.on_append(trace)
+
+    def metadata(self, i: int) -> Dict[str, Any]:
+        return self.index.metadata(i)
+
+    def remember(self, i: int, trace: Dict[str, Any]):
+        with self.lock:
+            self._cache[i] = trace
+            self._cache.move_to_end(i)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def clear_cache(self):
+        self._cache.clear()
@@ -0,0 +1,158 @@
+from typing import Dict, List, Tuple
+import fnmatch
+import os
+import threading
+
+DEFAULT_IGNORES = [".git/", "__pycache__/", ".venv/", ".env"]
+
+
+class IgnoreRules:
+    # Minimal .gitignore matcher: globs, trailing "/" for directories, leading
+    # or inner "/" to anchor at the root, "**/" for any number of directories
+    # (including none) and "!" negation (last match wins).
+    def __init__(self, lines: List[str]):
+        self.rules = []
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            anchored = "/" in line
+            line = line.lstrip("/")
+            # fnmatch's "*" already crosses "/", so "**" works as "*" except
+            # where it stands for no directories at all
+            patterns = [line]
+            if line.startswith("**/"):
+                patterns.append(line[3:])
+            if "/**/" in line:
+                patterns.extend(p.replace("/**/", "/") for p in list(patterns))
+            self.rules.append((patterns, negate, dir_only, anchored))
+
+    @classmethod
+    def for_root(cls, root: str) -> "IgnoreRules":
+        lines = list(DEFAULT_IGNORES)
+        path = os.path.join(root, ".gitignore")
+        if os.path.isfile(path):
+            with open(path, "r", errors="ignore") as f:
+                lines.extend(f.read().splitlines())
+        return cls(lines)
+
+    def ignored(self, relpath: str, is_dir: bool) -> bool:
+        name = relpath.rsplit("/", 1)[-1]
+        result = False
+        for patterns, negate, dir_only, anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+            target = relpath if anchored else name
+            if any(fnmatch.fnmatchcase(target, pattern) for pattern in patterns):
+                result = not negate
+        return result
+
+
+class TreeCache:
+    # Cached directory listings keyed on each directory's mtime. A directory's
+    # mtime changes whenever entries are added, removed or renamed, so a
+    # refresh only re-lists directories that changed and just stats the rest.
+    # Rendering is bounded by depth and entry budgets to keep prompts small.
+    def __init__(self, max_depth: int = 6, max_entries: int = 300, max_entries_per_dir: int = 50):
+        self.max_depth = max_depth
+        self.max_entries = max_entries
+        self.max_entries_per_dir = max_entries_per_dir
+        # root -> relative dir -> (mtime_ns, [(name, is_dir)])
+        self._listings: Dict[str, Dict[str, Tuple[int, List[Tuple[str, bool]]]]] = {}
+        self._ignores: Dict[str, Tuple[int, IgnoreRules]] = {}
+        self._lock = threading.Lock()
+        self.relisted = 0
+
+    def render(self, root: str) -> str:
+        if not os.path.isdir(root):
+            return ""
+        with self._lock:
+            listings = self._listings.setdefault(root, {})
+            rules = self._rules(root)
+            lines: List[str] = []
+            # budget: [entries rendered, truncation already reported]
+            self._render_dir(root, "", "", 0, rules, listings, lines, [0, False])
+            return "".join(lines)
+
+    def invalidate(self, root: str, relpath: str = ""):
+        # Forget a directory's listing (e.g. after write_file) in case the
+        # filesystem's mtime resolution hides the change.
+        with self._lock:
+            listings = self._listings.get(root)
+            if listings is not None:
+                listings.pop(relpath.strip("/").replace(os.sep, "/"), None)
+
+    def note_step(self, step: Dict, root: str):
+        if step.get("type") in ("write_file", "edit_file") and step.get("filename"):
+            parent = os.path.dirname(os.path.normpath(step["filename"]))
+            self.invalidate(root, "" if parent in ("", ".") else parent)
+            if os.path.basename(step["filename"]) == ".gitignore":
+                self._ignores.pop(root, None)
+
+    def _rules(self, root: str) -> IgnoreRules:
+        path = os.path.join(root, ".gitignore")
+        mtime = os.stat(path).st_mtime_ns if os.path.exists(path) else 0
+        cached = self._ignores.get(root)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, IgnoreRules.for_root(root))
+            self._ignores[root] = cached
+        return cached[1]
+
+    def _list(self, root: str, rel: str, listings) -> List[Tuple[str, bool]]:
+        path = os.path.join(root, rel) if rel else root
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return []
+        cached = listings.get(rel)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        entries = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        entries.append((entry.name, entry.is_dir()))
+                    except OSError:
+                        continue
+        except OSError:
+            return []
+        entries.sort()
+        listings[rel] = (mtime, entries)
+        self.relisted += 1
+        return entries
+
+    def _render_dir(self, root: str, rel: str, prefix: str, depth: int, rules: IgnoreRules,
+                    listings, lines: List[str], count: list):
+        items = []
+        for name, is_dir in self._list(root, rel, listings):
+            child = f"{rel}/{name}" if rel else name
+            if not rules.ignored(child, is_dir):
+                items.append((name, is_dir, child))
+
+        hidden = max(0, len(items) - self.max_entries_per_dir)
+        items = items[:self.max_entries_per_dir]
+        for i, (name, is_dir, child) in enumerate(items):
+            if count[0] >= self.max_entries:
+                if not count[1]:
+                    lines.append(f"{prefix}└── ... (entry budget reached)\n")
+                    count[1] = True
+                return
+            is_last = (i == len(items) - 1) and not hidden
+            connector = "└── " if is_last else "├── "
+            lines.append(f"{prefix}{connector}{name}\n")
+            count[0] += 1
+            if is_dir:
+                extension = "    " if is_last else "│   "
+                if depth + 1 >= self.max_depth:
+                    if self._list(root, child, listings):
+                        lines.append(f"{prefix}{extension}└── ...\n")
+                else:
+                    self._render_dir(root, child, prefix + extension, depth + 1, rules, listings, lines, count)
+        if hidden and not count[1]:
+            lines.append(f"{prefix}└── ... ({hidden} more entries)\n")
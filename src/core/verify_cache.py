@@ -0,0 +1,85 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+import hashlib
+import json
+import os
+import threading
+from src.core.workspace_hash import WorkspaceHasher
+from src.utils.tracing import span
+
+
+class VerifyCache:
+    # Reuses the result of a verify step when the same command already passed
+    # in the same workspace with identical content and the same tools. The key
+    # is (command, timeout, resolved workspace path, content hash of every
+    # non-ignored workspace file, size and mtime of every ignored one, tool
+    # fingerprint); the per-file hashes are cached on (size, mtime), so
+    # computing it only reads files that changed. Results are never shared
+    # between workspaces: a command can depend on things outside the tracked
+    # files. Only successes are kept: a failure may be fixed by something
+    # outside the workspace (e.g. a package install). Steps with "cache": false
+    # or "wait_for", workspaces with a running background process and
+    # workspaces with too many ignored files to stat always run. Reused
+    # results carry "cached": true.
+    def __init__(self, executor, hasher: WorkspaceHasher = None, fingerprint: Callable[[], str] = None,
+                 max_entries: int = 1024):
+        self.executor = executor
+        self.hasher = hasher or WorkspaceHasher()
+        self.fingerprint = fingerprint or (lambda: "")
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def execute_step(self, step: Dict[str, Any], cwd: str = ".") -> Dict[str, Any]:
+        if step.get("type") != "verify" or step.get("cache") is False or step.get("wait_for") \
+                or any(managed.running() for managed in self.executor.supervisor.list(cwd)):
+            return self.executor.execute_step(step, cwd)
+
+        with span("verify.cache", "executor") as cache_span:
+            key = self._key(step, cwd)
+            if key is None:
+                cache_span.set(hit=False, uncacheable=True)
+                return self.executor.execute_step(step, cwd)
+            with self._lock:
+                cached = self._entries.get(key)
+                if cached is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            cache_span.set(hit=cached is not None)
+        if cached is not None:
+            print(f"--- VERIFICATION STEP: {step['command']} (unchanged inputs, cached result) ---")
+            return dict(cached, cached=True)
+
+        result = self.executor.execute_step(step, cwd)
+        if result.get("status") == "success":
+            with self._lock:
+                self._entries[key] = result
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def _key(self, step: Dict[str, Any], cwd: str) -> str:
+        # None when the ignored files are too many to stat on every verify
+        ignored = self.hasher.ignored_state(cwd)
+        if ignored is None:
+            return None
+        key = {
+            "command": step.get("command"),
+            "timeout": step.get("timeout"),
+            "root": os.path.realpath(cwd),
+            "workspace": self.hasher.state(cwd),
+            "ignored": ignored,
+            "tools": self.fingerprint(),
+        }
+        return hashlib.sha1(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def __getattr__(self, name):
+        return getattr(self.executor, name)
@@ -0,0 +1,151 @@
+from typing import Dict, Iterator, Set, Tuple
+import hashlib
+import os
+import threading
+from src.core.tree_view import IgnoreRules
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+class WorkspaceHasher:
+    # Content hashes of workspace files, cached per file on (size, mtime_ns) so
+    # only files that changed since the last call are read again. snapshot()
+    # maps every non-ignored file to its hash; state() folds that into one digest.
+    def __init__(self):
+        # root -> relpath -> (size, mtime_ns, sha1)
+        self._files: Dict[str, Dict[str, Tuple[int, int, str]]] = {}
+        self._lock = threading.Lock()
+
+    def file_hash(self, root: str, relpath: str) -> str:
+        root = os.path.abspath(root)
+        relpath = os.path.normpath(relpath).replace(os.sep, "/")
+        try:
+            st = os.stat(os.path.join(root, relpath))
+        except OSError:
+            return None
+        with self._lock:
+            return self._hash(root, relpath, st)
+
+    def snapshot(self, root: str) -> Dict[str, str]:
+        # relpath -> content hash for every non-ignored file
+        return {relpath: entry[0] for relpath, entry in self.scan(root)[0].items()}
+
+    def scan(self, root: str) -> Tuple[Dict[str, Tuple[str, int]], Set[str]]:
+        # relpath -> (content hash, st_mode) for every non-ignored file, plus
+        # the non-ignored directories
+        root = os.path.abspath(root)
+        files: Dict[str, Tuple[str, int]] = {}
+        dirs: Set[str] = set()
+        with self._lock:
+            for relpath, st in self._walk(root, dirs):
+                file_digest = self._hash(root, relpath, st)
+                if file_digest is not None:
+                    files[relpath] = (file_digest, st.st_mode)
+            cached = self._files.get(root, {})
+            for relpath in [p for p in cached if p not in files]:
+                del cached[relpath]
+        return files, dirs
+
+    def remember(self, root: str, relpath: str, file_digest: str):
+        # Record the hash of a file just written with known content, so the
+        # next scan does not read it back
+        root = os.path.abspath(root)
+        try:
+            st = os.stat(os.path.join(root, relpath))
+        except OSError:
+            return
+        with self._lock:
+            self._files.setdefault(root, {})[relpath] = (st.st_size, st.st_mtime_ns, file_digest)
+
+    def is_current(self, root: str, relpath: str, st: os.stat_result, file_digest: str) -> bool:
+        # Whether file_digest was computed for a file with st's size and mtime,
+        # i.e. the file has not been written since it was hashed
+        with self._lock:
+            entry = self._files.get(os.path.abspath(root), {}).get(relpath)
+        return entry == (st.st_size, st.st_mtime_ns, file_digest)
+
+    def state(self, root: str) -> str:
+        digest = hashlib.sha1()
+        for relpath, file_digest in sorted(self.snapshot(root).items()):
+            digest.update(f"{relpath}\0{file_digest}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def ignored_state(self, root: str, max_files: int = 20000) -> str:
+        # Digest of the files snapshot() leaves out (.env, .venv, build output):
+        # path, size and mtime only, so adding, removing or rewriting one changes
+        # it without reading contents. None if there are more than max_files.
+        root = os.path.abspath(root)
+        rules = IgnoreRules.for_root(root)
+        digest = hashlib.sha1()
+        count = 0
+        stack = [("", False)]
+        while stack:
+            rel, hidden = stack.pop()
+            try:
+                with os.scandir(os.path.join(root, rel) if rel else root) as it:
+                    entries = sorted(it, key=lambda e: e.name)
+            except OSError:
+                continue
+            for entry in entries:
+                child = f"{rel}/{entry.name}" if rel else entry.name
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    child_hidden = hidden or rules.ignored(child, is_dir)
+                    if is_dir:
+                        stack.append((child, child_hidden))
+                        continue
+                    if not child_hidden:
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                count += 1
+                if count > max_files:
+                    return None
+                digest.update(f"{child}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def forget(self, root: str):
+        with self._lock:
+            self._files.pop(os.path.abspath(root), None)
+
+    def _hash(self, root: str, relpath: str, st: os.stat_result) -> str:
+        cached = self._files.setdefault(root, {})
+        entry = cached.get(relpath)
+        if entry is not None and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return entry[2]
+        try:
+            with open(os.path.join(root, relpath), "rb") as f:
+                file_digest = content_hash(f.read())
+        except OSError:
+            cached.pop(relpath, None)
+            return None
+        cached[relpath] = (st.st_size, st.st_mtime_ns, file_digest)
+        return file_digest
+
+    def _walk(self, root: str, dirs: Set[str] = None) -> Iterator[Tuple[str, os.stat_result]]:
+        rules = IgnoreRules.for_root(root)
+        stack = [""]
+        while stack:
+            rel = stack.pop()
+            try:
+                with os.scandir(os.path.join(root, rel) if rel else root) as it:
+                    entries = sorted(it, key=lambda e: e.name)
+            except OSError:
+                continue
+            for entry in entries:
+                child = f"{rel}/{entry.name}" if rel else entry.name
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    if rules.ignored(child, is_dir):
+                        continue
+                    if is_dir:
+                        stack.append(child)
+                        if dirs is not None:
+                            dirs.add(child)
+                    elif entry.is_file():
+                        yield child, entry.stat()
+                except OSError:
+                    continue
@@ -2,19 +2,69 @@ import sys
 import argparse
 from dotenv import load_dotenv
 from src.core.coordinator import Coordinator
-
-import sys
-import argparse
-from dotenv import load_dotenv
-from src.core.coordinator import Coordinator
+from src.core.batch import BatchRunner, read_tasks
+from src.utils.llm import LLM
+from src.utils.llm_store import ResponseStore, RecordingLLM, ReplayLLM
+from src.utils.tracing import tracer
 
 def main():
     load_dotenv()
     parser = argparse.ArgumentParser(description="Open-World LLM Agent")
     parser.add_argument("task", nargs="?", help="The task to perform")
+    parser.add_argument("--stream", action="store_true", help="Stream plans and execute steps as they arrive")
+    parser.add_argument("--parallel-steps", type=int, default=4, help="Maximum number of independent plan steps run at once")
+    parser.add_argument("--probe-versions", action="store_true", help="Include installed tool versions in the planning context")
+    parser.add_argument("--resume", action="store_true", help="On retry, keep succeeded steps and only plan the rest")
+    parser.add_argument("--rollback", action="store_true", help="Snapshot the workspace and restore it before each retry")
+    parser.add_argument("--speculate", type=int, default=0, metavar="N", help="Race N candidate plans per attempt in copies of the workspace")
+    parser.add_argument("--speculate-workers", type=int, help="Maximum candidate plans executed at once (default: N)")
+    parser.add_argument("--no-verify-cache", action="store_true", help="Always re-run verify steps, even on unchanged files")
+    parser.add_argument("--prompt-budget", type=int, default=6000, help="Approximate token budget for planning prompts")
+    parser.add_argument("--record-llm", metavar="DIR", help="Save every LLM request/response pair to DIR")
+    parser.add_argument("--replay-llm", metavar="DIR", help="Answer LLM requests from responses recorded in DIR (offline)")
+    parser.add_argument("--replay-latency", type=float, default=0.0, help="Replay with this multiple of the recorded latency")
+    parser.add_argument("--trace", metavar="FILE", help="Record timing spans and write them to FILE on exit (.jsonl, or Chrome trace JSON otherwise)")
+    parser.add_argument("--batch", metavar="FILE", help="Run every task in FILE (one per line, '-' for stdin) concurrently")
+    parser.add_argument("--workers", type=int, default=4, help="Number of tasks run at once in batch mode")
+    parser.add_argument("--max-llm-calls", type=int, default=2, help="Maximum concurrent LLM requests in batch mode")
+    parser.add_argument("--max-processes", type=int, default=4, help="Maximum concurrent subprocesses in batch mode")
     args = parser.parse_args()
 
-    coordinator = Coordinator()
+    if args.trace:
+        tracer.enable()
+    try:
+        run(args)
+    finally:
+        if args.trace:
+            tracer.export(args.trace)
+            print(f"Trace written to {args.trace}")
+
+def run(args):
+    llm = None
+    if args.replay_llm:
+        llm = ReplayLLM(ResponseStore(args.replay_llm), latency_scale=args.replay_latency)
+    elif args.record_llm:
+        llm = RecordingLLM(LLM(), ResponseStore(args.record_llm))
+
+    coordinator = Coordinator(stream=args.stream, max_parallel_steps=args.parallel_steps,
+                              probe_tool_versions=args.probe_versions, resume=args.resume,
+                              prompt_budget=args.prompt_budget, llm=llm, rollback=args.rollback,
+                              speculate=args.speculate, speculate_workers=args.speculate_workers,
+                              verify_cache=not args.no_verify_cache)
+
+    if args.batch:
+        if args.batch == "-":
+            tasks = read_tasks(sys.stdin)
+        else:
+            with open(args.batch, "r", encoding="utf-8") as f:
+                tasks = read_tasks(f)
+        runner = BatchRunner(coordinator, max_workers=args.workers,
+                             max_llm_calls=args.max_llm_calls, max_processes=args.max_processes)
+        results = runner.run(tasks)
+        print("--- Batch Summary ---")
+        for result in results:
+            print(f"[{result['status']}] {result['task']} -> {result['workspace']} ({result['seconds']}s)")
+        return
 
     # Interactive Mode
     
@@ -0,0 +1,200 @@
+import http.client
+import json
+import queue
+import random
+import socket
+import time
+import urllib.parse
+from typing import Any, Dict, Iterator, Optional
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HTTPStatusError(Exception):
+    def __init__(self, status: int, body: bytes):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.body = body
+
+
+class ResponseTimeout(Exception):
+    # The request was sent but no response arrived within read_timeout. Not
+    # retried: the server may already be acting on the POST, and each retry
+    # would wait another read_timeout.
+    pass
+
+
+class HTTPClient:
+    # Keep-alive client for a single host. Connections are pooled and reused
+    # across calls, so repeated planning requests skip the TCP/TLS handshake.
+    def __init__(self, base_url: str, connect_timeout: float = 10.0, read_timeout: float = 120.0,
+                 max_retries: int = 3, backoff: float = 0.5, max_backoff: float = 8.0, pool_size: int = 4):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.scheme = parsed.scheme or "https"
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.base_path = parsed.path.rstrip("/")
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._pool: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue(maxsize=pool_size)
+        self.connections_opened = 0
+
+    def post_json(self, path: str, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> Any:
+        body = json.dumps(payload).encode("utf-8")
+        all_headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        all_headers.update(headers or {})
+
+        attempt = 0
+        while True:
+            try:
+                status, response_headers, data = self._request("POST", path, body, all_headers)
+            except (OSError, http.client.HTTPException):
+                if attempt >= self.max_retries:
+                    raise
+                self._sleep(attempt, None)
+                attempt += 1
+                continue
+
+            if status in RETRY_STATUSES and attempt < self.max_retries:
+                self._sleep(attempt, response_headers.get("Retry-After"))
+                attempt += 1
+                continue
+            if status >= 400:
+                raise HTTPStatusError(status, data)
+            return json.loads(data.decode("utf-8"))
+
+    def stream_post(self, path: str, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> Iterator[bytes]:
+        # Yields response lines as they arrive. Retries only happen before the
+        # first line is yielded; closing the generator early drops the connection.
+        body = json.dumps(payload).encode("utf-8")
+        all_headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        all_headers.update(headers or {})
+
+        attempt = 0
+        while True:
+            conn, sent = None, False
+            try:
+                # Connecting happens here too (refused, DNS, connect timeout)
+                conn, reused = self._acquire()
+                conn.request("POST", self.base_path + path, body=body, headers=all_headers)
+                sent = True
+                response = conn.getresponse()
+            except (OSError, http.client.HTTPException) as e:
+                if conn is not None:
+                    conn.close()
+                if sent and isinstance(e, TimeoutError):
+                    raise ResponseTimeout(f"no response within {self.read_timeout}s") from e
+                if conn is not None and reused:
+                    continue
+                if attempt >= self.max_retries:
+                    raise
+                self._sleep(attempt, None)
+                attempt += 1
+                continue
+
+            if response.status >= 400:
+                data = response.read()
+                self._finish(conn, response)
+                if response.status in RETRY_STATUSES and attempt < self.max_retries:
+                    self._sleep(attempt, response.headers.get("Retry-After"))
+                    attempt += 1
+                    continue
+                raise HTTPStatusError(response.status, data)
+            break
+
+        completed = False
+        try:
+            while True:
+                line = response.readline()
+                if not line:
+                    break
+                yield line
+            completed = True
+        finally:
+            if completed:
+                self._finish(conn, response)
+            else:
+                conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _request(self, method: str, path: str, body: bytes, headers: Dict[str, str]):
+        conn, reused = self._acquire()
+        sent = False
+        try:
+            try:
+                conn.request(method, self.base_path + path, body=body, headers=headers)
+                sent = True
+                response = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                if not reused:
+                    raise
+                # The server closed an idle keep-alive connection; this is not a
+                # real failure, so retry once on a fresh connection.
+                conn.close()
+                conn, reused, sent = self._connect(), False, False
+                conn.request(method, self.base_path + path, body=body, headers=headers)
+                sent = True
+                response = conn.getresponse()
+            data = response.read()
+        except TimeoutError as e:
+            conn.close()
+            if sent:
+                raise ResponseTimeout(f"no response within {self.read_timeout}s") from e
+            raise
+        except Exception:
+            conn.close()
+            raise
+
+        self._finish(conn, response)
+        return response.status, response.headers, data
+
+    def _finish(self, conn: http.client.HTTPConnection, response: http.client.HTTPResponse):
+        if response.will_close:
+            conn.close()
+        else:
+            # A response read line by line is not marked done; until it is
+            # closed the connection refuses the next request
+            response.close()
+            self._release(conn)
+
+    def _acquire(self):
+        try:
+            return self._pool.get_nowait(), True
+        except queue.Empty:
+            return self._connect(), False
+
+    def _release(self, conn: http.client.HTTPConnection):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _connect(self) -> http.client.HTTPConnection:
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        conn = cls(self.host, self.port, timeout=self.connect_timeout)
+        conn.connect()
+        # Connect and read deadlines differ: switch the socket to the read timeout
+        conn.sock.settimeout(self.read_timeout)
+        conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.connections_opened += 1
+        return conn
+
+    def _sleep(self, attempt: int, retry_after: Optional[str]):
+        if retry_after:
+            try:
+                time.sleep(min(self.max_backoff, float(retry_after)))
+                return
+            except ValueError:
+                pass
+        # Exponential backoff with jitter
+        delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+        time.sleep(delay * (0.5 + random.random() / 2))
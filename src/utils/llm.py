@@ -1,14 +1,30 @@
 import os
 import json
-import urllib.request
-import urllib.error
+from typing import Iterator
+from src.utils.http_client import HTTPClient, HTTPStatusError
+
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com"
+
+
+class StreamInterrupted(Exception):
+    # A streamed response broke off after part of it had been yielded
+    pass
+
 
 class LLM:
-    def __init__(self, provider="gemini"):
+    def __init__(self, provider="gemini", base_url: str = None, connect_timeout: float = 10.0,
+                 read_timeout: float = 120.0, max_retries: int = 3):
         self.provider = provider
         self.api_key = os.environ.get("GEMINI_API_KEY") or os.environ.get("OPENAI_API_KEY")
         if self.api_key:
             self.api_key = self.api_key.strip()
+        # One pooled keep-alive client per LLM; GEMINI_BASE_URL points it at a local stub
+        self.client = HTTPClient(
+            base_url or os.environ.get("GEMINI_BASE_URL") or GEMINI_BASE_URL,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            max_retries=max_retries
+        )
         
     def generate(self, prompt: str, system_instruction: str = None) -> str:
         if not self.api_key:
@@ -21,33 +37,84 @@ class LLM:
         print(f"Provider {self.provider} not implemented. Using mock.")
         return self._mock_generate(prompt)
 
-    def _call_gemini(self, prompt: str, system_instruction: str = None) -> str:
-        # Using gemini-flash-latest
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-flash-latest:generateContent?key={self.api_key}"
-        
-        # Construct payload
+    def generate_stream(self, prompt: str, system_instruction: str = None) -> Iterator[str]:
+        # Yields the response text in chunks as the model produces it
+        if not self.api_key or self.provider != "gemini":
+            yield self.generate(prompt, system_instruction)
+            return
+        yield from self._stream_gemini(prompt, system_instruction)
+
+    def _stream_gemini(self, prompt: str, system_instruction: str = None) -> Iterator[str]:
+        # Falls back to the mock only if nothing arrived; once text has been
+        # yielded, a stream that breaks off (an error, or no finishReason
+        # before the end) raises StreamInterrupted, so a truncated plan is
+        # never taken for a whole one
+        path = "/v1beta/models/gemini-flash-latest:streamGenerateContent?alt=sse"
+        data = {"contents": self._gemini_contents(prompt, system_instruction)}
+        received = False
+        finished = False
+        try:
+            for line in self.client.stream_post(path, data, headers={"x-goog-api-key": self.api_key}):
+                # Server-sent events: each "data:" line carries one JSON chunk
+                line = line.strip()
+                if not line.startswith(b"data:"):
+                    continue
+                try:
+                    chunk = json.loads(line[len(b"data:"):].decode("utf-8"))
+                except ValueError:
+                    # A malformed event loses only its own text, not the rest of the stream
+                    print(f"Skipping malformed stream event: {line[:80]!r}")
+                    continue
+                candidate = (chunk.get("candidates") or [{}])[0]
+                for part in candidate.get("content", {}).get("parts", []):
+                    if part.get("text"):
+                        received = True
+                        yield part["text"]
+                if candidate.get("finishReason"):
+                    finished = True
+        except HTTPStatusError as e:
+            print(f"Error calling Gemini API: {e}")
+            print(f"Response body: {e.body.decode('utf-8', errors='replace')}")
+            if received:
+                raise StreamInterrupted(f"stream failed after partial output: {e}") from e
+            yield self._mock_generate(prompt)
+            return
+        except Exception as e:
+            print(f"Error calling Gemini API: {e}")
+            if received:
+                raise StreamInterrupted(f"stream failed after partial output: {e}") from e
+            yield self._mock_generate(prompt)
+            return
+        if not received:
+            # A stream cut off before its first event can end without an error
+            print("Error calling Gemini API: stream ended without any text")
+            yield self._mock_generate(prompt)
+        elif not finished:
+            raise StreamInterrupted("stream ended before the model finished its response")
+
+    def _gemini_contents(self, prompt: str, system_instruction: str = None) -> list:
         contents = [{"parts": [{"text": prompt}]}]
         if system_instruction:
              # Gemini API supports system instructions differently, but for simplicity we'll prepend it
              contents[0]["parts"][0]["text"] = f"System: {system_instruction}\n\nUser: {prompt}"
+        return contents
 
+    def _call_gemini(self, prompt: str, system_instruction: str = None) -> str:
+        # Using gemini-flash-latest
+        path = "/v1beta/models/gemini-flash-latest:generateContent"
+        
+        # Construct payload
         data = {
-            "contents": contents
+            "contents": self._gemini_contents(prompt, system_instruction)
         }
         
         try:
-            req = urllib.request.Request(
-                url,
-                data=json.dumps(data).encode('utf-8'),
-                headers={'Content-Type': 'application/json'}
-            )
-            with urllib.request.urlopen(req) as response:
-                result = json.loads(response.read().decode('utf-8'))
-                # Extract text from response
-                return result['candidates'][0]['content']['parts'][0]['text']
-        except urllib.error.HTTPError as e:
+            result = self.client.post_json(path, data, headers={"x-goog-api-key": self.api_key})
+            # Extract text from response
+            return result['candidates'][0]['content']['parts'][0]['text']
+        except HTTPStatusError as e:
             print(f"Error calling Gemini API: {e}")
-            print(f"Response body: {e.read().decode('utf-8')}")
+            print(f"Response body: {e.body.decode('utf-8', errors='replace')}")
             return self._mock_generate(prompt)
         except Exception as e:
             print(f"Error calling Gemini API: {e}")
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+# Workspace folders are named "<YYYYmmdd_HHMMSS>_<slug>[_n]", so prompts
+# from two runs of the same task differ only in the timestamp
+_WORKSPACE_STAMP = re.compile(r"\b\d{8}_\d{6}_")
+
+
+class ReplayMiss(KeyError):
+    pass
+
+
+def normalize_prompt(text: str) -> str:
+    return _WORKSPACE_STAMP.sub("<ts>_", text or "")
+
+
+def request_key(prompt: str, system_instruction: str = None, model: str = "") -> str:
+    request = {"model": model, "prompt": normalize_prompt(prompt), "system": normalize_prompt(system_instruction)}
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ResponseStore:
+    # Content-addressed store of LLM exchanges: one JSON file per request,
+    # named by the hash of the (normalized) request and fanned out by prefix.
+    # Writes are atomic, so concurrent recorders never leave partial files.
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, record: Dict[str, Any]):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, path)
+
+    def __len__(self) -> int:
+        count = 0
+        for _, _, files in os.walk(self.directory):
+            count += sum(1 for name in files if name.endswith(".json"))
+        return count
+
+
+class RecordingLLM:
+    # Passes calls through to a real LLM and saves every exchange, including
+    # its latency and, for streams, the chunk boundaries and their timing.
+    def __init__(self, llm, store: ResponseStore, model: str = ""):
+        self.llm = llm
+        self.store = store
+        self.model = model
+
+    def generate(self, prompt: str, system_instruction: str = None) -> str:
+        start = time.perf_counter()
+        response = self.llm.generate(prompt, system_instruction)
+        self._save(prompt, system_instruction, [response], [time.perf_counter() - start])
+        return response
+
+    def generate_stream(self, prompt: str, system_instruction: str = None) -> Iterator[str]:
+        start = time.perf_counter()
+        chunks: List[str] = []
+        offsets: List[float] = []
+        for chunk in self.llm.generate_stream(prompt, system_instruction):
+            chunks.append(chunk)
+            offsets.append(time.perf_counter() - start)
+            yield chunk
+        self._save(prompt, system_instruction, chunks, offsets)
+
+    def _save(self, prompt: str, system_instruction: str, chunks: List[str], offsets: List[float]):
+        self.store.put(request_key(prompt, system_instruction, self.model), {
+            "request": {"model": self.model, "prompt": prompt, "system": system_instruction},
+            "response": "".join(chunks),
+            "chunks": chunks,
+            "offsets": [round(offset, 4) for offset in offsets],
+            "latency": round(offsets[-1], 4) if offsets else 0.0,
+            "recorded_at": time.time(),
+        })
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+
+class ReplayLLM:
+    # Serves recorded responses without network access. Latency is simulated
+    # as latency_scale x the recorded latency (0 = instant), or a fixed delay.
+    # A request that was never recorded raises ReplayMiss unless a fallback
+    # LLM is given.
+    def __init__(self, store: ResponseStore, latency_scale: float = 0.0, fixed_latency: float = None,
+                 fallback=None, model: str = ""):
+        self.store = store
+        self.latency_scale = latency_scale
+        self.fixed_latency = fixed_latency
+        self.fallback = fallback
+        self.model = model
+        self.hits = 0
+        self.misses = 0
+
+    def generate(self, prompt: str, system_instruction: str = None) -> str:
+        record = self._lookup(prompt, system_instruction)
+        if record is None:
+            return self.fallback.generate(prompt, system_instruction)
+        time.sleep(self._delay(record.get("latency", 0.0)))
+        return record["response"]
+
+    def generate_stream(self, prompt: str, system_instruction: str = None) -> Iterator[str]:
+        record = self._lookup(prompt, system_instruction)
+        if record is None:
+            yield from self.fallback.generate_stream(prompt, system_instruction)
+            return
+        chunks = record.get("chunks") or [record["response"]]
+        offsets = list(record.get("offsets") or [])
+        # Records written without per-chunk timing deliver the rest at the end
+        offsets += [record.get("latency", 0.0)] * (len(chunks) - len(offsets))
+        elapsed = 0.0
+        for chunk, offset in zip(chunks, offsets):
+            time.sleep(max(0.0, self._delay(offset) - elapsed))
+            elapsed = max(elapsed, self._delay(offset))
+            yield chunk
+
+    def _lookup(self, prompt: str, system_instruction: str) -> Optional[Dict[str, Any]]:
+        key = request_key(prompt, system_instruction, self.model)
+        record = self.store.get(key)
+        if record is not None:
+            self.hits += 1
+            return record
+        self.misses += 1
+        if self.fallback is None:
+            raise ReplayMiss(f"No recorded response for request {key} in {self.store.directory}")
+        return None
+
+    def _delay(self, recorded: float) -> float:
+        if self.fixed_latency is not None:
+            return self.fixed_latency
+        return recorded * self.latency_scale
@@ -0,0 +1,185 @@
+from typing import Any, Dict, Optional
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+
+class BoundedOutput:
+    # Keeps the first head_bytes and the last tail_bytes of a stream plus the
+    # total size, so memory stays bounded however much a command prints.
+    def __init__(self, max_bytes: int = 16384):
+        self.head_limit = max_bytes // 2
+        self.tail_limit = max_bytes - self.head_limit
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def write(self, data: bytes):
+        with self._lock:
+            self.total += len(data)
+            room = self.head_limit - len(self.head)
+            if room > 0:
+                self.head += data[:room]
+                data = data[room:]
+            if data:
+                self.tail += data
+                if len(self.tail) > self.tail_limit:
+                    del self.tail[:len(self.tail) - self.tail_limit]
+
+    @property
+    def truncated(self) -> bool:
+        return self.total > len(self.head) + len(self.tail)
+
+    def text(self) -> str:
+        with self._lock:
+            head, tail = bytes(self.head), bytes(self.tail)
+            omitted = self.total - len(head) - len(tail)
+        if omitted <= 0:
+            # Nothing was dropped, so a character split between head and tail is whole again
+            return (head + tail).decode("utf-8", errors="replace")
+        # Characters cut in half at either side of the gap are dropped with it
+        cut_head, cut_tail = _drop_partial_end(head), _drop_partial_start(tail)
+        omitted += len(head) - len(cut_head) + len(tail) - len(cut_tail)
+        return (f"{cut_head.decode('utf-8', errors='replace')}\n... [{omitted} bytes omitted] ...\n"
+                f"{cut_tail.decode('utf-8', errors='replace')}")
+
+
+def _drop_partial_end(data: bytes) -> bytes:
+    # Strips a UTF-8 sequence whose last bytes are missing
+    for back in range(1, min(4, len(data)) + 1):
+        byte = data[-back]
+        if byte & 0xC0 == 0x80:
+            continue
+        if byte >= 0xC0:
+            length = 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+            if length > back:
+                return data[:-back]
+        return data
+    return data
+
+
+def _drop_partial_start(data: bytes) -> bytes:
+    # Strips continuation bytes of a UTF-8 sequence whose first bytes are missing
+    skip = 0
+    while skip < min(3, len(data)) and data[skip] & 0xC0 == 0x80:
+        skip += 1
+    return data[skip:]
+
+
+def _pump(pipe, buffer: BoundedOutput, echo):
+    try:
+        for chunk in iter(lambda: pipe.read1(65536), b""):
+            buffer.write(chunk)
+            if echo is not None:
+                try:
+                    echo.write(chunk)
+                    echo.flush()
+                except (OSError, ValueError):
+                    pass
+    finally:
+        pipe.close()
+
+
+def _echo_target(stream, echo: bool):
+    # Console streams replaced by text-only objects (e.g. in tests) have no buffer
+    return getattr(stream, "buffer", None) if echo else None
+
+
+def run_streaming(command: str, cwd: str, timeout: Optional[float] = None,
+                  max_output_bytes: int = 16384, echo: bool = True,
+                  cancel: threading.Event = None) -> Dict[str, Any]:
+    # Like subprocess.run(capture_output=True) but output is drained as it is
+    # produced, optionally teed to the console, and only a bounded head+tail of
+    # each stream is kept. On timeout (or interrupt) the whole process group is
+    # terminated, so children of the shell die too and the pipes close, and the
+    # output captured so far is returned. Setting cancel does the same.
+    if echo:
+        sys.stdout.flush()
+    proc = subprocess.Popen(
+        command,
+        shell=True,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        **new_group_kwargs()
+    )
+    stdout, stderr = BoundedOutput(max_output_bytes), BoundedOutput(max_output_bytes)
+    readers = [
+        threading.Thread(target=_pump, args=(proc.stdout, stdout, _echo_target(sys.stdout, echo)), daemon=True),
+        threading.Thread(target=_pump, args=(proc.stderr, stderr, _echo_target(sys.stderr, echo)), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    timed_out = cancelled = False
+    try:
+        if cancel is None:
+            proc.wait(timeout=timeout)
+        else:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while True:
+                try:
+                    proc.wait(timeout=0.05)
+                    break
+                except subprocess.TimeoutExpired:
+                    if cancel.is_set():
+                        cancelled = True
+                        terminate_group(proc)
+                        break
+                    if deadline is not None and time.monotonic() > deadline:
+                        raise
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        terminate_group(proc)
+    except BaseException:
+        terminate_group(proc)
+        raise
+    for reader in readers:
+        reader.join(timeout=5)
+
+    return {
+        "returncode": proc.returncode,
+        "stdout": stdout.text(),
+        "stderr": stderr.text(),
+        "stdout_bytes": stdout.total,
+        "stderr_bytes": stderr.total,
+        "truncated": stdout.truncated or stderr.truncated,
+        "timed_out": timed_out,
+        "cancelled": cancelled,
+    }
+
+
+def new_group_kwargs() -> Dict[str, Any]:
+    # Start the child as the leader of its own process group so the whole tree
+    # (shell plus anything it spawned) can be signalled at once
+    if os.name == "nt":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def terminate_group(proc: subprocess.Popen, grace: float = 3.0):
+    # SIGTERM the process group, then SIGKILL whatever is left after grace seconds
+    if os.name == "nt":
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        return
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        proc.wait()
+        return
+    try:
+        proc.wait(timeout=grace)
+    except subprocess.TimeoutExpired:
+        pass
+    try:
+        # Also catches children that outlived the group leader
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+    proc.wait()
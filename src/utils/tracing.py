@@ -0,0 +1,147 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List
+
+
+class _NoopSpan:
+    # Returned by span() while tracing is off: no clock reads, no allocation
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    def __init__(self, tracer: "Tracer", name: str, cat: str, attrs: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.attrs = attrs
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.tracer._record(self, end)
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class Tracer:
+    # Collects timed spans (name, category, thread, attributes) in memory and
+    # exports them as JSONL or Chrome trace events (chrome://tracing, Perfetto).
+    # Disabled by default; span() then returns a shared no-op object.
+    def __init__(self, max_events: int = 100000):
+        self.enabled = False
+        self.max_events = max_events
+        self.events: List[Dict[str, Any]] = []
+        self.dropped = 0
+        self.origin = time.perf_counter()
+        self.wall_origin = time.time()
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def clear(self):
+        with self._lock:
+            self.events = []
+            self.dropped = 0
+            self.origin = time.perf_counter()
+            self.wall_origin = time.time()
+
+    def span(self, name: str, cat: str = "agent", **attrs):
+        if not self.enabled:
+            return _NOOP
+        return Span(self, name, cat, attrs)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        # Total/count/max seconds per span name
+        totals: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            events = list(self.events)
+        for event in events:
+            entry = totals.setdefault(event["name"], {"count": 0, "total_s": 0.0, "max_s": 0.0})
+            entry["count"] += 1
+            entry["total_s"] = round(entry["total_s"] + event["dur"], 6)
+            entry["max_s"] = max(entry["max_s"], event["dur"])
+        return totals
+
+    def export(self, path: str):
+        # Format follows the extension: .jsonl -> one span per line, otherwise Chrome trace JSON
+        if path.endswith(".jsonl"):
+            self.export_jsonl(path)
+        else:
+            self.export_chrome(path)
+
+    def export_jsonl(self, path: str):
+        with self._lock:
+            events = list(self.events)
+        with open(path, "w", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event, default=str) + "\n")
+
+    def export_chrome(self, path: str):
+        with self._lock:
+            events = list(self.events)
+        pid = os.getpid()
+        trace_events = [{
+            "name": event["name"],
+            "cat": event["cat"],
+            "ph": "X",
+            "ts": round(event["start"] * 1e6, 1),
+            "dur": round(event["dur"] * 1e6, 1),
+            "pid": pid,
+            "tid": event["tid"],
+            "args": event["attrs"],
+        } for event in events]
+        threads = {event["tid"]: event["thread"] for event in events}
+        trace_events += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                         for tid, name in threads.items()]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace_events, "otherData": {"dropped": self.dropped,
+                                                                  "started_at": self.wall_origin}}, f, default=str)
+
+    def _record(self, span: Span, end: float):
+        thread = threading.current_thread()
+        event = {
+            "name": span.name,
+            "cat": span.cat,
+            "start": round(span.start - self.origin, 6),
+            "dur": round(end - span.start, 6),
+            "tid": thread.ident,
+            "thread": thread.name,
+            "attrs": span.attrs,
+        }
+        with self._lock:
+            if len(self.events) >= self.max_events:
+                self.dropped += 1
+                return
+            self.events.append(event)
+
+
+# Process-wide tracer used by all components
+tracer = Tracer()
+
+
+def span(name: str, cat: str = "agent", **attrs):
+    return tracer.span(name, cat, **attrs)
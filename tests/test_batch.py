@@ -0,0 +1,180 @@
+import threading
+import time
+from src.core.batch import BatchRunner, ThrottledExecutor, ThrottledLLM, read_tasks
+
+
+class Gauge:
+    # Counts how many callers are inside at once
+    def __init__(self):
+        self.inside = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.inside += 1
+            self.peak = max(self.peak, self.inside)
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.inside -= 1
+
+
+class FakeLLM:
+    def __init__(self):
+        self.gauge = Gauge()
+        self.model = "fake"
+
+    def generate(self, prompt, system_instruction=None):
+        with self.gauge:
+            time.sleep(0.05)
+            return prompt.upper()
+
+    def generate_stream(self, prompt, system_instruction=None):
+        for word in prompt.split():
+            with self.gauge:
+                time.sleep(0.01)
+            yield word
+
+
+class FakeExecutor:
+    def __init__(self):
+        self.gauge = Gauge()
+        self.cancelled = []
+
+    def execute_step(self, step, cwd="."):
+        with self.gauge:
+            time.sleep(step.get("sleep", 0.0))
+        return {"status": "success", "returncode": 0}
+
+    def cancel(self, cwd):
+        self.cancelled.append(cwd)
+
+
+def in_threads(count, fn):
+    threads = [threading.Thread(target=fn, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_read_tasks_skips_blank_lines_and_comments():
+    lines = ["compute 2+1\n", "\n", "  # a comment\n", "  print hello  \n", "#another\n"]
+    assert read_tasks(lines) == ["compute 2+1", "print hello"]
+    assert read_tasks([]) == []
+
+
+def test_llm_calls_are_capped():
+    llm = FakeLLM()
+    throttled = ThrottledLLM(llm, threading.BoundedSemaphore(2))
+    results = {}
+    in_threads(6, lambda i: results.__setitem__(i, throttled.generate(f"p{i}")))
+    assert llm.gauge.peak == 2
+    assert results == {i: f"P{i}" for i in range(6)}
+    # Anything else is the wrapped LLM's
+    assert throttled.model == "fake"
+
+
+def test_a_stream_holds_its_slot_only_while_waiting_for_a_chunk():
+    llm = FakeLLM()
+    slots = threading.BoundedSemaphore(1)
+    throttled = ThrottledLLM(llm, slots)
+    stream = throttled.generate_stream("one two three")
+    assert next(stream) == "one"
+    # Between chunks another caller can use the only slot
+    done = []
+    other = threading.Thread(target=lambda: done.append(throttled.generate("x")))
+    other.start()
+    other.join(2)
+    assert done == ["X"]
+    assert list(stream) == ["two", "three"]
+    # Closing a stream early gives its slot back
+    stream = throttled.generate_stream("a b")
+    next(stream)
+    stream.close()
+    assert slots.acquire(timeout=0.5)
+
+
+def test_only_process_steps_are_throttled():
+    executor = FakeExecutor()
+    throttled = ThrottledExecutor(executor, threading.BoundedSemaphore(2))
+    in_threads(6, lambda i: throttled.execute_step({"type": "command", "sleep": 0.05}))
+    assert executor.gauge.peak == 2
+    executor.gauge.peak = 0
+    in_threads(6, lambda i: throttled.execute_step({"type": "write_file", "sleep": 0.05}))
+    assert executor.gauge.peak == 6
+    throttled.cancel("/ws")
+    assert executor.cancelled == ["/ws"]
+
+
+def test_waiting_for_a_process_slot_is_reported_as_queued():
+    executor = FakeExecutor()
+    throttled = ThrottledExecutor(executor, threading.BoundedSemaphore(1))
+    results = {}
+    in_threads(2, lambda i: results.__setitem__(i, throttled.execute_step({"type": "verify", "sleep": 0.1})))
+    queued = sorted(result["queued"] for result in results.values())
+    assert queued[0] < 0.05 and queued[1] >= 0.08
+    assert "queued" not in throttled.execute_step({"type": "read_file"})
+
+
+class Holder:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class FakeMemory:
+    def __init__(self):
+        self.traces = {}
+
+    def find_traces(self, workspace=None):
+        return self.traces.get(workspace, [])
+
+
+class FakeCoordinator:
+    # "fail" tasks fail twice, "boom" raises and anything else succeeds at once
+    def __init__(self, speculate=False):
+        self.planner = Holder(llm=FakeLLM())
+        self.scheduler = Holder(executor=FakeExecutor())
+        self.speculator = Holder(executor=FakeExecutor()) if speculate else None
+        self.memory = FakeMemory()
+        self.running = Gauge()
+
+    def run(self, task):
+        with self.running:
+            time.sleep(0.05)
+        if task == "boom":
+            raise RuntimeError("planner exploded")
+        workspace = f"/ws/{task}"
+        if task.startswith("fail"):
+            self.memory.traces[workspace] = [{"status": "failure"}, {"status": "failure"}]
+        else:
+            self.memory.traces[workspace] = [{"status": "success"}]
+        return workspace
+
+
+def test_batch_runner_reports_each_task_in_input_order():
+    coordinator = FakeCoordinator()
+    tasks = ["a", "fail b", "boom", "d", "e", "f"]
+    results = BatchRunner(coordinator, max_workers=3).run(tasks)
+    assert [r["task"] for r in results] == tasks
+    assert coordinator.running.peak == 3
+    assert results[0]["status"] == "success" and results[0]["attempts"] == 1
+    assert results[0]["workspace"] == "/ws/a"
+    assert results[1]["status"] == "failure" and results[1]["attempts"] == 2
+    assert results[2]["status"] == "error" and "planner exploded" in results[2]["error"]
+    assert results[2]["workspace"] is None
+    assert all(r["seconds"] >= 0.05 for r in results)
+
+
+def test_batch_runner_throttles_the_shared_llm_and_executors():
+    coordinator = FakeCoordinator(speculate=True)
+    executor = coordinator.scheduler.executor
+    BatchRunner(coordinator, max_llm_calls=1, max_processes=3)
+    assert isinstance(coordinator.planner.llm, ThrottledLLM)
+    assert isinstance(coordinator.scheduler.executor, ThrottledExecutor)
+    assert coordinator.scheduler.executor.executor is executor
+    # Speculation shares the process slots of the scheduler
+    assert isinstance(coordinator.speculator.executor, ThrottledExecutor)
+    assert coordinator.speculator.executor.slots is coordinator.scheduler.executor.slots
+    BatchRunner(FakeCoordinator())
@@ -0,0 +1,120 @@
+import os
+from src.core import blob_store
+from src.core.blob_store import ENCODED_VERSION, INLINE_LIMIT, BlobStore, TraceCodec
+from src.core.log_store import SegmentedLog
+from src.core.memory import Memory
+
+BIG = "x = 1\n" * INLINE_LIMIT
+
+
+def sample_trace(i=0):
+    step = {"type": "write_file", "filename": "big.py", "content": BIG}
+    return {
+        "task": "write big", "status": "success", "timestamp": float(i),
+        "plan": [step, {"type": "command", "command": "python big.py"}],
+        "steps": [
+            {"step": step, "result": {"status": "success"}},
+            {"step": {"type": "command", "command": "python big.py"},
+             "result": {"status": "success", "stdout": "y" * 2 * INLINE_LIMIT}},
+        ],
+    }
+
+
+def count_fsyncs(monkeypatch):
+    calls = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(blob_store.os, "fsync", lambda fd: calls.append(fd) or real_fsync(fd))
+    return calls
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    blobs = BlobStore(str(tmp_path), fsync=False)
+    blobs.create()
+    first = blobs.put(b"hello" * 100)
+    size = os.path.getsize(blobs.pack_file)
+    assert blobs.put(b"hello" * 100) == first
+    assert os.path.getsize(blobs.pack_file) == size
+    assert BlobStore(str(tmp_path), fsync=False).get(first) == b"hello" * 100
+
+
+def test_trace_round_trip_shares_blobs(tmp_path):
+    codec = TraceCodec(BlobStore(str(tmp_path), fsync=False))
+    codec.blobs.create()
+    encoded = codec.encode(sample_trace())
+    assert encoded["$v"] == ENCODED_VERSION and encoded["task"] == "write big"
+    assert len(str(encoded)) < len(BIG)
+    count = len(codec.blobs)
+    assert codec.encode(sample_trace(1))["plan"] == encoded["plan"]
+    assert len(codec.blobs) == count
+    assert codec.decode(encoded) == sample_trace()
+    # Pre-blob records pass through unchanged
+    assert codec.decode({"task": "old", "plan": []}) == {"task": "old", "plan": []}
+
+
+def test_a_trace_costs_one_pack_fsync(tmp_path, monkeypatch):
+    codec = TraceCodec(BlobStore(str(tmp_path), fsync=True))
+    codec.blobs.create()
+    calls = count_fsyncs(monkeypatch)
+    codec.encode(sample_trace())
+    assert len(calls) == 1
+    # Nothing new to write: no fsync at all
+    codec.encode(sample_trace(1))
+    assert len(calls) == 1
+    # Outside a batch every new blob is synced on its own
+    codec.blobs.put(b"a")
+    codec.blobs.put(b"b")
+    assert len(calls) == 3
+
+
+def test_memory_add_trace_fsyncs(tmp_path, monkeypatch):
+    memory = Memory(str(tmp_path / "memory.json"))
+    calls = count_fsyncs(monkeypatch)
+    memory.add_trace(sample_trace())
+    # Blob pack, episodic log, trace index
+    assert len(calls) == 3
+
+
+def test_lost_index_entries_are_recovered_from_the_pack(tmp_path):
+    blobs = BlobStore(str(tmp_path), fsync=False)
+    blobs.create()
+    keys = [blobs.put(str(i).encode() * 50) for i in range(5)]
+    with open(blobs.index_file, "rb+") as f:
+        f.truncate(os.path.getsize(blobs.index_file) - blob_store._INDEX.size * 2 - 3)
+    reopened = BlobStore(str(tmp_path), fsync=False)
+    assert [reopened.get(key) for key in keys] == [str(i).encode() * 50 for i in range(5)]
+    assert os.path.getsize(reopened.index_file) == blob_store._INDEX.size * 5
+
+
+def test_a_torn_pack_record_is_dropped(tmp_path):
+    blobs = BlobStore(str(tmp_path), fsync=False)
+    blobs.create()
+    kept = blobs.put(b"kept" * 50)
+    size = os.path.getsize(blobs.pack_file)
+    lost = os.urandom(500)
+    torn = blobs.put(lost)
+    with open(blobs.pack_file, "rb+") as f:
+        f.truncate(size + 20)
+    with open(blobs.index_file, "rb+") as f:
+        f.truncate(blob_store._INDEX.size)
+    reopened = BlobStore(str(tmp_path), fsync=False)
+    assert len(reopened) == 1 and reopened.get(kept) == b"kept" * 50
+    assert os.path.getsize(reopened.pack_file) == size
+    # The lost blob is no longer known, so it is written again
+    assert reopened.put(lost) == torn
+    assert BlobStore(str(tmp_path), fsync=False).get(torn) == lost
+
+
+def test_logs_from_before_blob_storage_are_re_encoded(tmp_path):
+    log_dir = tmp_path / "memory"
+    log = SegmentedLog(str(log_dir), "episodic", fsync=False)
+    for i in range(3):
+        log.append(sample_trace(i))
+    assert not os.path.exists(log_dir / "blobs.pack")
+
+    memory = Memory(str(tmp_path / "memory.json"), fsync=False)
+    assert os.path.exists(log_dir / "blobs.pack")
+    assert all(record["$v"] == ENCODED_VERSION for record in memory.episodic_log.records())
+    assert [t for t in memory.episodic_memory] == [sample_trace(i) for i in range(3)]
+    # The trace index follows the rewritten log
+    reloaded = Memory(str(tmp_path / "memory.json"), fsync=False)
+    assert [t["timestamp"] for t in reloaded.find_traces(task="write big")] == [2.0, 1.0, 0.0]
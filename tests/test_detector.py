@@ -0,0 +1,97 @@
+import os
+import pytest
+from src.core import detector as detector_module
+from src.core.detector import EnvironmentDetector
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="fake tools are shell scripts")
+
+
+def add_tool(directory, name, script="echo 1.0"):
+    path = directory / name
+    path.write_text(f"#!/bin/sh\n{script}\n")
+    path.chmod(0o755)
+    # Keep the directory's mtime moving even on coarse-grained filesystems
+    st = os.stat(directory)
+    os.utime(directory, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    return str(path)
+
+
+@pytest.fixture
+def bin_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "bin"
+    directory.mkdir()
+    monkeypatch.setenv("PATH", str(directory))
+    return directory
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    calls = []
+    which = detector_module.shutil.which
+
+    def counting_which(tool):
+        calls.append(tool)
+        return which(tool)
+    monkeypatch.setattr(detector_module.shutil, "which", counting_which)
+    return calls
+
+
+def test_tools_are_found_on_path(bin_dir):
+    git = add_tool(bin_dir, "git")
+    assert EnvironmentDetector().scan_tools() == {"git": git}
+
+
+def test_lookups_are_cached_until_a_path_directory_changes(bin_dir, lookups):
+    detector = EnvironmentDetector()
+    assert detector.scan_tools() == {}
+    fingerprint = detector.tool_fingerprint()
+    count = len(lookups)
+    detector.scan_tools()
+    assert len(lookups) == count
+    make = add_tool(bin_dir, "make")
+    assert detector.scan_tools() == {"make": make}
+    assert len(lookups) == 2 * count
+    assert detector.tool_fingerprint() != fingerprint
+
+
+def test_a_path_change_invalidates_the_cache(bin_dir, tmp_path, monkeypatch):
+    detector = EnvironmentDetector()
+    add_tool(bin_dir, "git")
+    other = tmp_path / "other"
+    other.mkdir()
+    node = add_tool(other, "node")
+    assert set(detector.scan_tools()) == {"git"}
+    monkeypatch.setenv("PATH", str(other))
+    assert detector.scan_tools() == {"node": node}
+
+
+def test_the_disk_cache_is_shared_between_runs(bin_dir, tmp_path, lookups):
+    cache_file = str(tmp_path / "cache" / "tools.json")
+    git = add_tool(bin_dir, "git")
+    assert EnvironmentDetector(cache_file=cache_file).scan_tools() == {"git": git}
+    count = len(lookups)
+    assert EnvironmentDetector(cache_file=cache_file).scan_tools() == {"git": git}
+    assert len(lookups) == count
+    # A stale or unreadable cache file is ignored
+    add_tool(bin_dir, "make")
+    assert set(EnvironmentDetector(cache_file=cache_file).scan_tools()) == {"git", "make"}
+    with open(cache_file, "w") as f:
+        f.write("{not json")
+    assert set(EnvironmentDetector(cache_file=cache_file).scan_tools()) == {"git", "make"}
+
+
+def test_versions_are_probed_once(bin_dir, tmp_path):
+    log = tmp_path / "probes"
+    add_tool(bin_dir, "git", f"echo probed >> {log}; echo 'git version 2.40'")
+    add_tool(bin_dir, "go", "echo \"go $1\"")
+    add_tool(bin_dir, "make", "exec /bin/sleep 5")
+    add_tool(bin_dir, "cmake", "true")
+    detector = EnvironmentDetector(probe_timeout=0.5)
+    versions = detector.tool_versions()
+    assert versions == {"git": "git version 2.40", "go": "go version", "make": "unknown (timed out)",
+                        "cmake": "unknown"}
+    detector.tool_versions()
+    assert log.read_text().count("probed") == 1
+    # New tools drop the cached versions
+    add_tool(bin_dir, "node", "echo v20")
+    assert detector.tool_versions()["node"] == "v20"
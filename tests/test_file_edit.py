@@ -0,0 +1,81 @@
+import os
+import stat
+import pytest
+from src.core.file_edit import PatchError, apply_replacements, apply_unified_diff, read_range, write_atomic
+
+
+def test_applies_a_hunk_at_a_shifted_position():
+    text = "".join(f"line {i}\n" for i in range(1, 11))
+    diff = "--- a/f\n+++ b/f\n@@ -3,3 +3,3 @@\n line 5\n-line 6\n+line six\n line 7\n"
+    assert apply_unified_diff(text, diff) == text.replace("line 6\n", "line six\n")
+
+
+def test_keeps_crlf_line_endings():
+    text = "a\r\nb\r\nc\r\n"
+    diff = "@@ -1,3 +1,4 @@\n a\n-b\n+B\n+b2\n c\n"
+    assert apply_unified_diff(text, diff) == "a\r\nB\r\nb2\r\nc\r\n"
+
+
+def test_keeps_mixed_line_endings_on_untouched_lines():
+    text = "a\nb\r\nc\n"
+    diff = "@@ -1,3 +1,3 @@\n a\n-b\n+B\n c\n"
+    assert apply_unified_diff(text, diff) == "a\nB\r\nc\n"
+
+
+def test_other_line_breaks_stay_inside_lines():
+    text = "x = 'a\x0cb'\ny = ' '\nz = 1\n"
+    diff = "@@ -1,3 +1,3 @@\n x = 'a\x0cb'\n y = ' '\n-z = 1\n+z = 2\n"
+    assert apply_unified_diff(text, diff) == "x = 'a\x0cb'\ny = ' '\nz = 2\n"
+
+
+def test_no_newline_at_end_of_file():
+    text = "a\nb"
+    diff = "@@ -1,2 +1,2 @@\n a\n-b\n\\ No newline at end of file\n+c\n"
+    assert apply_unified_diff(text, diff) == "a\nc\n"
+    diff = "@@ -1,2 +1,3 @@\n a\n b\n\\ No newline at end of file\n+c\n\\ No newline at end of file\n"
+    assert apply_unified_diff(text, diff) == "a\nb\nc"
+
+
+def test_rejects_a_hunk_that_does_not_match():
+    with pytest.raises(PatchError, match="does not match"):
+        apply_unified_diff("a\nb\n", "@@ -1,1 +1,1 @@\n-x\n+y\n")
+    with pytest.raises(PatchError, match="more than one file"):
+        apply_unified_diff("a\n", "+++ b/one\n@@ -1 +1 @@\n-a\n+b\n+++ b/two\n")
+
+
+def test_replacements_must_be_unique_unless_all():
+    assert apply_replacements("a a b", [{"search": "b", "replace": "c"}]) == "a a c"
+    with pytest.raises(PatchError, match="occurs 2 times"):
+        apply_replacements("a a b", [{"search": "a", "replace": "c"}])
+    assert apply_replacements("a a b", [{"search": "a", "replace": "c", "all": True}]) == "c c b"
+
+
+def test_write_atomic_keeps_mode_and_newlines(tmp_path):
+    path = tmp_path / "run.sh"
+    path.write_text("old\n")
+    os.chmod(path, 0o755)
+    write_atomic(str(path), "new\r\n")
+    assert path.read_bytes() == b"new\r\n"
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o755
+    assert os.listdir(tmp_path) == ["run.sh"]
+
+
+def test_read_range(tmp_path):
+    path = tmp_path / "f.txt"
+    path.write_text("".join(f"{i}\n" for i in range(1, 101)))
+    result = read_range(str(path), 10, 12)
+    assert (result["content"], result["end_line"], result["total_lines"]) == ("10\n11\n12\n", 12, 100)
+    assert "next_line" not in result
+    result = read_range(str(path), 95, max_bytes=9)
+    assert (result["content"], result["truncated"], result["next_line"]) == ("95\n96\n97\n", True, 98)
+
+
+def test_zero_context_insertions():
+    text = "a\nb\nc\n"
+    assert apply_unified_diff(text, "@@ -0,0 +1 @@\n+X\n") == "X\na\nb\nc\n"
+    assert apply_unified_diff(text, "@@ -2,0 +3 @@\n+X\n") == "a\nb\nX\nc\n"
+    assert apply_unified_diff(text, "@@ -3,0 +4,2 @@\n+X\n+Y\n") == "a\nb\nc\nX\nY\n"
+    # Later hunks account for the lines earlier insertions added
+    diff = "@@ -1,0 +2 @@\n+X\n@@ -2,0 +4 @@\n+Y\n"
+    assert apply_unified_diff(text, diff) == "a\nX\nb\nY\nc\n"
+    assert apply_unified_diff("a\nb", "@@ -2,0 +3 @@\n+X\n") == "a\nb\nX\n"
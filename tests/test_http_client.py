@@ -0,0 +1,153 @@
+import json
+import socket
+import threading
+import pytest
+from src.utils import http_client
+from src.utils.http_client import HTTPClient, HTTPStatusError
+from tests.conftest import send
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    # Backoff delays, without waiting for them
+    delays = []
+    monkeypatch.setattr(http_client.time, "sleep", delays.append)
+    return delays
+
+
+def scripted(statuses, headers=None):
+    # Answers the n-th request with statuses[n] (the last one repeats)
+    def handle(handler):
+        status = statuses[min(len(handler.server.requests), len(statuses)) - 1]
+        body = json.dumps({"ok": status}).encode("utf-8")
+        send(handler, status, body, (headers or {}).get(status))
+    return handle
+
+
+def test_reuses_one_connection(http_stub, sleeps):
+    server, url = http_stub(scripted([200]))
+    client = HTTPClient(url)
+    for _ in range(5):
+        assert client.post_json("/generate", {"x": 1}) == {"ok": 200}
+    client.close()
+    assert client.connections_opened == 1
+    assert len({address for address, _, _ in server.requests}) == 1
+    assert sleeps == []
+
+
+@pytest.mark.parametrize("status", [429, 500, 502, 503, 504])
+def test_retries_with_exponential_backoff(http_stub, sleeps, status):
+    server, url = http_stub(scripted([status, status, 200]))
+    client = HTTPClient(url, backoff=0.1, max_retries=3)
+    assert client.post_json("/generate", {}) == {"ok": 200}
+    assert len(server.requests) == 3
+    # Jittered between half and all of backoff * 2^attempt
+    assert len(sleeps) == 2
+    assert 0.05 <= sleeps[0] <= 0.1
+    assert 0.1 <= sleeps[1] <= 0.2
+    # Retries stay on the pooled connection
+    assert client.connections_opened == 1
+
+
+def test_honors_retry_after(http_stub, sleeps):
+    _, url = http_stub(scripted([429, 200], headers={429: {"Retry-After": "3"}}))
+    client = HTTPClient(url, max_backoff=8.0)
+    assert client.post_json("/generate", {}) == {"ok": 200}
+    assert sleeps == [3.0]
+
+
+def test_gives_up_after_max_retries(http_stub, sleeps):
+    server, url = http_stub(scripted([503]))
+    client = HTTPClient(url, max_retries=2)
+    with pytest.raises(HTTPStatusError) as error:
+        client.post_json("/generate", {})
+    assert error.value.status == 503
+    assert len(server.requests) == 3
+    assert len(sleeps) == 2
+
+
+@pytest.mark.parametrize("status", [400, 401, 404])
+def test_does_not_retry_client_errors(http_stub, sleeps, status):
+    server, url = http_stub(scripted([status]))
+    client = HTTPClient(url)
+    with pytest.raises(HTTPStatusError) as error:
+        client.post_json("/generate", {})
+    assert error.value.status == status
+    assert json.loads(error.value.body) == {"ok": status}
+    assert len(server.requests) == 1
+    assert sleeps == []
+
+
+def test_reconnects_after_server_closes_idle_connection(http_stub, sleeps):
+    # The server answers as keep-alive, then drops the connection while it
+    # sits in the pool
+    def handle(handler):
+        send(handler, 200, b'{"ok": 200}')
+        handler.close_connection = True
+
+    server, url = http_stub(handle)
+    client = HTTPClient(url)
+    assert client.post_json("/generate", {}) == {"ok": 200}
+    assert client.post_json("/generate", {}) == {"ok": 200}
+    assert client.connections_opened == 2
+    assert len(server.requests) == 2
+    # A dropped idle connection is not a failed attempt
+    assert sleeps == []
+
+
+def test_stream_post_yields_lines_and_keeps_connection(http_stub, sleeps):
+    def handle(handler):
+        send(handler, 200, b"data: 1\n\ndata: 2\n\n", {"Content-Type": "text/event-stream"})
+
+    _, url = http_stub(handle)
+    client = HTTPClient(url)
+    for _ in range(2):
+        assert list(client.stream_post("/stream", {})) == [b"data: 1\n", b"\n", b"data: 2\n", b"\n"]
+    assert client.connections_opened == 1
+
+
+def test_stream_post_retries_before_first_line(http_stub, sleeps):
+    server, url = http_stub(scripted([503, 200]))
+    client = HTTPClient(url, backoff=0.1)
+    assert list(client.stream_post("/stream", {})) == [b'{"ok": 200}']
+    assert len(server.requests) == 2
+    assert len(sleeps) == 1
+
+
+def closed_port_url():
+    # A port nothing listens on: connecting is refused
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+@pytest.mark.parametrize("call", ["post_json", "stream_post"])
+def test_connect_failures_are_retried_with_backoff(sleeps, call):
+    client = HTTPClient(closed_port_url(), backoff=0.1, max_retries=2)
+    with pytest.raises(ConnectionRefusedError):
+        result = getattr(client, call)("/generate", {})
+        list(result) if call == "stream_post" else result
+    assert len(sleeps) == 2
+
+
+def slow(seconds):
+    # Answers after the given delay (without time.sleep, which the tests patch)
+    def handle(handler):
+        threading.Event().wait(seconds)
+        try:
+            send(handler, 200, b"{}\n")
+        except OSError:
+            pass
+    return handle
+
+
+@pytest.mark.parametrize("call", ["post_json", "stream_post"])
+def test_a_read_timeout_after_sending_is_not_retried(http_stub, sleeps, call):
+    server, url = http_stub(slow(1.0))
+    client = HTTPClient(url, read_timeout=0.2, max_retries=3)
+    with pytest.raises(http_client.ResponseTimeout):
+        result = getattr(client, call)("/generate", {})
+        list(result) if call == "stream_post" else result
+    assert len(server.requests) == 1
+    assert sleeps == []
@@ -0,0 +1,108 @@
+import time
+import pytest
+from src.utils.llm_store import RecordingLLM, ReplayLLM, ReplayMiss, ResponseStore, normalize_prompt, request_key
+
+
+class ScriptedLLM:
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.delay = delay
+        self.temperature = 0.2
+
+    def generate(self, prompt, system_instruction=None):
+        self.calls.append(prompt)
+        time.sleep(self.delay)
+        return f"answer to {prompt}"
+
+    def generate_stream(self, prompt, system_instruction=None):
+        self.calls.append(prompt)
+        for word in ["streamed ", "answer ", "to ", prompt]:
+            time.sleep(self.delay)
+            yield word
+
+
+def test_workspace_timestamps_do_not_change_the_key():
+    first = "Workspace: projects/20240101_120000_add_numbers\nAdd numbers"
+    second = "Workspace: projects/20250615_083015_add_numbers\nAdd numbers"
+    assert normalize_prompt(first) == normalize_prompt(second)
+    assert request_key(first) == request_key(second)
+    assert request_key(first) != request_key(first, system_instruction="be brief")
+    assert request_key(first) != request_key(first, model="other")
+    assert request_key("compute 2+1") != request_key("compute 2-1")
+
+
+def test_record_then_replay(tmp_path):
+    store = ResponseStore(str(tmp_path / "store"))
+    live = ScriptedLLM(delay=0.02)
+    recorder = RecordingLLM(live, store, model="m")
+    assert recorder.generate("one", "sys") == "answer to one"
+    assert list(recorder.generate_stream("two")) == ["streamed ", "answer ", "to ", "two"]
+    # Anything else is the wrapped LLM's
+    assert recorder.temperature == 0.2
+    assert len(store) == 2
+
+    record = store.get(request_key("two", None, "m"))
+    assert record["response"] == "streamed answer to two"
+    assert len(record["offsets"]) == 4 and record["offsets"] == sorted(record["offsets"])
+    assert record["latency"] == record["offsets"][-1] >= 0.08
+
+    replay = ReplayLLM(store, model="m")
+    start = time.perf_counter()
+    assert replay.generate("one", "sys") == "answer to one"
+    assert list(replay.generate_stream("two")) == ["streamed ", "answer ", "to ", "two"]
+    assert time.perf_counter() - start < 0.05
+    assert replay.hits == 2 and replay.misses == 0
+    assert live.calls == ["one", "two"]
+
+
+def test_a_miss_raises_without_a_fallback(tmp_path):
+    store = ResponseStore(str(tmp_path))
+    replay = ReplayLLM(store)
+    with pytest.raises(ReplayMiss, match="No recorded response"):
+        replay.generate("never recorded")
+    with pytest.raises(ReplayMiss):
+        list(replay.generate_stream("never recorded"))
+    assert replay.misses == 2
+    # Recorded under another model is a miss too
+    RecordingLLM(ScriptedLLM(), store, model="a").generate("x")
+    with pytest.raises(ReplayMiss):
+        ReplayLLM(store, model="b").generate("x")
+
+
+def test_a_miss_goes_to_the_fallback(tmp_path):
+    fallback = ScriptedLLM()
+    replay = ReplayLLM(ResponseStore(str(tmp_path)), fallback=fallback)
+    assert replay.generate("new") == "answer to new"
+    assert list(replay.generate_stream("new")) == ["streamed ", "answer ", "to ", "new"]
+    assert replay.misses == 2 and fallback.calls == ["new", "new"]
+
+
+def test_replay_latency(tmp_path):
+    store = ResponseStore(str(tmp_path))
+    store.put(request_key("slow"), {"response": "ab", "chunks": ["a", "b"], "offsets": [0.1, 0.2],
+                                    "latency": 0.2})
+    start = time.perf_counter()
+    assert list(ReplayLLM(store, latency_scale=0.5).generate_stream("slow")) == ["a", "b"]
+    assert 0.09 <= time.perf_counter() - start < 0.3
+    start = time.perf_counter()
+    assert ReplayLLM(store, fixed_latency=0.05).generate("slow") == "ab"
+    assert 0.04 <= time.perf_counter() - start < 0.2
+
+
+def test_records_without_chunk_timing_replay_every_chunk(tmp_path):
+    store = ResponseStore(str(tmp_path))
+    store.put(request_key("hand written"), {"response": "abc", "chunks": ["a", "b", "c"], "latency": 0.0})
+    store.put(request_key("plain"), {"response": "whole"})
+    replay = ReplayLLM(store)
+    assert list(replay.generate_stream("hand written")) == ["a", "b", "c"]
+    assert list(replay.generate_stream("plain")) == ["whole"]
+
+
+def test_unreadable_records_are_misses(tmp_path):
+    store = ResponseStore(str(tmp_path))
+    key = request_key("broken")
+    store.put(key, {"response": "x"})
+    with open(store.path(key), "w") as f:
+        f.write("{truncated")
+    assert store.get(key) is None
+    assert store.get("0" * 64) is None
@@ -0,0 +1,143 @@
+import json
+import os
+import pytest
+from src.core.log_store import COMPACTED_MARKER, SegmentedLog
+from src.core.memory import Memory
+
+
+def open_log(path, **kwargs):
+    kwargs.setdefault("fsync", False)
+    return SegmentedLog(str(path), "events", **kwargs)
+
+
+def segment_files(path):
+    return sorted(name for name in os.listdir(path) if name.startswith("events-"))
+
+
+def test_appends_survive_a_restart_and_roll_over_segments(tmp_path):
+    log = open_log(tmp_path, max_segment_bytes=100)
+    locations = [log.append({"n": i, "pad": "x" * 30}) for i in range(6)]
+    assert len(log.segments) > 1
+    reopened = open_log(tmp_path, max_segment_bytes=100)
+    assert [r["n"] for r in reopened.records()] == list(range(6))
+    assert [reopened.read(*location)["n"] for location in locations] == list(range(6))
+
+
+def test_the_log_never_compacts_itself(tmp_path):
+    log = open_log(tmp_path, max_segment_bytes=64)
+    for i in range(50):
+        log.append({"n": i})
+    assert len(segment_files(tmp_path)) == len(log.segments) > 5
+    assert all(open(os.path.join(tmp_path, name)).read().count(COMPACTED_MARKER) == 0
+               for name in segment_files(tmp_path))
+
+
+def test_compaction_respects_the_segment_cap(tmp_path):
+    log = open_log(tmp_path, max_segment_bytes=200)
+    for i in range(40):
+        log.append({"n": i, "pad": "y" * 20})
+    old = list(log.segments)
+    locations = log.compact({"n": i} for i in range(0, 40, 2))
+    assert len(log.segments) > 1 and not set(log.segments) & set(old)
+    assert all(os.path.getsize(os.path.join(tmp_path, name)) <= 200 for name in segment_files(tmp_path))
+    assert segment_files(tmp_path) == [os.path.basename(log._segment_path(s)) for s in log.segments]
+    assert [log.read(*location)["n"] for location in locations] == list(range(0, 40, 2))
+    reopened = open_log(tmp_path, max_segment_bytes=200)
+    assert reopened.segments == log.segments
+    assert [r["n"] for r in reopened.records()] == list(range(0, 40, 2))
+
+
+def test_compaction_reports_new_locations(tmp_path):
+    log = open_log(tmp_path)
+    seen = []
+    log.on_compact = seen.append
+    log.append({"n": 1})
+    locations = log.compact([{"n": 2}])
+    assert seen == [locations]
+    assert log.read(*locations[0]) == {"n": 2}
+
+
+def test_compacting_to_nothing_leaves_an_empty_log(tmp_path):
+    log = open_log(tmp_path)
+    log.append({"n": 1})
+    log.compact([])
+    assert list(open_log(tmp_path).records()) == []
+    log.append({"n": 2})
+    assert [r["n"] for r in open_log(tmp_path).records()] == [2]
+
+
+def test_a_record_larger_than_the_cap_gets_its_own_segment(tmp_path):
+    log = open_log(tmp_path, max_segment_bytes=50)
+    log.compact([{"n": 1}, {"n": 2, "pad": "z" * 100}, {"n": 3}])
+    assert len(log.segments) == 3
+    assert [r["n"] for r in open_log(tmp_path, max_segment_bytes=50).records()] == [1, 2, 3]
+
+
+def test_tails_of_an_interrupted_compaction_are_dropped(tmp_path, monkeypatch):
+    log = open_log(tmp_path, max_segment_bytes=60)
+    for i in range(5):
+        log.append({"n": i})
+    before = list(log.segments)
+    head = log._segment_path(before[-1] + 1)
+
+    # Crash after the tail segments were renamed into place, before the head
+    real_replace = os.replace
+    renamed = []
+
+    def replace(src, dst):
+        if dst == head:
+            raise OSError("crash")
+        renamed.append(dst)
+        real_replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", replace)
+    with pytest.raises(OSError):
+        log.compact({"n": i, "pad": "p" * 20} for i in range(10))
+    monkeypatch.undo()
+    assert renamed and os.path.exists(head + ".tmp")
+
+    reopened = open_log(tmp_path, max_segment_bytes=60)
+    assert reopened.segments == before
+    assert [r["n"] for r in reopened.records()] == list(range(5))
+    assert segment_files(tmp_path) == [os.path.basename(log._segment_path(s)) for s in before]
+
+
+def test_legacy_single_segment_marker(tmp_path):
+    with open(tmp_path / "events-000001.jsonl", "w") as f:
+        f.write(json.dumps({"n": 0}) + "\n")
+    with open(tmp_path / "events-000002.jsonl", "w") as f:
+        f.write(json.dumps({COMPACTED_MARKER: True}) + "\n" + json.dumps({"n": 1}) + "\n")
+    with open(tmp_path / "events-000003.jsonl", "w") as f:
+        f.write(json.dumps({"n": 2}) + "\n")
+    log = open_log(tmp_path)
+    assert log.segments == [2, 3]
+    assert [r["n"] for r in log.records()] == [1, 2]
+    assert not (tmp_path / "events-000001.jsonl").exists()
+
+
+def test_a_torn_final_line_is_dropped(tmp_path):
+    log = open_log(tmp_path)
+    log.append({"n": 1})
+    with open(log._segment_path(log.segments[-1]), "ab") as f:
+        f.write(b'{"n": 2, "torn')
+    reopened = open_log(tmp_path)
+    reopened.append({"n": 3})
+    assert [r["n"] for r in open_log(tmp_path).records()] == [1, 3]
+
+
+def test_memory_migrates_a_legacy_memory_file(tmp_path):
+    legacy = tmp_path / "memory.json"
+    traces = [{"task": f"task {i}", "status": "success", "timestamp": i, "plan": []} for i in range(3)]
+    rule = {"trigger": "write fib", "action": [{"type": "command", "command": "python fib.py"}]}
+    legacy.write_text(json.dumps({"episodic": traces, "procedural": [rule]}))
+
+    memory = Memory(str(legacy), fsync=False)
+    assert [t["task"] for t in memory.episodic_memory] == ["task 0", "task 1", "task 2"]
+    assert [r["trigger"] for r in memory.procedural_memory] == ["write fib"]
+    # The legacy file is left as it was, and not read again
+    assert json.loads(legacy.read_text())["episodic"] == traces
+    memory.add_trace({"task": "task 3", "status": "failure", "plan": []})
+    legacy.write_text(json.dumps({"episodic": [], "procedural": []}))
+    reloaded = Memory(str(legacy), fsync=False)
+    assert [t["task"] for t in reloaded.episodic_memory] == ["task 0", "task 1", "task 2", "task 3"]
+    assert [r["trigger"] for r in reloaded.procedural_memory] == ["write fib"]
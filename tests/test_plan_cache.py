@@ -0,0 +1,65 @@
+from src.core.plan_cache import PlanCache, normalize_task
+
+PLAN = [{"type": "command", "command": "python add.py"}]
+OTHER = [{"type": "command", "command": "python sub.py"}]
+
+
+def test_only_whitespace_is_normalized():
+    assert normalize_task("  compute\t2+1 \n") == "compute 2+1"
+    distinct = ["compute 2+1", "compute 2-1", "print HELLO", "print hello", "cat a.txt", "cat a_txt",
+                "print the file", "print file"]
+    assert len({normalize_task(task) for task in distinct}) == len(distinct)
+    assert normalize_task(None) == ""
+
+
+def test_get_put_invalidate_and_counters():
+    cache = PlanCache()
+    assert cache.get("compute 2+1", "env") is None
+    cache.put("compute 2+1", "env", PLAN)
+    assert cache.get("compute  2+1 ", "env") == PLAN
+    assert cache.get("compute 2-1", "env") is None
+    assert cache.get("Compute 2+1", "env") is None
+    assert cache.get("compute 2+1", "other env") is None
+    cache.invalidate("compute 2+1", "env")
+    assert cache.get("compute 2+1", "env") is None
+    assert cache.stats() == {"hits": 1, "misses": 5, "evictions": 0, "size": 0}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PlanCache(max_entries=2)
+    cache.put("a", "env", PLAN)
+    cache.put("b", "env", PLAN)
+    cache.get("a", "env")
+    cache.put("c", "env", PLAN)
+    assert cache.get("b", "env") is None
+    assert cache.get("a", "env") == PLAN and cache.get("c", "env") == PLAN
+    assert cache.stats()["evictions"] == 1
+    # Replacing an entry does not evict
+    cache.put("a", "env", OTHER)
+    assert cache.get("a", "env") == OTHER and cache.stats()["evictions"] == 1
+
+
+def test_load_rules_skips_unknown_environments_and_failing_rules():
+    rules = [
+        {"trigger": "compute 2+1", "action": PLAN, "fingerprint": "env", "successes": 2, "failures": 0},
+        {"trigger": "compute 2-1", "action": OTHER, "fingerprint": "env", "successes": 1, "failures": 2},
+        {"trigger": "old rule", "action": PLAN},
+        {"trigger": "empty plan", "action": [], "fingerprint": "env"},
+    ]
+    cache = PlanCache()
+    cache.load_rules(rules)
+    assert list(cache.entries) == [("compute 2+1", "env")]
+
+
+def test_load_rules_keeps_the_best_scoring_rule():
+    rules = [
+        {"trigger": "compute 2+1", "action": PLAN, "fingerprint": "env", "score": 0.4, "last_used": 2.0},
+        {"trigger": "compute  2+1", "action": OTHER, "fingerprint": "env", "score": 0.9, "last_used": 1.0},
+        {"trigger": "Compute 2+1", "action": PLAN, "fingerprint": "env", "score": 0.1, "last_used": 3.0},
+    ]
+    cache = PlanCache()
+    cache.load_rules(rules, score=lambda rule: rule["score"])
+    # Inserted by last use, so the most recently used is evicted last
+    assert list(cache.entries) == [("compute 2+1", "env"), ("Compute 2+1", "env")]
+    assert cache.get("compute 2+1", "env") == OTHER
+    assert cache.get("Compute 2+1", "env") == PLAN
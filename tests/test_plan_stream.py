@@ -0,0 +1,200 @@
+import json
+import pytest
+from src.core.memory import Memory
+from src.core.plan_parser import PlanParseError, StreamingPlanParser
+from src.core.planner import Planner
+from src.core.scheduler import StepScheduler
+from src.utils.llm import LLM, StreamInterrupted
+
+STEPS = [
+    {"type": "write_file", "filename": "a.py", "content": "print('{[}]')\n"},
+    {"type": "command", "command": "echo \"}\" && echo \\\\"},
+    {"type": "verify", "command": "python a.py"},
+]
+PLAN = json.dumps(STEPS, indent=2)
+
+
+def feed_all(parser, chunks):
+    steps = []
+    for chunk in chunks:
+        steps.extend(parser.feed(chunk))
+    return steps
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 64, 10_000])
+def test_parser_yields_each_step_whatever_the_chunking(size):
+    text = f"Here is the plan:\n```json\n{PLAN}\n```\nDone."
+    parser = StreamingPlanParser()
+    assert feed_all(parser, [text[i:i + size] for i in range(0, len(text), size)]) == STEPS
+    assert parser.done
+
+
+def test_parser_returns_steps_as_soon_as_they_close():
+    parser = StreamingPlanParser()
+    first = json.dumps(STEPS[0])
+    assert parser.feed("```json\n[" + first[:-1]) == []
+    assert parser.feed(first[-1] + ",") == [STEPS[0]]
+    assert not parser.done
+
+
+def test_parser_accepts_bare_json():
+    parser = StreamingPlanParser()
+    assert feed_all(parser, ["  ", PLAN[:10], PLAN[10:]]) == STEPS
+
+
+def test_parser_waits_for_a_fence_split_across_chunks():
+    parser = StreamingPlanParser()
+    # The brackets in the prose come before the fence and are not the plan
+    assert parser.feed("Run [tests] first.\n``") == []
+    assert parser.feed("`js") == []
+    assert feed_all(parser, ["on\n", PLAN, "\n```"]) == STEPS
+
+
+def test_parser_ignores_prose_without_a_plan():
+    parser = StreamingPlanParser()
+    assert feed_all(parser, ["I cannot ", "help with that {", "}."]) == []
+    assert not parser.done
+
+
+def test_parser_ignores_malformed_trailing_data():
+    parser = StreamingPlanParser()
+    steps = feed_all(parser, ["```json\n", PLAN, "\n```\n", '[{"type": "command", ', "{{{ \"unterminated"])
+    assert steps == STEPS
+    assert parser.feed('"}]') == []
+    assert parser.steps == STEPS
+
+
+def test_parser_reports_a_malformed_step():
+    parser = StreamingPlanParser()
+    assert parser.feed("[" + json.dumps(STEPS[0]) + ", ") == [STEPS[0]]
+    with pytest.raises(PlanParseError, match="step 2"):
+        parser.feed('{"type": "command", "command": "ls",}, ' + json.dumps(STEPS[2]) + "]")
+    assert parser.steps == [STEPS[0]]
+
+
+def sse_event(text: str, finish: bool = False) -> bytes:
+    chunk = {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+    if finish:
+        chunk["candidates"][0]["finishReason"] = "STOP"
+    return b"data: " + json.dumps(chunk).encode("utf-8") + b"\r\n\r\n"
+
+
+def serve_sse(payload: bytes, sizes, finish: bool = True):
+    # Sends payload as chunked transfer encoding, cut into pieces of the given
+    # sizes (repeating), so events and their JSON split across chunks;
+    # finish=False drops the connection before the terminating chunk
+    def handle(handler):
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+        pos, i = 0, 0
+        while pos < len(payload):
+            piece = payload[pos:pos + sizes[i % len(sizes)]]
+            handler.wfile.write(b"%x\r\n%s\r\n" % (len(piece), piece))
+            handler.wfile.flush()
+            pos += len(piece)
+            i += 1
+        if finish:
+            handler.wfile.write(b"0\r\n\r\n")
+        else:
+            handler.close_connection = True
+        handler.wfile.flush()
+    return handle
+
+
+@pytest.fixture
+def stream_llm(http_stub, monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+
+    def start(handle):
+        server, url = http_stub(handle)
+        return server, LLM(base_url=url, max_retries=0)
+    return start
+
+
+def test_generate_stream_reassembles_events_split_across_chunks(stream_llm):
+    texts = [PLAN[:13], PLAN[13:50], PLAN[50:]]
+    payload = b"".join(sse_event(t, finish=t is texts[-1]) for t in texts)
+    server, llm = stream_llm(serve_sse(payload, [5, 17, 1, 64]))
+    chunks = list(llm.generate_stream("plan it"))
+    assert chunks == texts
+    assert "alt=sse" in server.requests[0][1]
+    parser = StreamingPlanParser()
+    assert feed_all(parser, chunks) == STEPS
+
+
+def test_generate_stream_skips_a_malformed_event(stream_llm):
+    payload = sse_event("one ") + b'data: {"candidates": [\r\n\r\n' + b": keep-alive\r\n\r\n" + sse_event("two", finish=True)
+    _, llm = stream_llm(serve_sse(payload, [9]))
+    assert list(llm.generate_stream("plan it")) == ["one ", "two"]
+
+
+def collect(stream):
+    # Chunks received before the stream raised, and the exception
+    chunks = []
+    try:
+        for chunk in stream:
+            chunks.append(chunk)
+    except Exception as e:
+        return chunks, e
+    return chunks, None
+
+
+def test_generate_stream_raises_on_early_disconnect(stream_llm):
+    payload = sse_event("```json\n[") + sse_event(json.dumps(STEPS[0]) + ",") + sse_event(json.dumps(STEPS[1]))
+    # Cut off part way through the last event
+    _, llm = stream_llm(serve_sse(payload[:-20], [11], finish=False))
+    chunks, error = collect(llm.generate_stream("plan it"))
+    assert "".join(chunks) == "```json\n[" + json.dumps(STEPS[0]) + ","
+    assert isinstance(error, StreamInterrupted)
+
+
+def test_generate_stream_raises_when_the_model_never_finished(stream_llm):
+    # Every event arrived intact, but the last one never said it was the last
+    payload = sse_event("```json\n[") + sse_event(json.dumps(STEPS[0]))
+    _, llm = stream_llm(serve_sse(payload, [64]))
+    chunks, error = collect(llm.generate_stream("plan it"))
+    assert len(chunks) == 2 and isinstance(error, StreamInterrupted)
+
+
+def test_an_interrupted_plan_fails_the_attempt():
+    ran = []
+
+    class Executor:
+        def execute_step(self, step, cwd="."):
+            ran.append(step["command"])
+            return {"status": "success"}
+
+    def plan():
+        yield {"type": "command", "command": "one"}
+        raise StreamInterrupted("stream ended before the model finished its response")
+
+    outcome = StepScheduler(Executor()).run(plan())
+    assert outcome["status"] == "failure" and ran == ["one"]
+    assert "stream ended" in outcome["failed"]["result"]["error"]
+    assert [r["step"]["command"] for r in outcome["steps"]] == ["one"]
+
+
+def test_generate_stream_falls_back_when_nothing_arrives(stream_llm):
+    _, llm = stream_llm(serve_sse(b"", [1], finish=False))
+    assert list(llm.generate_stream("write fib")) == [llm._mock_generate("write fib")]
+
+
+class ChunkedLLM:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def generate_stream(self, prompt, system_instruction=None):
+        yield from self.chunks
+
+
+def test_planner_rejects_a_plan_that_never_closes(tmp_path):
+    memory = Memory(str(tmp_path / "memory.json"), fsync=False)
+    text = "```json\n[" + json.dumps(STEPS[0]) + ", " + json.dumps(STEPS[1])
+    planner = Planner(ChunkedLLM([text[:20], text[20:]]), memory)
+    steps, error = collect(planner.create_plan_stream("task", {"os": "linux"}))
+    assert steps == STEPS[:2]
+    assert isinstance(error, PlanParseError) and "closing" in str(error)
+    planner = Planner(ChunkedLLM([text, "]\n```"]), memory)
+    assert list(planner.create_plan_stream("task", {"os": "linux"})) == STEPS[:2]
@@ -0,0 +1,157 @@
+import time
+from src.core.log_store import SegmentedLog
+from src.core.memory import Memory
+from src.core.plan_cache import PlanCache
+from src.core.procedural import ProceduralMemory, rule_key
+
+FIB = [{"type": "write_file", "filename": "fib.py", "content": "print(55)"}]
+SORT = [{"type": "command", "command": "sort data.txt"}]
+
+
+def open_rules(path, **kwargs):
+    log = SegmentedLog(str(path), "procedural", fsync=False)
+    rules = ProceduralMemory(log, **kwargs)
+    rules.load(log.records())
+    return rules
+
+
+def test_repeats_update_one_rule(tmp_path):
+    rules = open_rules(tmp_path)
+    rules.record_success("write fib script", FIB, "env1", attempts=1)
+    rules.record_success("  write fib\tscript ", FIB, "env1", attempts=3)
+    assert rules.record_failure("write  fib script", FIB)
+    assert not rules.record_failure("write fib script", SORT)
+    assert not rules.record_failure("Write fib script", FIB)
+    [rule] = rules.all()
+    assert (rule["successes"], rule["failures"], rule["avg_attempts"]) == (2, 1, 2.0)
+    assert rule["key"] == rule_key("write fib script", FIB)
+
+    reloaded = open_rules(tmp_path)
+    assert reloaded.all() == [rule]
+
+
+def test_rules_from_older_keys_are_rekeyed(tmp_path):
+    log = SegmentedLog(str(tmp_path), "procedural", fsync=False)
+    log.append({"key": "old-fib", "trigger": "write fib", "action": FIB, "successes": 3, "failures": 0,
+                "attempts_total": 3})
+    log.append({"key": "old-sort", "trigger": "sort data", "action": SORT, "successes": 1, "failures": 0})
+    log.append({"key": "old-sort", "$deleted": True})
+    rules = ProceduralMemory(log)
+    rules.load(log.records())
+    [rule] = rules.all()
+    assert rule["key"] == rule_key("write fib", FIB)
+    # Later updates land on the same rule instead of a copy
+    rules.record_success("write fib", FIB)
+    assert [r["successes"] for r in open_rules(tmp_path).all()] == [4]
+
+
+def test_legacy_copies_fold_into_one_rule(tmp_path):
+    legacy = [
+        {"trigger": "write fib", "action": FIB, "timestamp": 100.0},
+        {"trigger": "write  fib", "action": FIB, "timestamp": 200.0, "fingerprint": "env1"},
+        {"trigger": "sort the data", "action": SORT},
+    ]
+    rules = open_rules(tmp_path)
+    rules.load(legacy)
+    by_trigger = {rule["trigger"]: rule for rule in rules.all()}
+    assert set(by_trigger) == {"write fib", "sort the data"}
+    fib = by_trigger["write fib"]
+    assert (fib["successes"], fib["last_used"], fib["fingerprint"]) == (2, 200.0, "env1")
+
+
+def test_least_used_rules_are_evicted(tmp_path):
+    rules = open_rules(tmp_path, max_rules=10)
+    for i in range(10):
+        rules.record_success(f"task {i}", [{"type": "command", "command": f"echo {i}"}])
+    for _ in range(3):
+        rules.record_success("task 0", [{"type": "command", "command": "echo 0"}])
+    rules.record_success("task 10", [{"type": "command", "command": "echo 10"}])
+    triggers = {rule["trigger"] for rule in rules.all()}
+    assert len(triggers) == 9 and {"task 0", "task 10"} <= triggers
+    assert rules.evictions == 2
+    # Deletions are logged, so evicted rules stay gone after a restart
+    assert {rule["trigger"] for rule in open_rules(tmp_path, max_rules=10).all()} == triggers
+
+
+def test_old_unused_rules_age_out_first(tmp_path):
+    rules = open_rules(tmp_path, max_rules=10, half_life_days=1.0)
+    for _ in range(4):
+        rules.record_success("old favourite", FIB)
+    rules.rules[rule_key("old favourite", FIB)]["last_used"] = time.time() - 10 * 86400
+    for i in range(10):
+        rules.record_success(f"task {i}", [{"type": "command", "command": f"echo {i}"}])
+    triggers = {rule["trigger"] for rule in rules.all()}
+    # Four uses ten half-lives ago count for less than one use today
+    assert len(triggers) == 9 and "old favourite" not in triggers and "task 9" in triggers
+
+
+def test_search_weights_similarity_with_track_record(tmp_path):
+    rules = open_rules(tmp_path)
+    good = [{"type": "command", "command": "python -m pytest"}]
+    bad = [{"type": "command", "command": "pytest --broken"}]
+    rules.record_success("run the python unit tests", bad)
+    for _ in range(3):
+        rules.record_failure("run the python unit tests", bad)
+    rules.record_success("run python unit tests now", good)
+    assert [rule["action"] for rule in rules.search("run the python unit tests", k=2)] == [good, bad]
+
+
+def test_restarts_do_not_compact_a_small_log(tmp_path):
+    rules = open_rules(tmp_path)
+    for i in range(5):
+        rules.record_success("write fib", FIB, "env1", attempts=1)
+    segments = list(rules.log.segments)
+    for _ in range(3):
+        rules = open_rules(tmp_path)
+    assert rules.log.segments == segments
+    assert rules.stats() == {"rules": 1, "log_records": 5, "evictions": 0}
+
+
+def test_an_oversized_log_is_compacted(tmp_path):
+    rules = open_rules(tmp_path)
+    for i in range(100):
+        rules.record_success("write fib", FIB)
+    # Compacted once records exceed 2 * rules + 64
+    assert rules.stats()["log_records"] < 66
+    assert open_rules(tmp_path).all()[0]["successes"] == 100
+
+
+def test_plan_cache_is_seeded_with_the_best_rule(tmp_path):
+    rules = open_rules(tmp_path)
+    rules.record_success("write fib", FIB, "env1", attempts=4)
+    alternative = [{"type": "write_file", "filename": "fib.py", "content": "print(fib(10))"}]
+    rules.record_success("write  fib", alternative, "env1", attempts=1)
+    rules.record_success("sort data", SORT, "env1")
+    for _ in range(2):
+        rules.record_failure("sort data", SORT)
+    rules.record_success("write fib", FIB, "env2")
+    rules.record_success("unknown environment", FIB)
+
+    cache = PlanCache()
+    cache.load_rules(rules.all(), score=rules.quality)
+    assert cache.get("write fib ", "env1") == alternative
+    assert cache.get("write the fib", "env1") is None
+    assert cache.get("write fib", "env2") == FIB
+    assert cache.get("sort data", "env1") is None
+    assert cache.stats()["size"] == 2
+
+
+def test_plan_cache_keeps_last_used_order(tmp_path):
+    rules = open_rules(tmp_path)
+    for i in range(3):
+        rules.record_success(f"task {i}", [{"type": "command", "command": f"echo {i}"}], "env1")
+    rules.rules[rule_key("task 0", [{"type": "command", "command": "echo 0"}])]["last_used"] = time.time() + 60
+    cache = PlanCache(max_entries=2)
+    cache.load_rules(rules.all(), score=rules.quality)
+    # The oldest entry was evicted; task 0 is now the most recently used
+    assert list(cache.entries) == [("task 2", "env1"), ("task 0", "env1")]
+
+
+def test_memory_keeps_rules_across_restarts(tmp_path):
+    memory = Memory(str(tmp_path / "memory.json"), fsync=False)
+    memory.update_procedural_memory({"trigger": "write fib", "action": FIB, "fingerprint": "env1"})
+    memory.update_procedural_memory({"trigger": "write fib", "action": FIB, "fingerprint": "env1", "attempts": 3})
+    reloaded = Memory(str(tmp_path / "memory.json"), fsync=False)
+    [rule] = reloaded.get_procedural_rules()
+    assert (rule["successes"], rule["avg_attempts"]) == (2, 2.0)
+    assert reloaded.search_rules("write fib") == [rule]
@@ -0,0 +1,76 @@
+import sys
+from src.utils.process import BoundedOutput, run_streaming
+
+PYTHON = f'"{sys.executable}"'
+
+
+def bounded(data: bytes, max_bytes: int, chunk: int = None) -> BoundedOutput:
+    output = BoundedOutput(max_bytes)
+    chunk = chunk or len(data) or 1
+    for i in range(0, len(data), chunk):
+        output.write(data[i:i + chunk])
+    return output
+
+
+def test_output_under_the_limit_is_kept_whole():
+    for chunk in (1, 3, None):
+        output = bounded(b"hello\nworld\n", 16, chunk)
+        assert output.text() == "hello\nworld\n"
+        assert output.total == 12 and not output.truncated
+    assert bounded(b"", 16).text() == ""
+    # Exactly at the limit is not truncated either
+    assert bounded(b"x" * 16, 16).text() == "x" * 16
+
+
+def test_output_over_the_limit_keeps_head_and_tail():
+    data = b"".join(b"line %03d\n" % i for i in range(100))
+    for chunk in (1, 7, 4096):
+        output = bounded(data, 40, chunk)
+        assert output.truncated and output.total == len(data)
+        assert bytes(output.head) == data[:20] and bytes(output.tail) == data[-20:]
+        assert output.text() == (data[:20].decode() + f"\n... [{len(data) - 40} bytes omitted] ...\n"
+                                 + data[-20:].decode())
+
+
+def test_odd_limits_split_into_head_and_tail():
+    output = bounded(b"abcdefghij", 5)
+    assert bytes(output.head) == b"ab" and bytes(output.tail) == b"hij"
+
+
+def test_a_character_split_between_head_and_tail_is_rejoined():
+    data = "ab€".encode("utf-8")  # 5 bytes; the euro sign spans the split
+    output = bounded(data, 6, 1)
+    assert bytes(output.head) == b"ab\xe2" and not output.truncated
+    assert output.text() == "ab€"
+
+
+def test_characters_cut_at_the_gap_are_dropped():
+    data = ("€" * 10).encode("utf-8")  # 30 bytes, 3 per character
+    output = bounded(data, 10, 4)
+    # The head keeps 5 bytes (one whole euro and part of the next), the tail 5
+    text = output.text()
+    assert "�" not in text
+    assert text == "€\n... [24 bytes omitted] ...\n€"
+    emoji = ("😀" * 5).encode("utf-8")  # 4 bytes each
+    text = bounded(emoji, 10).text()
+    assert text == "😀\n... [12 bytes omitted] ...\n😀"
+
+
+def test_invalid_bytes_are_still_replaced():
+    assert bounded(b"ok \xff\xfe end", 64).text() == "ok �� end"
+
+
+def test_run_streaming_bounds_each_stream(tmp_path):
+    script = "import sys; sys.stdout.write('o' * 5000 + 'END'); sys.stderr.write('err')"
+    result = run_streaming(f"{PYTHON} -c \"{script}\"", cwd=str(tmp_path), max_output_bytes=100, echo=False)
+    assert result["returncode"] == 0 and result["truncated"]
+    assert result["stdout_bytes"] == 5003 and result["stdout"].endswith("END")
+    assert "bytes omitted" in result["stdout"] and len(result["stdout"]) < 200
+    assert result["stderr"] == "err" and result["stderr_bytes"] == 3
+
+
+def test_run_streaming_returns_partial_output_on_timeout(tmp_path):
+    script = "import time; print('started', flush=True); time.sleep(30)"
+    result = run_streaming(f"{PYTHON} -c \"{script}\"", cwd=str(tmp_path), timeout=0.5, echo=False)
+    assert result["timed_out"] and not result["cancelled"]
+    assert result["stdout"].strip() == "started"
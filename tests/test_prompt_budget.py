@@ -0,0 +1,93 @@
+from src.core.prompt_budget import (PromptBuilder, estimate_tokens, truncate_head, truncate_head_tail,
+                                    truncate_items)
+
+
+def lines(prefix, count, width=36):
+    return "".join(f"{prefix} {i:04} ".ljust(width, ".") + "\n" for i in range(count))
+
+
+def test_estimate_tokens_rounds_up():
+    assert [estimate_tokens(t) for t in ("", "a", "abcd", "abcde")] == [0, 1, 1, 2]
+
+
+def test_truncators():
+    text = lines("line", 100)
+    head = truncate_head(text, 100)
+    assert head.startswith("line 0000") and head.endswith("more lines omitted]\n")
+    assert estimate_tokens(head) <= 100 and "line 0099" not in head
+    both = truncate_head_tail(text, 100)
+    assert both.startswith("line 0000") and both.rstrip().endswith("line 0099 " + "." * 26)
+    assert "chars omitted" in both and estimate_tokens(both) <= 100
+    items = [f"rule {i}\n" for i in range(10)]
+    assert truncate_items(items, 6) == "rule 0\nrule 1\nrule 2\n... [7 more omitted]\n"
+    for truncate in (truncate_head, truncate_head_tail):
+        assert truncate("short\n", 100) == "short\n"
+    assert truncate_items(items, 1000) == "".join(items)
+
+
+def build(budget, **bodies):
+    builder = PromptBuilder(budget=budget)
+    builder.add("task", bodies.get("task", "TASK: do it\n"), header="## Task\n")
+    builder.add("environment", bodies.get("environment", ""), header="## Env\n")
+    builder.add("files", bodies.get("files", ""), header="## Files\n")
+    builder.add("rules", bodies.get("rules", []), header="## Rules\n", mode="items")
+    builder.add("feedback", bodies.get("feedback", ""), header="## Feedback\n", mode="head_tail")
+    return builder.build()
+
+
+def test_nothing_is_cut_when_everything_fits():
+    bodies = {"environment": "os: linux\n", "files": lines("file", 5), "rules": ["r1\n", "r2\n"],
+              "feedback": "error\n"}
+    prompt, usage = build(10_000, **bodies)
+    assert prompt == ("## Task\nTASK: do it\n## Env\nos: linux\n## Files\n" + bodies["files"]
+                      + "## Rules\nr1\nr2\n## Feedback\nerror\n")
+    assert all(u["tokens"] == u["original"] for name, u in usage.items() if name != "total")
+    # Empty sections are left out altogether
+    assert "## Env" not in build(10_000)[0]
+
+
+def test_over_budget_sections_share_by_weight():
+    bodies = {"environment": lines("env", 100), "files": lines("file", 100),
+              "rules": [lines(f"rule{i}", 3) for i in range(30)], "feedback": lines("fb", 100),
+              "task": lines("task", 20)}
+    prompt, usage = build(1000, **bodies)
+    # The task has no weight and is never truncated
+    assert usage["task"]["tokens"] == usage["task"]["original"]
+    assert bodies["task"] in prompt
+    assert usage["total"]["tokens"] <= 1000 + 10
+    for name in ("environment", "files", "rules", "feedback"):
+        assert usage[name]["tokens"] < usage[name]["original"]
+    # Weights 1:3:2:3
+    assert usage["environment"]["tokens"] < usage["rules"]["tokens"] < usage["files"]["tokens"]
+    assert abs(usage["files"]["tokens"] - usage["feedback"]["tokens"]) <= 12
+    # Rules keep whole items, best first; feedback keeps both ends
+    assert "rule0 0000" in prompt and "rule29" not in prompt and "more omitted]" in prompt
+    assert "fb 0000" in prompt and "fb 0099" in prompt
+
+
+def test_small_sections_pass_their_surplus_on():
+    bodies = {"environment": "os: linux\n", "files": lines("file", 200), "feedback": "error\n"}
+    prompt, usage = build(1000, **bodies)
+    assert "os: linux" in prompt and "error" in prompt
+    # Files get everything the others did not need
+    assert usage["total"]["tokens"] >= 950
+    assert usage["files"]["tokens"] < usage["files"]["original"]
+
+
+def test_unused_item_share_goes_to_the_other_sections():
+    # Rules are few large items, so whole-item truncation leaves most of their share unused
+    bodies = {"files": lines("file", 300), "rules": [lines("big", 60), lines("big2", 60)]}
+    _, usage = build(1000, **bodies)
+    assert usage["rules"]["tokens"] < 20
+    assert usage["files"]["tokens"] > 900
+
+
+def test_headers_are_kept_even_without_room():
+    prompt, usage = build(0, files=lines("file", 50), feedback=lines("fb", 50))
+    assert "## Files\n" in prompt and "## Feedback\n" in prompt
+    assert "file 0001" not in prompt
+
+
+def test_building_is_deterministic():
+    bodies = {"environment": lines("env", 50), "files": lines("file", 80), "feedback": lines("fb", 90)}
+    assert build(700, **bodies) == build(700, **bodies)
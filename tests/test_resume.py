@@ -0,0 +1,103 @@
+import os
+from src.core.file_edit import apply_unified_diff
+from src.core.resume import ResumingExecutor
+
+
+class FakeExecutor:
+    # Runs write_file and edit_file for real; a command calls its "effect"
+    def __init__(self):
+        self.runs = []
+
+    def execute_step(self, step, cwd="."):
+        self.runs.append(step.get("command") or step.get("filename"))
+        path = os.path.join(cwd, step.get("filename", ""))
+        if step["type"] == "write_file":
+            with open(path, "w") as f:
+                f.write(step["content"])
+        elif step["type"] == "edit_file":
+            with open(path) as f:
+                text = f.read()
+            with open(path, "w") as f:
+                f.write(apply_unified_diff(text, step["diff"]))
+        elif step.get("effect"):
+            step["effect"](cwd)
+        return {"status": "success"}
+
+
+def write(cwd, name, text):
+    with open(os.path.join(cwd, name), "w") as f:
+        f.write(text)
+
+
+def build_step():
+    # Concatenates every *.txt input into out.bin
+    def effect(cwd):
+        inputs = sorted(n for n in os.listdir(cwd) if n.endswith(".txt"))
+        write(cwd, "out.bin", "".join(open(os.path.join(cwd, n)).read() for n in inputs))
+    return {"type": "command", "command": "cat *.txt > out.bin", "effect": effect}
+
+
+def test_a_kept_command_is_skipped_when_nothing_changed(tmp_path):
+    cwd = str(tmp_path)
+    write(cwd, "a.txt", "a")
+    resumer = ResumingExecutor(FakeExecutor())
+    build = build_step()
+    resumer.execute_step(build, cwd)
+    assert resumer.execute_step(build, cwd)["skipped"]
+    assert resumer.executor.runs == ["cat *.txt > out.bin"]
+
+
+def test_later_recorded_steps_do_not_force_a_rerun(tmp_path):
+    cwd = str(tmp_path)
+    resumer = ResumingExecutor(FakeExecutor())
+    build = build_step()
+    resumer.execute_step(build, cwd)
+    resumer.execute_step({"type": "write_file", "filename": "notes.md", "content": "done"}, cwd)
+    assert resumer.execute_step(build, cwd).get("skipped")
+
+
+def test_a_new_input_matched_by_a_glob_reruns(tmp_path):
+    cwd = str(tmp_path)
+    write(cwd, "a.txt", "a")
+    resumer = ResumingExecutor(FakeExecutor())
+    build = build_step()
+    resumer.execute_step(build, cwd)
+    write(cwd, "b.txt", "b")
+    assert not resumer.execute_step(build, cwd).get("skipped")
+    assert open(os.path.join(cwd, "out.bin")).read() == "ab"
+
+
+def test_a_new_step_with_the_same_text_runs(tmp_path):
+    cwd = str(tmp_path)
+    resumer = ResumingExecutor(FakeExecutor())
+    resumer.execute_step(build_step(), cwd)
+    assert not resumer.execute_step(build_step(), cwd).get("skipped")
+    assert len(resumer.executor.runs) == 2
+
+
+def test_write_file_is_skipped_only_with_identical_content(tmp_path):
+    cwd = str(tmp_path)
+    resumer = ResumingExecutor(FakeExecutor())
+    step = {"type": "write_file", "filename": "fib.py", "content": "print(55)\n"}
+    resumer.execute_step(step, cwd)
+    assert resumer.execute_step(dict(step), cwd)["skipped"]
+    assert not resumer.execute_step(dict(step, content="print(89)\n"), cwd).get("skipped")
+
+
+def test_an_applied_edit_is_not_applied_twice(tmp_path):
+    cwd = str(tmp_path)
+    write(cwd, "f.py", "x = 1\ny = 2\n")
+    resumer = ResumingExecutor(FakeExecutor())
+    edit = {"type": "edit_file", "filename": "f.py", "diff": "@@ -1,2 +1,2 @@\n-x = 1\n+x = 3\n y = 2\n"}
+    resumer.execute_step(edit, cwd)
+    assert resumer.execute_step(dict(edit), cwd)["skipped"]
+    assert open(os.path.join(cwd, "f.py")).read() == "x = 3\ny = 2\n"
+
+
+def test_forget_drops_the_record(tmp_path):
+    cwd = str(tmp_path)
+    resumer = ResumingExecutor(FakeExecutor())
+    build = build_step()
+    resumer.execute_step(build, cwd)
+    resumer.forget(cwd)
+    assert not resumer.execute_step(build, cwd).get("skipped")
@@ -0,0 +1,51 @@
+from src.core.retrieval import RuleIndex, tokenize
+
+
+def rule(trigger, n=0):
+    return {"trigger": trigger, "action": [{"type": "command", "command": f"echo {n}"}]}
+
+
+def build(triggers):
+    index = RuleIndex()
+    for n, trigger in enumerate(triggers):
+        index.add(rule(trigger, n))
+    return index
+
+
+def test_tokenize_adds_bigrams_and_drops_plurals():
+    assert tokenize("Write Tests.") == ["write", "test", "write test"]
+
+
+def test_best_match_first():
+    index = build(["sort a csv file", "write fibonacci script", "parse json config"])
+    [(score, best)] = index.search("write a fibonacci script", k=1)
+    assert best["trigger"] == "write fibonacci script" and score > 0.5
+    assert index.search("unrelated words", k=1) == []
+
+
+def test_duplicates_are_indexed_once_and_removed_rules_skipped():
+    index = build(["sort a csv file"])
+    index.add(rule("sort a csv file", 0))
+    index.add(rule("sort a csv file", 1))
+    assert len(index) == 2
+    index.remove(rule("sort a csv file", 0))
+    assert len(index) == 1
+    assert [r["action"] for _, r in index.search("sort csv")] == [rule("", 1)["action"]]
+
+
+def test_common_terms_are_skipped_when_rarer_terms_match():
+    # "python" is in every rule; "flask" only in one
+    index = build([f"python script number {i}" for i in range(40)] + ["python flask server"])
+    [(_, best)] = index.search("python flask", k=1)
+    assert best["trigger"] == "python flask server"
+
+
+def test_a_query_of_only_common_terms_still_matches():
+    triggers = [f"python script number {i}" for i in range(30)] + ["python test suite"]
+    index = build(triggers)
+    results = index.search("python script", k=3)
+    assert len(results) == 3
+    assert all("python script" in r["trigger"] for _, r in results)
+    # Several common terms: the later ones rescore the first one's candidates
+    results = index.search("python script number 7", k=1)
+    assert results[0][1]["trigger"] == "python script number 7"
@@ -0,0 +1,138 @@
+import threading
+import time
+from src.core.scheduler import StepScheduler
+
+
+class FakeExecutor:
+    # A step sleeps for its "sleep" seconds and fails if it has "fail"
+    def __init__(self):
+        self.started = []
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def execute_step(self, step, cwd="."):
+        with self._lock:
+            self.started.append(step["id"])
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(step.get("sleep", 0.0))
+        with self._lock:
+            self.running -= 1
+        return {"status": "failure" if step.get("fail") else "success"}
+
+
+def step(id, sleep=0.0, **kwargs):
+    return dict({"type": "command", "id": id, "sleep": sleep}, **kwargs)
+
+
+def run(steps, max_concurrency=4):
+    executor = FakeExecutor()
+    outcome = StepScheduler(executor, max_concurrency=max_concurrency).run(steps)
+    return executor, outcome
+
+
+def test_steps_without_dependencies_run_in_order():
+    executor, outcome = run([step("a", 0.02), step("b"), step("c")])
+    assert outcome["status"] == "success"
+    assert executor.started == ["a", "b", "c"] and executor.peak == 1
+    assert [r["step"]["id"] for r in outcome["steps"]] == ["a", "b", "c"]
+
+
+def test_independent_steps_run_concurrently():
+    steps = [step("a", 0.2, depends_on=[]), step("b", 0.2, depends_on=[]), step("c", 0.2, depends_on=[])]
+    executor, outcome = run(steps)
+    assert executor.peak == 3
+    timing = outcome["timing"]
+    assert timing["wall_time"] < 0.45
+    assert abs(timing["step_time"] - 0.6) < 0.1
+    assert abs(timing["critical_path"] - 0.2) < 0.05
+
+
+def test_concurrency_is_capped():
+    steps = [step(str(i), 0.05, depends_on=[]) for i in range(6)]
+    executor, _ = run(steps, max_concurrency=2)
+    assert executor.peak == 2
+
+
+def test_a_step_waits_for_its_dependencies():
+    steps = [
+        step("slow", 0.2, depends_on=[]),
+        step("fast", 0.0, depends_on=[]),
+        step("after_fast", 0.0, depends_on=["fast"]),
+        step("after_both", 0.0, depends_on=["slow", "fast"]),
+    ]
+    executor, outcome = run(steps)
+    assert outcome["status"] == "success"
+    assert executor.started.index("after_fast") < executor.started.index("after_both")
+    assert executor.started[-1] == "after_both"
+    # The critical path is slow -> after_both
+    assert outcome["timing"]["critical_path_steps"] == [0, 3]
+
+
+def test_a_failure_stops_dependents_and_later_steps():
+    steps = [
+        step("a", 0.0, fail=True),
+        step("b"),
+        step("c", depends_on=["a"]),
+    ]
+    executor, outcome = run(steps)
+    assert outcome["status"] == "failure"
+    assert executor.started == ["a"]
+    assert outcome["failed"]["step"]["id"] == "a"
+    assert [r["step"]["id"] for r in outcome["steps"]] == ["a"]
+
+
+def test_running_steps_finish_when_another_fails():
+    steps = [step("slow", 0.2, depends_on=[]), step("bad", 0.0, depends_on=[], fail=True),
+             step("later", depends_on=["slow"])]
+    executor, outcome = run(steps)
+    assert outcome["failed"]["step"]["id"] == "bad"
+    assert sorted(executor.started) == ["bad", "slow"]
+    assert {r["step"]["id"] for r in outcome["steps"]} == {"bad", "slow"}
+
+
+def test_unknown_and_self_dependencies_fail_without_running():
+    executor, outcome = run([step("a"), step("b", depends_on=["missing"])])
+    assert outcome["status"] == "failure" and executor.started == ["a"]
+    assert "Unknown dependency 'missing'" in outcome["failed"]["result"]["error"]
+
+    # Dependencies can only point backwards, so a cycle shows up as an unknown id
+    executor, outcome = run([step("a", depends_on=["b"]), step("b", depends_on=["a"])])
+    assert executor.started == [] and "Unknown dependency 'b'" in outcome["failed"]["result"]["error"]
+    executor, outcome = run([step("a", depends_on=["a"])])
+    assert executor.started == [] and outcome["status"] == "failure"
+
+
+def test_streamed_plans_start_before_the_plan_is_complete():
+    executor = FakeExecutor()
+    first_started = threading.Event()
+
+    def plan():
+        yield step("a")
+        # The next step is only produced once the first one has started
+        assert first_started.wait(2)
+        yield step("b")
+
+    original = executor.execute_step
+
+    def execute_step(s, cwd="."):
+        result = original(s, cwd)
+        first_started.set()
+        return result
+
+    executor.execute_step = execute_step
+    outcome = StepScheduler(executor).run(plan())
+    assert outcome["status"] == "success" and executor.started == ["a", "b"]
+
+
+def test_timing_fields():
+    _, outcome = run([step("a", 0.05), step("b", 0.05)])
+    timing = outcome["timing"]
+    assert set(timing) == {"wall_time", "step_time", "critical_path", "critical_path_steps", "max_concurrency"}
+    assert timing["critical_path_steps"] == [0, 1]
+    assert timing["critical_path"] >= 0.1 and timing["wall_time"] >= timing["critical_path"]
+    for record in outcome["steps"]:
+        assert record["timing"]["end"] - record["timing"]["start"] >= 0.05 - 1e-6
+    _, empty = run([])
+    assert empty["status"] == "success" and empty["timing"]["critical_path"] == 0.0
@@ -0,0 +1,124 @@
+import os
+from src.core.search import FileSearcher, TrigramIndex
+
+
+def write(root, relpath, text):
+    path = os.path.join(root, relpath)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+    return path
+
+
+def bump_mtime(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def make_tree(root, files=300):
+    # Every file matches "hit" on two lines
+    for i in range(files):
+        write(root, f"pkg{i // 50}/mod{i:03}.py", f"x = 1\nhit {i}\ny = 2\nhit again {i}\n")
+
+
+def test_search_skips_ignored_and_binary_files(tmp_path):
+    root = str(tmp_path)
+    write(root, ".gitignore", "build/\n*.log\n")
+    write(root, "src/a.py", "needle here\n")
+    write(root, "build/a.py", "needle here\n")
+    write(root, "run.log", "needle here\n")
+    with open(os.path.join(root, "blob.bin"), "wb") as f:
+        f.write(b"needle\0here")
+    result = FileSearcher().search(root, "needle")
+    assert result["matches"] == ["src/a.py:1: needle here"]
+    assert result["count"] == 1 and not result["truncated"]
+
+
+def test_count_is_the_matches_found_and_truncated_is_set(tmp_path):
+    root = str(tmp_path)
+    write(root, "a.py", "hit\n" * 10)
+    result = FileSearcher(workers=1).search(root, "hit", max_results=5)
+    assert len(result["matches"]) == 5
+    assert result["count"] > 5 and result["truncated"]
+    result = FileSearcher(workers=1).search(root, "hit", max_results=10)
+    assert result["count"] == 10 and not result["truncated"]
+
+
+def test_early_stop_returns_the_first_matches_in_walk_order(tmp_path):
+    root = str(tmp_path)
+    make_tree(root)
+    expected = FileSearcher(workers=1).search(root, "hit", max_results=120)
+    assert expected["matches"][:3] == ["pkg0/mod000.py:2: hit 0", "pkg0/mod000.py:4: hit again 0",
+                                       "pkg0/mod001.py:2: hit 1"]
+    assert expected["truncated"]
+    for _ in range(5):
+        result = FileSearcher(workers=8).search(root, "hit", max_results=120)
+        assert result["matches"] == expected["matches"]
+        assert result["count"] == expected["count"] and result["truncated"]
+    everything = FileSearcher(workers=8).search(root, "hit", max_results=1000)
+    assert everything["count"] == 600 and not everything["truncated"]
+
+
+def test_include_exclude_and_regex(tmp_path):
+    root = str(tmp_path)
+    write(root, "a.py", "value = 10\n")
+    write(root, "b.txt", "value = 20\n")
+    write(root, "tests/c.py", "value = 30\n")
+    searcher = FileSearcher()
+    assert searcher.search(root, "value", include="*.py", exclude="tests/*")["matches"] == ["a.py:1: value = 10"]
+    assert searcher.search(root, r"value = [23]0", regex=True)["count"] == 2
+    assert searcher.search(root, "VALUE", ignore_case=True, path="tests")["matches"] == ["tests/c.py:1: value = 30"]
+
+
+def test_trigram_candidates(tmp_path):
+    root = str(tmp_path)
+    write(root, "a.py", "alpha beta\n")
+    write(root, "b.py", "beta gamma\n")
+    index = TrigramIndex(root)
+    index.refresh(["a.py", "b.py"])
+    assert index.candidates(b"beta") == {"a.py", "b.py"}
+    assert index.candidates(b"alpha") == {"a.py"}
+    assert index.candidates(b"delta") == set()
+    # Too short to narrow anything down
+    assert index.candidates(b"be") is None
+
+
+def test_index_follows_writes_and_deletions(tmp_path):
+    root = str(tmp_path)
+    write(root, "a.py", "old text\n")
+    searcher = FileSearcher()
+    searcher.enable_index(root)
+    assert searcher.search(root, "old text")["count"] == 1
+    write(root, "a.py", "new text\n")
+    searcher.note_write(root, "a.py")
+    assert searcher.search(root, "new text")["count"] == 1
+    assert searcher.search(root, "old text")["count"] == 0
+    # New and deleted files are noticed by the walk
+    write(root, "b.py", "new text\n")
+    os.remove(os.path.join(root, "a.py"))
+    assert searcher.search(root, "new text")["matches"] == ["b.py:1: new text"]
+    assert "a.py" not in searcher.indexes[str(tmp_path)].files
+
+
+def test_files_changed_by_commands_need_mark_stale(tmp_path):
+    root = str(tmp_path)
+    path = write(root, "a.py", "before\n")
+    searcher = FileSearcher()
+    searcher.enable_index(root)
+    assert searcher.search(root, "before")["count"] == 1
+    # Changed behind the index's back (as a command step would)
+    write(root, "a.py", "after!!\n")
+    bump_mtime(path)
+    assert searcher.search(root, "after")["count"] == 0
+    searcher.mark_stale(root)
+    assert searcher.search(root, "after")["count"] == 1
+    assert searcher.search(root, "before")["count"] == 0
+
+
+def test_forget_drops_the_index(tmp_path):
+    searcher = FileSearcher()
+    searcher.enable_index(str(tmp_path))
+    searcher.forget(str(tmp_path))
+    assert searcher.indexes == {}
+    searcher.mark_stale(str(tmp_path))
+    searcher.note_write(str(tmp_path), "a.py")
@@ -0,0 +1,153 @@
+import os
+import stat
+from src.core import snapshot as snapshot_module
+from src.core.snapshot import WorkspaceSnapshots
+from src.core.workspace_hash import content_hash
+
+
+def write(root, relpath, text):
+    path = os.path.join(root, relpath)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+    return path
+
+
+def read(root, relpath):
+    with open(os.path.join(root, relpath)) as f:
+        return f.read()
+
+
+def bump_mtime(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def tree(root):
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in dirnames + filenames:
+            found.append(os.path.relpath(os.path.join(dirpath, name), root).replace(os.sep, "/"))
+    return sorted(found)
+
+
+def make_workspace(tmp_path):
+    root = str(tmp_path / "ws")
+    write(root, ".gitignore", "build/\n*.log\n")
+    write(root, "main.py", "print('v1')\n")
+    write(root, "lib/util.py", "X = 1\n")
+    write(root, "lib/data.txt", "same\n")
+    write(root, "copy.txt", "same\n")
+    os.chmod(os.path.join(root, "main.py"), 0o755)
+    return root
+
+
+def snapshots(tmp_path):
+    return WorkspaceSnapshots(str(tmp_path / "snapshots"))
+
+
+def test_capture_stores_each_content_once(tmp_path):
+    root = make_workspace(tmp_path)
+    store = snapshots(tmp_path)
+    info = store.capture(root)
+    assert info["files"] == 5 and info["copied"] == 4
+    assert len(os.listdir(store.objects_dir)) == 4
+    # Nothing new to store the second time
+    assert store.capture(root)["copied"] == 0
+    store.close()
+    assert not os.path.exists(store.objects_dir)
+
+
+def test_restore_undoes_modified_deleted_and_added_files(tmp_path):
+    root = make_workspace(tmp_path)
+    store = snapshots(tmp_path)
+    store.capture(root)
+    before = tree(root)
+
+    path = write(root, "main.py", "print('v2')\n")
+    bump_mtime(path)
+    os.chmod(path, 0o644)
+    os.remove(os.path.join(root, "lib/util.py"))
+    write(root, "new.py", "added\n")
+    write(root, "pkg/deep/mod.py", "added\n")
+
+    info = store.restore(root)
+    assert tree(root) == before
+    assert read(root, "main.py") == "print('v1')\n"
+    assert stat.S_IMODE(os.stat(os.path.join(root, "main.py")).st_mode) == 0o755
+    assert read(root, "lib/util.py") == "X = 1\n"
+    assert info["restored"] == 2 and info["removed"] == 2
+    # A restored workspace restores to nothing
+    assert store.restore(root)["restored"] == 0
+
+
+def test_restore_recreates_deleted_directories(tmp_path):
+    root = make_workspace(tmp_path)
+    store = snapshots(tmp_path)
+    store.capture(root)
+    for name in ("util.py", "data.txt"):
+        os.remove(os.path.join(root, "lib", name))
+    os.rmdir(os.path.join(root, "lib"))
+    store.restore(root)
+    assert read(root, "lib/data.txt") == "same\n"
+
+
+def test_ignored_paths_are_left_alone(tmp_path):
+    root = make_workspace(tmp_path)
+    write(root, "build/out.bin", "old build\n")
+    store = snapshots(tmp_path)
+    assert store.capture(root)["files"] == 5
+    write(root, "build/out.bin", "new build\n")
+    write(root, "run.log", "log\n")
+    store.restore(root)
+    assert read(root, "build/out.bin") == "new build\n"
+    assert read(root, "run.log") == "log\n"
+
+
+def test_restore_without_a_snapshot(tmp_path):
+    root = make_workspace(tmp_path)
+    assert snapshots(tmp_path).restore(root) is None
+
+
+def test_discard_drops_objects_no_other_snapshot_uses(tmp_path):
+    first = make_workspace(tmp_path / "a")
+    second = make_workspace(tmp_path / "b")
+    write(second, "only_b.txt", "b\n")
+    store = snapshots(tmp_path)
+    store.capture(first)
+    store.capture(second)
+    assert len(os.listdir(store.objects_dir)) == 5
+    store.discard(second)
+    assert len(os.listdir(store.objects_dir)) == 4
+    assert store.restore(second) is None
+    store.discard(first)
+    assert os.listdir(store.objects_dir) == []
+
+
+def test_a_file_written_during_capture_is_recorded_as_copied(tmp_path, monkeypatch):
+    root = make_workspace(tmp_path)
+    store = snapshots(tmp_path)
+    clone = snapshot_module.clone_file
+
+    def racing_clone(source, target):
+        # The file changes after it was hashed but before it is copied
+        if source.endswith("main.py"):
+            write(root, "main.py", "print('written mid-capture')\n")
+            bump_mtime(source)
+        clone(source, target)
+
+    monkeypatch.setattr(snapshot_module, "clone_file", racing_clone)
+    store.capture(root)
+    monkeypatch.setattr(snapshot_module, "clone_file", clone)
+
+    files, _ = store._snapshots[os.path.abspath(root)]
+    file_digest = files["main.py"][0]
+    assert file_digest == content_hash(b"print('written mid-capture')\n")
+    with open(os.path.join(store.objects_dir, file_digest), "rb") as f:
+        assert content_hash(f.read()) == file_digest
+    assert not [name for name in os.listdir(store.objects_dir) if name.startswith(".")]
+
+    path = write(root, "main.py", "print('v3')\n")
+    bump_mtime(path)
+    store.restore(root)
+    assert read(root, "main.py") == "print('written mid-capture')\n"
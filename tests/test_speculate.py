@@ -0,0 +1,119 @@
+import os
+import stat
+import threading
+from src.core.speculate import SpeculativeRunner
+
+
+class FakePlanner:
+    def __init__(self, plans):
+        self.plans = plans
+
+    def create_plan(self, task, context, feedback, completed=None, variant=None, usage=None):
+        index = variant[0]
+        usage["total"] = {"tokens": 100 * index}
+        return self.plans[index]
+
+
+class FakeScheduler:
+    # Steps: {"write": name, "content": text}, {"fail": True}, {"raise": True}
+    # or {"after": n}, which waits until n candidates have failed or raised
+    def __init__(self):
+        self.ended = 0
+        self.changed = threading.Condition()
+
+    def run(self, plan, cwd):
+        steps = []
+        for step in plan:
+            if "after" in step:
+                with self.changed:
+                    self.changed.wait_for(lambda: self.ended >= step["after"], timeout=5)
+                continue
+            if step.get("raise") or step.get("fail"):
+                with self.changed:
+                    self.ended += 1
+                    self.changed.notify_all()
+            if step.get("raise"):
+                raise RuntimeError("scheduler blew up")
+            if step.get("fail"):
+                result = {"status": "failure", "stderr": "boom"}
+                steps.append({"step": step, "result": result})
+                return {"status": "failure", "timing": {"step_time": 0.01}, "steps": steps,
+                        "failed": {"step": step, "result": result}}
+            with open(os.path.join(cwd, step["write"]), "w") as f:
+                f.write(step["content"])
+            steps.append({"step": step, "result": {"status": "success"}})
+        return {"status": "success", "timing": {"step_time": 0.01}, "steps": steps}
+
+
+class FakeExecutor:
+    def __init__(self):
+        self.cancelled = []
+
+    def cancellable(self, cwd):
+        pass
+
+    def alias(self, cwd, workspace):
+        pass
+
+    def cancel(self, cwd):
+        self.cancelled.append(cwd)
+
+    def release(self, cwd):
+        pass
+
+
+class FakeSupervisor:
+    def stop_workspace(self, cwd):
+        pass
+
+
+def runner(plans, **kwargs):
+    return SpeculativeRunner(FakePlanner(plans), FakeScheduler(), FakeExecutor(), FakeSupervisor(),
+                             candidates=len(plans), **kwargs)
+
+
+def make_workspace(tmp_path):
+    workspace = tmp_path / "ws"
+    workspace.mkdir()
+    (workspace / "keep.txt").write_text("old")
+    os.chmod(workspace, 0o755)
+    return str(workspace)
+
+
+def test_a_raising_candidate_does_not_stop_the_race(tmp_path):
+    workspace = make_workspace(tmp_path)
+    plans = {1: [{"raise": True}], 2: [{"fail": True}], 3: [{"after": 2}, {"write": "out.txt", "content": "3"}]}
+    result = runner(plans).run("task", {}, "", workspace)
+    assert result["winner"]["candidate"] == 3
+    statuses = {r["candidate"]: r["status"] for r in result["candidates"]}
+    assert statuses == {1: "error", 2: "failure", 3: "success"}
+    assert "scheduler blew up" in result["candidates"][0]["error"]
+    assert open(os.path.join(workspace, "out.txt")).read() == "3"
+
+
+def test_the_winner_replaces_the_workspace_and_sandboxes_are_removed(tmp_path):
+    workspace = make_workspace(tmp_path)
+    plans = {1: [{"write": "out.txt", "content": "1"}], 2: [{"fail": True}]}
+    result = runner(plans).run("task", {}, "", workspace)
+    assert result["winner"]["candidate"] == 1
+    assert sorted(os.listdir(workspace)) == ["keep.txt", "out.txt"]
+    assert stat.S_IMODE(os.stat(workspace).st_mode) == 0o755
+    assert os.listdir(tmp_path) == ["ws"]
+
+
+def test_without_a_winner_the_workspace_is_untouched(tmp_path):
+    workspace = make_workspace(tmp_path)
+    plans = {1: [{"write": "half.txt", "content": "x"}, {"fail": True}], 2: [{"raise": True}]}
+    result = runner(plans).run("task", {}, "", workspace)
+    assert result["winner"] is None and result["best"]["candidate"] == 1
+    assert os.listdir(workspace) == ["keep.txt"]
+    assert os.listdir(tmp_path) == ["ws"]
+    assert result["stats"]["failed"] == 2
+
+
+def test_prompt_tokens_are_reported_per_candidate(tmp_path):
+    workspace = make_workspace(tmp_path)
+    plans = {1: [{"fail": True}], 2: [{"fail": True}], 3: [{"fail": True}]}
+    stats = runner(plans).run("task", {}, "", workspace)["stats"]
+    assert [c["prompt_tokens"] for c in stats["per_candidate"]] == [100, 200, 300]
+    assert stats["prompt_tokens"] == 600
@@ -0,0 +1,120 @@
+import os
+import socket
+import sys
+import time
+import pytest
+from src.core.supervisor import ProcessSupervisor
+
+PYTHON = f'"{sys.executable}"'
+
+posix_only = pytest.mark.skipif(os.name == "nt", reason="process groups are POSIX sessions")
+
+
+@pytest.fixture
+def supervisor(tmp_path):
+    supervisor = ProcessSupervisor(log_dir=str(tmp_path / "logs"))
+    yield supervisor
+    supervisor.stop_all()
+
+
+def alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    # A zombie still answers signal 0; check its state where /proc exists
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().split(")")[-1].split()[0] != "Z"
+    except OSError:
+        return True
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def test_output_is_drained_to_a_log_file(supervisor, tmp_path):
+    managed = supervisor.start(f"{PYTHON} -c \"print('server up', flush=True); import time; time.sleep(30)\"",
+                               str(tmp_path))
+    assert managed.running()
+    assert os.path.dirname(managed.log_path) == str(tmp_path / "logs")
+    assert supervisor.wait_for_log(str(tmp_path), "server up", timeout=5)
+    assert "server up" in supervisor.tail(managed)
+    assert supervisor.list(str(tmp_path)) == [managed]
+    assert not supervisor.wait_for_log(str(tmp_path), "never printed", timeout=0.3)
+
+
+def test_logs_rotate_at_the_size_cap(tmp_path):
+    supervisor = ProcessSupervisor(log_dir=str(tmp_path / "logs"), max_log_bytes=1000, log_backups=2)
+    # Four writes, each over the cap, spaced so the drainer reads them separately
+    script = "import sys, time\nfor _ in range(4):\n    sys.stdout.write('x' * 1200); sys.stdout.flush(); time.sleep(0.2)\n"
+    (tmp_path / "chatty.py").write_text(script)
+    managed = supervisor.start(f"{PYTHON} chatty.py", str(tmp_path))
+    managed.drainer.join(5)
+    assert not managed.running()
+    assert os.path.exists(managed.log_path + ".1") and os.path.exists(managed.log_path + ".2")
+    assert not os.path.exists(managed.log_path + ".3")
+    for path in (managed.log_path + ".1", managed.log_path + ".2"):
+        assert os.path.getsize(path) >= 1000
+
+
+@posix_only
+def test_stop_workspace_kills_the_whole_group(supervisor, tmp_path):
+    # The shell starts a grandchild that would outlive a plain kill of the shell
+    script = tmp_path / "spawn.sh"
+    script.write_text("sleep 30 &\necho $! > child.pid\nwait\n")
+    managed = supervisor.start("sh spawn.sh", str(tmp_path))
+    assert wait_until(lambda: (tmp_path / "child.pid").exists() and (tmp_path / "child.pid").read_text().strip())
+    child = int((tmp_path / "child.pid").read_text())
+    assert alive(child)
+
+    assert supervisor.stop_workspace(str(tmp_path)) == 1
+    assert not managed.running()
+    assert wait_until(lambda: not alive(child))
+    assert supervisor.list(str(tmp_path)) == []
+    assert supervisor.stop_workspace(str(tmp_path)) == 0
+
+
+def test_stopping_a_process_that_already_exited(supervisor, tmp_path):
+    managed = supervisor.start(f"{PYTHON} -c \"print('done')\"", str(tmp_path))
+    managed.drainer.join(5)
+    assert not managed.running() and managed.proc.returncode == 0
+    assert supervisor.stop_workspace(str(tmp_path)) == 1
+    assert "done" in supervisor.tail(managed)
+
+
+def test_workspaces_are_stopped_separately(supervisor, tmp_path):
+    first, second = tmp_path / "a", tmp_path / "b"
+    first.mkdir()
+    second.mkdir()
+    sleeper = f"{PYTHON} -c \"import time; time.sleep(30)\""
+    a = supervisor.start(sleeper, str(first))
+    b = supervisor.start(sleeper, str(second))
+    supervisor.stop_workspace(str(first) + "/")
+    assert not a.running() and b.running()
+    supervisor.stop_all()
+    assert not b.running() and supervisor.processes == {}
+
+
+def test_wait_ready(supervisor, tmp_path):
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    port = listener.getsockname()[1]
+    try:
+        assert supervisor.wait_ready(str(tmp_path), {"port": port, "timeout": 2}) is None
+    finally:
+        listener.close()
+
+    supervisor.start(f"{PYTHON} -c \"print('crashed: bad config')\"", str(tmp_path))
+    error = supervisor.wait_ready(str(tmp_path), {"log": "listening", "timeout": 0.5})
+    assert "No log line matching 'listening'" in error
+    assert "exited with 0" in error and "crashed: bad config" in error
@@ -0,0 +1,102 @@
+from src.core.timeouts import TimeoutModel, command_key
+
+
+def run(command, duration, returncode=0, **result):
+    return {"step": {"type": "command", "command": command},
+            "result": dict({"returncode": returncode}, **result), "timing": {"duration": duration}}
+
+
+def timed_out(command, duration, limit):
+    return {"step": {"type": "command", "command": command},
+            "result": {"status": "failure", "timed_out": True, "timeout": limit}, "timing": {"duration": duration}}
+
+
+def trace(*steps, workspace="/ws/app"):
+    return {"task": "task", "workspace": workspace, "steps": list(steps)}
+
+
+def test_command_key():
+    assert command_key("cargo build --release") == "cargo build"
+    assert command_key("cd app && CI=1 npm test -- --watch=false") == "npm test"
+    assert command_key("/usr/bin/python -m pytest") == "python pytest"
+    assert command_key("") == ""
+
+
+def test_p95_times_margin():
+    model = TimeoutModel(margin=2.0, min_timeout=1.0)
+    # 20 samples: 1..20 seconds; p95 is the 19th
+    model.observe(trace(*[run("make test", float(i)) for i in range(20, 0, -1)]))
+    assert model.timeout_for("make test", "/ws/app") == (38.0, "learned")
+    model = TimeoutModel(margin=1.5, min_timeout=1.0)
+    model.observe(trace(*[run("make test", d) for d in (4.0, 2.0, 8.0)]))
+    assert model.timeout_for("make test", "/ws/app") == (12.0, "learned")
+
+
+def test_learned_limits_are_clamped():
+    model = TimeoutModel(max_timeout=100.0)
+    model.observe(trace(*[run("make", 1.0)] * 3, *[run("cargo build", 90.0)] * 3))
+    # The floor defaults to the default, so fast commands keep the old limit
+    assert model.timeout_for("make", "/ws/app") == (60.0, "learned")
+    assert model.timeout_for("cargo build", "/ws/app") == (100.0, "learned")
+    model = TimeoutModel(min_timeout=5.0)
+    model.observe(trace(*[run("make", 1.0)] * 3))
+    assert model.timeout_for("make", "/ws/app") == (5.0, "learned")
+
+
+def test_too_few_samples_fall_back_to_the_default():
+    model = TimeoutModel(default=42.0, min_samples=3)
+    assert model.timeout_for("pytest", "/ws/app") == (42.0, "default")
+    model.observe(trace(run("pytest", 500.0), run("pytest", 500.0)))
+    assert model.timeout_for("pytest", "/ws/app") == (42.0, "default")
+    model.observe(trace(run("pytest", 500.0)))
+    assert model.timeout_for("pytest", "/ws/app") == (1000.0, "learned")
+
+
+def test_a_timeout_at_least_doubles_the_limit():
+    model = TimeoutModel(min_samples=3)
+    model.observe(trace(timed_out("pytest", 60.2, 60.0)))
+    assert model.timeout_for("pytest", "/ws/app") == (120.0, "learned")
+    model.observe(trace(run("pytest", 70.0), run("pytest", 70.0)))
+    assert model.timeout_for("pytest", "/ws/app") == (140.0, "learned")
+
+
+def test_samples_are_kept_per_workspace():
+    model = TimeoutModel()
+    model.observe(trace(*[run("pytest", 300.0)] * 3, workspace="/ws/big"))
+    assert model.timeout_for("pytest", "/ws/big") == (600.0, "learned")
+    assert model.timeout_for("pytest", "/ws/big/") == (600.0, "learned")
+    assert model.timeout_for("pytest", "/ws/small") == (60.0, "default")
+    assert model.timeout_for("pytest") == (60.0, "default")
+
+
+def test_observe_skips_steps_that_say_nothing_about_duration():
+    model = TimeoutModel(min_samples=1)
+    background = run("npm start", 900.0)
+    background["step"]["background"] = True
+    write = {"step": {"type": "write_file", "filename": "a"}, "result": {"status": "success"},
+             "timing": {"duration": 900.0}}
+    untimed = {"step": {"type": "command", "command": "ls"}, "result": {"returncode": 0}}
+    errored = {"step": {"type": "command", "command": "ls"}, "result": {"status": "error"},
+               "timing": {"duration": 900.0}}
+    model.observe(trace(background, write, untimed, errored, run("make", 900.0, cached=True)))
+    assert model.samples == {}
+
+
+def test_time_queued_for_a_process_slot_is_not_learned():
+    model = TimeoutModel(min_timeout=1.0)
+    model.observe(trace(*[run("make", 50.0, queued=45.0)] * 3))
+    assert model.timeout_for("make", "/ws/app") == (10.0, "learned")
+
+
+def test_history_is_loaded_once_oldest_first():
+    calls = []
+
+    def history():
+        calls.append(1)
+        # Newest first, as memory returns them
+        return [trace(run("make", 2.0)), trace(run("make", 1.0))]
+
+    model = TimeoutModel(min_timeout=0.0, min_samples=1, window=1, history=history)
+    assert model.timeout_for("make", "/ws/app") == (4.0, "learned")
+    model.timeout_for("make", "/ws/app")
+    assert calls == [1]
@@ -0,0 +1,114 @@
+import os
+from src.core.log_store import SegmentedLog
+from src.core.memory import Memory
+from src.core.trace_index import LazyTraceList, TraceIndex
+
+
+def trace(i, status="success", workspace="ws"):
+    return {"task": f"task {i % 3}", "status": status, "timestamp": float(i), "workspace": workspace,
+            "plan": [{"type": "command", "command": f"echo {i}"}]}
+
+
+def open_index(path, **kwargs):
+    log = SegmentedLog(str(path), "episodic", fsync=False, **kwargs)
+    index = TraceIndex(log, os.path.join(path, "episodic.idx"), fsync=False)
+    log.on_compact = index.relocate
+    return log, index
+
+
+def fill(log, index, count, **kwargs):
+    for i in range(count):
+        record = trace(i, **kwargs)
+        index.add(log.append(record), record)
+
+
+def test_query_filters_on_indexed_fields(tmp_path):
+    log, index = open_index(tmp_path)
+    fill(log, index, 9)
+    record = trace(9, status="failure", workspace="other")
+    index.add(log.append(record), record)
+    assert index.query(task="task 0") == [0, 3, 6, 9]
+    assert index.query(task="task 0", status="failure") == [9]
+    assert index.query(workspace="ws", since=7.0) == [7, 8]
+    assert index.metadata(9) == {"task": "task 0", "status": "failure", "timestamp": 9.0, "workspace": "other"}
+
+
+def test_trace_bodies_are_read_on_first_access(tmp_path, monkeypatch):
+    log, index = open_index(tmp_path)
+    fill(log, index, 5)
+    _, index = open_index(tmp_path)
+    reads = []
+    real_read = index.log.read
+    monkeypatch.setattr(index.log, "read", lambda *location: reads.append(location) or real_read(*location))
+    traces = LazyTraceList(index, cache_size=2)
+    assert len(traces) == 5 and reads == []
+    assert traces[3]["plan"][0]["command"] == "echo 3"
+    assert traces[-2]["timestamp"] == 3.0
+    assert len(reads) == 1
+    assert [t["timestamp"] for t in traces[0:2]] == [0.0, 1.0]
+    assert len(reads) == 3
+
+
+def test_memory_loads_the_index_once(tmp_path, monkeypatch):
+    memory = Memory(str(tmp_path / "memory.json"), fsync=False)
+    for i in range(3):
+        memory.add_trace(trace(i))
+    loads = []
+    real_load = TraceIndex.load
+    monkeypatch.setattr(TraceIndex, "load", lambda self: loads.append(self) or real_load(self))
+    reloaded = Memory(str(tmp_path / "memory.json"), fsync=False)
+    assert len(loads) == 1
+    assert [t["timestamp"] for t in reloaded.find_traces(task="task 0")] == [0.0]
+
+
+def test_entries_follow_a_compaction(tmp_path, monkeypatch):
+    log, index = open_index(tmp_path, max_segment_bytes=300)
+    fill(log, index, 12)
+    monkeypatch.setattr(index, "rebuild", lambda: (_ for _ in ()).throw(AssertionError("rebuilt")))
+    log.compact(log.records())
+    traces = LazyTraceList(index)
+    assert [t["timestamp"] for t in traces] == [float(i) for i in range(12)]
+    monkeypatch.undo()
+
+    # The rewritten index file matches the new segments after a restart
+    log, index = open_index(tmp_path, max_segment_bytes=300)
+    assert [e[0] for e in index.entries] == [e[0] for e in traces.index.entries]
+    assert [t["timestamp"] for t in LazyTraceList(index)] == [float(i) for i in range(12)]
+
+
+def test_a_compaction_that_drops_traces_rebuilds(tmp_path):
+    log, index = open_index(tmp_path)
+    fill(log, index, 6)
+    log.compact(r for r in list(log.records()) if r["status"] == "success" and r["timestamp"] % 2 == 0)
+    assert [index.metadata(i)["timestamp"] for i in range(len(index.entries))] == [0.0, 2.0, 4.0]
+
+
+def test_an_index_from_before_a_compaction_is_rebuilt(tmp_path):
+    log, index = open_index(tmp_path)
+    fill(log, index, 4)
+    stale = open(index.index_file, "rb").read()
+    log.compact(log.records())
+    with open(index.index_file, "wb") as f:
+        f.write(stale)
+    _, index = open_index(tmp_path)
+    assert [t["timestamp"] for t in LazyTraceList(index)] == [0.0, 1.0, 2.0, 3.0]
+
+
+def test_traces_logged_but_not_indexed_are_caught_up(tmp_path):
+    log, index = open_index(tmp_path)
+    fill(log, index, 3)
+    # A crash between the log append and the index append
+    log.append(trace(3, status="failure"))
+    _, index = open_index(tmp_path)
+    assert index.query(status="failure") == [3]
+    with open(index.index_file, "rb") as f:
+        assert len(f.read().splitlines()) == 4
+
+
+def test_a_torn_index_line_is_rebuilt_from_the_log(tmp_path):
+    log, index = open_index(tmp_path)
+    fill(log, index, 3)
+    with open(index.index_file, "ab") as f:
+        f.write(b'[1, 0, 4')
+    _, index = open_index(tmp_path)
+    assert [index.metadata(i)["timestamp"] for i in range(len(index.entries))] == [0.0, 1.0, 2.0]
@@ -0,0 +1,108 @@
+import json
+import threading
+import time
+import pytest
+from src.utils import tracing
+from src.utils.tracing import Tracer
+
+
+@pytest.fixture
+def tracer():
+    tracer = Tracer()
+    tracer.enable()
+    return tracer
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer()
+    first = tracer.span("a")
+    with first as s:
+        s.set(x=1)
+    assert first is tracer.span("b") and tracer.events == []
+    # The module-level helper goes through the shared tracer, off by default
+    assert not tracing.tracer.enabled
+    assert tracing.span("x") is first
+
+
+def test_nested_spans_lie_within_their_parent(tracer):
+    with tracer.span("task", "coordinator", task="t") as outer:
+        with tracer.span("plan", "planner"):
+            time.sleep(0.01)
+        with tracer.span("step", "executor") as step:
+            step.set(status="success")
+            time.sleep(0.01)
+        outer.set(attempts=1)
+    plan, step, task = tracer.events
+    # Spans are recorded as they end, so children come before their parent
+    assert [e["name"] for e in (plan, step, task)] == ["plan", "step", "task"]
+    assert task["attrs"] == {"task": "t", "attempts": 1} and step["attrs"] == {"status": "success"}
+    for child in (plan, step):
+        assert child["tid"] == task["tid"]
+        assert task["start"] <= child["start"]
+        assert child["start"] + child["dur"] <= task["start"] + task["dur"] + 1e-6
+    assert plan["start"] + plan["dur"] <= step["start"] + 1e-6
+    assert task["dur"] >= 0.02
+
+
+def test_exceptions_are_recorded_and_propagate(tracer):
+    with pytest.raises(ValueError):
+        with tracer.span("step"):
+            raise ValueError("boom")
+    assert tracer.events[0]["attrs"] == {"error": "ValueError"}
+
+
+def test_events_past_the_limit_are_dropped(tracer):
+    tracer.max_events = 2
+    for name in "abc":
+        with tracer.span(name):
+            pass
+    assert [e["name"] for e in tracer.events] == ["a", "b"] and tracer.dropped == 1
+    tracer.clear()
+    assert tracer.events == [] and tracer.dropped == 0
+
+
+def test_summary(tracer):
+    for seconds in (0.01, 0.02):
+        with tracer.span("step"):
+            time.sleep(seconds)
+    with tracer.span("plan"):
+        pass
+    summary = tracer.summary()
+    assert summary["step"]["count"] == 2 and summary["plan"]["count"] == 1
+    assert summary["step"]["max_s"] >= 0.02 and summary["step"]["total_s"] >= 0.03
+
+
+def test_chrome_trace_export(tracer, tmp_path):
+    def step():
+        with tracer.span("step", "executor"):
+            pass
+
+    with tracer.span("task", "coordinator"):
+        worker = threading.Thread(target=step, name="step_0")
+        worker.start()
+        worker.join()
+    path = str(tmp_path / "trace.json")
+    tracer.export(path)
+    with open(path) as f:
+        trace = json.load(f)
+    spans = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    names = {e["args"]["name"] for e in trace["traceEvents"] if e["ph"] == "M"}
+    assert [e["name"] for e in spans] == ["step", "task"]
+    assert spans[0]["tid"] != spans[1]["tid"]
+    assert {"step_0", threading.current_thread().name} == names
+    task = spans[1]
+    # Microseconds, relative to the tracer's origin
+    assert task["cat"] == "coordinator" and task["ts"] >= 0 and task["dur"] >= spans[0]["dur"]
+    assert trace["otherData"]["dropped"] == 0
+
+
+def test_jsonl_export(tracer, tmp_path):
+    with tracer.span("step", path=tmp_path):
+        pass
+    path = str(tmp_path / "trace.jsonl")
+    tracer.export(path)
+    with open(path) as f:
+        events = [json.loads(line) for line in f]
+    assert len(events) == 1 and events[0]["name"] == "step"
+    # Attributes that are not JSON types are written as strings
+    assert events[0]["attrs"]["path"] == str(tmp_path)
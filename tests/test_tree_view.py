@@ -0,0 +1,118 @@
+import os
+from src.core.tree_view import IgnoreRules, TreeCache
+
+
+def write(root, relpath, text=""):
+    path = os.path.join(root, relpath)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+    return path
+
+
+def bump_mtime(path, seconds=1):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + seconds * 1_000_000_000))
+
+
+def test_ignore_rules_basics():
+    rules = IgnoreRules(["# comment", "", "*.log", "build/", "/top.txt", "docs/*.md", "!keep.log"])
+    assert rules.ignored("run.log", False) and rules.ignored("a/b/run.log", False)
+    assert not rules.ignored("keep.log", False)
+    assert rules.ignored("build", True) and rules.ignored("src/build", True)
+    assert not rules.ignored("build", False)
+    assert rules.ignored("top.txt", False) and not rules.ignored("src/top.txt", False)
+    assert rules.ignored("docs/a.md", False) and not rules.ignored("src/docs/a.md", False)
+
+
+def test_double_star_matches_at_the_top_level_too():
+    rules = IgnoreRules(["**/node_modules/", "**/gen/*.py", "src/**/tmp"])
+    assert rules.ignored("node_modules", True)
+    assert rules.ignored("web/app/node_modules", True)
+    assert not rules.ignored("node_modules", False)
+    assert rules.ignored("gen/a.py", False) and rules.ignored("x/gen/a.py", False)
+    assert not rules.ignored("gen/a.txt", False)
+    assert rules.ignored("src/tmp", True) and rules.ignored("src/a/b/tmp", True)
+    assert not rules.ignored("lib/tmp", True)
+
+
+def test_for_root_adds_the_defaults(tmp_path):
+    rules = IgnoreRules.for_root(str(tmp_path))
+    assert rules.ignored(".git", True) and rules.ignored("__pycache__", True) and rules.ignored(".env", False)
+    write(str(tmp_path), ".gitignore", "*.tmp\n")
+    assert IgnoreRules.for_root(str(tmp_path)).ignored("x.tmp", False)
+
+
+def make_tree(root):
+    write(root, ".gitignore", "*.log\n")
+    write(root, "main.py")
+    write(root, "run.log")
+    write(root, "pkg/mod.py")
+    write(root, "pkg/sub/deep.py")
+
+
+def test_render(tmp_path):
+    root = str(tmp_path)
+    make_tree(root)
+    assert TreeCache().render(root) == (
+        "├── .gitignore\n"
+        "├── main.py\n"
+        "└── pkg\n"
+        "    ├── mod.py\n"
+        "    └── sub\n"
+        "        └── deep.py\n"
+    )
+    assert TreeCache().render(str(tmp_path / "missing")) == ""
+
+
+def test_unchanged_directories_are_not_listed_again(tmp_path):
+    root = str(tmp_path)
+    make_tree(root)
+    cache = TreeCache()
+    cache.render(root)
+    assert cache.relisted == 3
+    cache.render(root)
+    assert cache.relisted == 3
+    # Adding a file changes only its directory's mtime
+    write(root, "pkg/new.py")
+    bump_mtime(os.path.join(root, "pkg"))
+    assert "new.py" in cache.render(root)
+    assert cache.relisted == 4
+
+
+def test_written_files_invalidate_their_directory(tmp_path):
+    root = str(tmp_path)
+    make_tree(root)
+    cache = TreeCache()
+    cache.render(root)
+    # Simulate a filesystem whose mtime did not move
+    pkg = os.path.join(root, "pkg")
+    before = os.stat(pkg).st_mtime_ns
+    write(root, "pkg/other.py")
+    os.utime(pkg, ns=(before, before))
+    assert "other.py" not in cache.render(root)
+    cache.note_step({"type": "write_file", "filename": "pkg/other.py"}, root)
+    assert "other.py" in cache.render(root)
+    cache.note_step({"type": "command", "command": "ls"}, root)
+
+
+def test_gitignore_changes_are_picked_up(tmp_path):
+    root = str(tmp_path)
+    make_tree(root)
+    cache = TreeCache()
+    assert "main.py" in cache.render(root)
+    path = write(root, ".gitignore", "*.log\nmain.py\n")
+    bump_mtime(path)
+    assert "main.py" not in cache.render(root)
+
+
+def test_rendering_is_bounded(tmp_path):
+    root = str(tmp_path)
+    for i in range(10):
+        write(root, f"f{i}.txt")
+    write(root, "a/b/c/d.txt")
+    text = TreeCache(max_entries_per_dir=4).render(root)
+    assert "└── ... (7 more entries)" in text and "f9.txt" not in text
+    assert TreeCache(max_entries=3).render(root).endswith("└── ... (entry budget reached)\n")
+    shallow = TreeCache(max_depth=2).render(root)
+    assert shallow.startswith("├── a\n│   └── b\n│       └── ...\n├── f0.txt\n")
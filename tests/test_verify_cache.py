@@ -0,0 +1,112 @@
+import os
+from src.core.timeouts import TimeoutModel
+from src.core.verify_cache import VerifyCache
+from src.core.workspace_hash import WorkspaceHasher
+
+VERIFY = {"type": "verify", "command": "python -m pytest"}
+
+
+class FakeSupervisor:
+    def __init__(self):
+        self.running = []
+
+    def list(self, cwd):
+        return self.running
+
+
+class FakeExecutor:
+    def __init__(self, status="success"):
+        self.status = status
+        self.runs = []
+        self.supervisor = FakeSupervisor()
+
+    def execute_step(self, step, cwd="."):
+        self.runs.append((step["command"], cwd))
+        return {"status": self.status, "returncode": 0 if self.status == "success" else 1}
+
+
+def workspace(path, name="ws"):
+    root = path / name
+    root.mkdir()
+    (root / "app.py").write_text("print(1)\n")
+    return str(root)
+
+
+def test_unchanged_workspace_reuses_the_result(tmp_path):
+    root = workspace(tmp_path)
+    cache = VerifyCache(FakeExecutor())
+    assert cache.execute_step(VERIFY, root)["status"] == "success"
+    assert cache.execute_step(VERIFY, root) == {"status": "success", "returncode": 0, "cached": True}
+    assert len(cache.executor.runs) == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+
+def test_content_changes_miss(tmp_path):
+    root = workspace(tmp_path)
+    cache = VerifyCache(FakeExecutor())
+    cache.execute_step(VERIFY, root)
+    with open(os.path.join(root, "app.py"), "w") as f:
+        f.write("print(2)\n")
+    cache.execute_step(VERIFY, root)
+    cache.execute_step(dict(VERIFY, timeout=5), root)
+    assert len(cache.executor.runs) == 3
+
+
+def test_ignored_files_are_part_of_the_key(tmp_path):
+    root = workspace(tmp_path)
+    cache = VerifyCache(FakeExecutor())
+    cache.execute_step(VERIFY, root)
+    with open(os.path.join(root, ".env"), "w") as f:
+        f.write("DEBUG=1\n")
+    cache.execute_step(VERIFY, root)
+    os.makedirs(os.path.join(root, ".venv", "lib"))
+    with open(os.path.join(root, ".venv", "lib", "site.py"), "w") as f:
+        f.write("")
+    cache.execute_step(VERIFY, root)
+    cache.execute_step(VERIFY, root)
+    assert len(cache.executor.runs) == 3
+
+
+def test_results_are_not_shared_between_identical_workspaces(tmp_path):
+    first, second = workspace(tmp_path, "a"), workspace(tmp_path, "b")
+    cache = VerifyCache(FakeExecutor())
+    cache.execute_step(VERIFY, first)
+    cache.execute_step(VERIFY, second)
+    assert cache.executor.runs == [("python -m pytest", first), ("python -m pytest", second)]
+
+
+def test_tools_failures_and_opt_outs_always_run(tmp_path):
+    root = workspace(tmp_path)
+    tools = ["python 3.11"]
+    cache = VerifyCache(FakeExecutor(), fingerprint=lambda: tools[0])
+    cache.execute_step(VERIFY, root)
+    tools[0] = "python 3.12"
+    cache.execute_step(VERIFY, root)
+    cache.execute_step(dict(VERIFY, cache=False), root)
+    cache.executor.supervisor.running = [type("Managed", (), {"running": lambda self: True})()]
+    cache.execute_step(VERIFY, root)
+    assert len(cache.executor.runs) == 4
+
+    failing = VerifyCache(FakeExecutor(status="failure"))
+    failing.execute_step(VERIFY, root)
+    failing.execute_step(VERIFY, root)
+    assert len(failing.executor.runs) == 2
+
+
+def test_too_many_ignored_files_is_uncacheable(tmp_path):
+    root = workspace(tmp_path)
+    os.makedirs(os.path.join(root, "__pycache__"))
+    for i in range(5):
+        open(os.path.join(root, "__pycache__", f"m{i}.pyc"), "w").close()
+    hasher = WorkspaceHasher()
+    assert hasher.ignored_state(root, max_files=4) is None
+    assert hasher.ignored_state(root, max_files=5) is not None
+
+
+def test_cached_hits_do_not_teach_timeouts():
+    model = TimeoutModel(min_samples=3)
+    run = {"step": {"type": "verify", "command": "pytest"}, "result": {"returncode": 0}, "timing": {"duration": 300.0}}
+    hit = {"step": {"type": "verify", "command": "pytest"}, "result": {"returncode": 0, "cached": True},
+           "timing": {"duration": 0.001}}
+    model.observe({"workspace": "/ws", "steps": [run] * 3 + [hit] * 20})
+    assert model.timeout_for("pytest", "/ws") == (600.0, "learned")